@@ -1,42 +1,255 @@
 import os
 import csv
+import threading
+from contextlib import nullcontext
 from io import StringIO
-from datetime import datetime, date, time
+from datetime import datetime, date, time, timedelta
 from flask import Flask, render_template, request, redirect, url_for, session, flash, jsonify, Response
-from dotenv import load_dotenv
 
-# Import  modules
-from services.database_client import SupabaseClient
-from core.models.user import User
+# Import  modules (heavy ones such as supabase and pydantic are imported lazily)
 from core.models.task import Task
-from core.models.schedule import Schedule
 from core.models.regular_task import RegularTask
-from core.algorithms.scheduler import GreedyScheduler
-from core.algorithms.history import HistoryService
+from utils.validators import validate_date
+from utils.time_helpers import parse_span, format_time
 
-load_dotenv()
 
-app = Flask(__name__)
-app.secret_key = os.environ.get('FLASK_SECRET_KEY')
+# Views are collected here and registered by create_app()
+_routes = []
 
-# Initialize scheduler
-scheduler = GreedyScheduler()
 
-# Supabase client
-db = SupabaseClient()
+def route(rule, **options):
+    """Record a view function to be registered on the app built by create_app()"""
+    def decorator(view):
+        _routes.append((rule, view, options))
+        return view
+    return decorator
 
-# History service
-history_service = HistoryService()
 
+def create_app():
+    """Build the Flask app. Services are created on first use, not here."""
+    from dotenv import load_dotenv
 
-@app.route('/')
+    load_dotenv()
+
+    app = Flask(__name__)
+    app.secret_key = os.environ.get('FLASK_SECRET_KEY')
+
+    # Per-route request latency
+    from services import metrics, query_profiler
+    metrics.init_app(app)
+    query_profiler.init_app(app)
+
+    for rule, view, options in _routes:
+        app.add_url_rule(rule, view_func=view, **options)
+
+    # A bad DURATION_PERCENTILE or SCHEDULER_PLACEMENT fails here, at boot,
+    # instead of in every schedule job
+    from core.algorithms.scheduler import GreedyScheduler
+    GreedyScheduler(**_scheduler_options())
+
+    return app
+
+
+def render(template_name, **context):
+    """render_template, timed as the route's template_render stage"""
+    from services.metrics import span
+
+    with span('template_render'):
+        return render_template(template_name, **context)
+
+
+# Lazily initialized, per-process services
+_services = {}
+_services_lock = threading.Lock()
+
+
+def _service(name, factory):
+    service = _services.get(name)
+    if service is None:
+        with _services_lock:
+            service = _services.get(name)
+            if service is None:
+                service = _services[name] = factory()
+    return service
+
+
+def get_db():
+    """Supabase client"""
+    from services.database_client import SupabaseClient
+
+    def build():
+        from services.metrics import REGISTRY
+        for name in ('in_flight', 'requests', 'new_connections', 'reused_connections', 'retries'):
+            REGISTRY.gauge(
+                f'timely_db_{name}',
+                f'Supabase client {name.replace("_", " ")} (this process)',
+                lambda name=name: SupabaseClient.stats[name]
+            )
+        return SupabaseClient()
+
+    return _service('db', build)
+
+
+def get_history_service():
+    from core.algorithms.history import HistoryService
+    return _service('history_service', HistoryService)
+
+
+def get_duration_estimator():
+    """Streaming duration model, updated from measured completions and kept in the local store"""
+    from services.duration_store import PersistentDurationEstimator
+    return _service('duration_estimator', PersistentDurationEstimator)
+
+
+def get_task_starts():
+    """When the user started each scheduled task"""
+    from services.duration_store import TaskStarts
+    return _service('task_starts', TaskStarts)
+
+
+def get_completion_store():
+    from services.completion_store import CompletionStore
+    return _service('completion_store', CompletionStore)
+
+
+def get_task_deleter():
+    from services.task_delete import TaskDeleter
+    return _service('task_deleter', lambda: TaskDeleter(get_db()))
+
+
+def get_task_updater():
+    from services.task_update import TaskUpdater
+    return _service('task_updater', lambda: TaskUpdater(get_db()))
+
+
+def get_data_versions():
+    from services.data_version import DataVersions
+    return _service('data_versions', DataVersions)
+
+
+def _scheduler_options():
+    """GreedyScheduler settings from the environment"""
+    from core.algorithms.scheduler import GreedyScheduler
+    return {
+        'duration_percentile': float(os.environ['DURATION_PERCENTILE']) if os.environ.get('DURATION_PERCENTILE') else None,
+        'placement': os.environ.get('SCHEDULER_PLACEMENT', GreedyScheduler.EARLIEST_FIT),
+        'aging_rate': float(os.environ.get('WAITLIST_AGING_RATE', GreedyScheduler.AGING_RATE))
+    }
+
+
+def new_scheduler():
+    from core.algorithms.scheduler import GreedyScheduler
+    return GreedyScheduler(duration_estimator=get_duration_estimator(), **_scheduler_options())
+
+
+def get_external_blocks():
+    from services.calendar_import import ExternalBlockStore
+    return _service('external_blocks', ExternalBlockStore)
+
+
+def get_recurrence_cache():
+    """Parsed and expanded recurring tasks per user and data version"""
+    from core.algorithms.recurrence import RecurrenceCache
+    return _service('recurrence_cache', RecurrenceCache)
+
+
+def get_waitlist_store():
+    """Waitlisted tasks carried over into later scheduling runs"""
+    from services.waitlist_store import WaitlistStore
+    return _service('waitlist_store', WaitlistStore)
+
+
+def get_quality_store():
+    """Per-run schedule quality metrics"""
+    from services.quality_store import QualityStore
+    return _service('quality_store', QualityStore)
+
+
+def _debounce_seconds():
+    return float(os.environ.get('SCHEDULE_DEBOUNCE_SECONDS', 2))
+
+
+def get_single_flight():
+    """Coalesces identical concurrent schedule runs (SCHEDULE_LOCK_DIR adds a cross-process lock)"""
+    from services.single_flight import SingleFlight
+    return _service('single_flight', lambda: SingleFlight(
+        debounce_seconds=_debounce_seconds(),
+        lock_dir=os.environ.get('SCHEDULE_LOCK_DIR') or None
+    ))
+
+
+def get_schedule_service():
+    from services.schedule_service import ScheduleService
+    return _service('schedule_service', lambda: ScheduleService(
+        get_db(),
+        new_scheduler,
+        data_versions=get_data_versions(),
+        external_blocks=get_external_blocks(),
+        recurrence=get_recurrence_cache(),
+        waitlist=get_waitlist_store(),
+        quality=get_quality_store(),
+        single_flight=get_single_flight()
+    ))
+
+
+def get_scenario_executor():
+    """Process pool for what-if scheduling scenarios (CPU-bound, so not threads)"""
+    def build():
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        # Spawned, not forked: this process has worker threads and open
+        # SQLite connections
+        return ProcessPoolExecutor(
+            max_workers=int(os.environ.get('SCENARIO_WORKERS', min(4, os.cpu_count() or 1))),
+            mp_context=multiprocessing.get_context('spawn')
+        )
+    return _service('scenario_executor', build)
+
+
+def _run_generate_schedule_job(user_id, payload):
+    from services.metrics import route_context
+    from services.query_profiler import ENABLED, profiling
+
+    with route_context('job:generate_schedule'), \
+            (profiling('job:generate_schedule') if ENABLED else nullcontext()):
+        return get_schedule_service().generate(
+            user_id,
+            payload.get('chronotype', 'Early'),
+            date.fromisoformat(payload['date']),
+            placement=payload.get('placement')
+        )
+
+
+def get_job_queue():
+    """Background workers for slow operations such as schedule generation"""
+    from services.job_queue import JobQueue
+
+    def build():
+        queue = JobQueue(
+            workers=int(os.environ.get('JOB_WORKERS', 2)),
+            per_user_limit=int(os.environ.get('JOB_PER_USER_LIMIT', 1))
+        )
+        queue.register('generate_schedule', _run_generate_schedule_job)
+
+        from services.metrics import REGISTRY
+        REGISTRY.gauge('timely_job_queue_depth', 'Queued background jobs', queue.depth)
+        REGISTRY.gauge('timely_jobs_running', 'Running background jobs', queue.running)
+        # Picks up jobs left queued by a previous process
+        queue.start()
+        return queue
+
+    return _service('job_queue', build)
+
+
+@route('/')
 def home():
     if 'user_id' in session:
         return redirect(url_for('dashboard'))
     return redirect(url_for('login'))
 
-@app.route('/login', methods=['GET', 'POST'])
+@route('/login', methods=['GET', 'POST'])
 def login():
+    db = get_db()
     if request.method == 'POST':
         email = request.form['email']
         password = request.form['password']
@@ -50,10 +263,11 @@ def login():
         except Exception as e:
             flash(f'Login failed: {str(e)}', 'error')
 
-    return render_template('login.html')
+    return render('login.html')
 
-@app.route('/register', methods=['GET', 'POST'])
+@route('/register', methods=['GET', 'POST'])
 def register():
+    db = get_db()
     if request.method == 'POST':
         email = request.form['email']
         password = request.form['password']
@@ -67,44 +281,98 @@ def register():
         except Exception as e:
             flash(f'Registration failed: {str(e)}', 'error')
 
-    return render_template('register.html')
+    return render('register.html')
 
-@app.route('/logout')
+@route('/logout')
 def logout():
     session.clear()
     return redirect(url_for('login'))
 
-@app.route('/dashboard')
+@route('/dashboard')
 def dashboard():
     if 'user_id' not in session:
         return redirect(url_for('login'))
 
+    db = get_db()
+
     # Get today's scheduled tasks
     try:
-        schedules = db.get_client().table('schedules') \
-            .select('*, tasks(name, priority), regularTasks(name, length)') \
-            .eq('user_id', session['user_id']) \
-            .eq('date', date.today().isoformat()) \
-            .order('start_time') \
-            .execute()
+        schedules = db.execute_read(
+            db.get_client().table('schedules') \
+                .select('*, tasks(name, priority), regularTasks(name, length)') \
+                .eq('user_id', session['user_id']) \
+                .eq('date', date.today().isoformat()) \
+                .order('start_time')
+        )
         
-        tasks = db.get_client().table('tasks').select('*').eq('user_id', session['user_id']).execute()
-        regular_tasks = db.get_client().table('regularTasks').select('*').eq('userId', session['user_id']).execute()
-
-        return render_template('dashboard.html', 
-                               schedules=schedules.data if schedules.data else [], 
-                               tasks=tasks.data if tasks.data else [], 
-                               regular_tasks=regular_tasks.data if regular_tasks.data else [],
-                               today=date.today())
+        tasks = db.execute_read(db.get_client().table('tasks').select('*').eq('user_id', session['user_id']))
+        regular_tasks = db.execute_read(db.get_client().table('regularTasks').select('*').eq('userId', session['user_id']))
+
+        # Drop the old cookie-based state if this session still carries it
+        session.pop('completed_tasks', None)
+        completed = get_completion_store().get(session['user_id'], date.today())
+        started = get_task_starts().started(session['user_id'])
+
+        return render('dashboard.html',
+                      schedules=schedules.data if schedules.data else [],
+                      tasks=tasks.data if tasks.data else [],
+                      regular_tasks=regular_tasks.data if regular_tasks.data else [],
+                      completed_tasks=completed,
+                      started_tasks=started,
+                      today=date.today())
     except Exception as e:
         flash(f'Error loading dashboard: {str(e)}', 'error')
-        return render_template('dashboard.html', schedules=[], tasks=[], today=date.today())
+        return render('dashboard.html', schedules=[], tasks=[], completed_tasks=set(), started_tasks={},
+                      today=date.today())
+
+def _regular_task_conflicts(db, task, days=7):
+    """
+    Overlaps of a new regular task with the user's other regular tasks over
+    the next ``days`` days
 
-@app.route('/create_task', methods=['GET', 'POST'])
+    The other rules come from the recurrence cache, so this costs no
+    round-trip while the user's data version is unchanged. Overlaps with
+    stored schedule rows are left to the conflict audit job
+    (services.conflict_audit): the next schedule run places tasks around
+    the new regular task anyway.
+
+    Returns:
+        list: (date, other name, overlap start minute, overlap end minute)
+    """
+    from core.algorithms.conflicts import day_conflicts
+
+    user_id = session['user_id']
+    start = date.today()
+    end = start + timedelta(days=days - 1)
+    own_days = {day: (day_start, day_end) for day, day_start, day_end in task.occurrences(start, end)}
+    if not own_days:
+        return []
+
+    regular = get_recurrence_cache().occurrences(
+        user_id,
+        get_data_versions().get(user_id),
+        start,
+        end,
+        lambda: db.execute_read(db.get_client().table('regularTasks').select('*').eq('userId', user_id)).data
+    )
+
+    found = []
+    for day, (day_start, day_end) in sorted(own_days.items()):
+        conflicts = day_conflicts(regular_occurrences=regular[day] + [(day_start, day_end, task)])
+        for first, second, overlap_start, overlap_end in conflicts:
+            if first[1] is task or second[1] is task:
+                _, other = second if first[1] is task else first
+                found.append((day, other.name, overlap_start, overlap_end))
+    return found
+
+
+@route('/create_task', methods=['GET', 'POST'])
 def create_task():
     if 'user_id' not in session:
         return redirect(url_for('login'))
 
+    db = get_db()
+
     if request.method == 'POST':
         is_regular = request.form.get('isRegular')
 
@@ -114,15 +382,27 @@ def create_task():
                     'user_id': session['user_id'],
                     'name': request.form['name'],
                     'length': float(request.form['length']),
-                    'start_time': request.form['start_time']
+                    'start_time': request.form['start_time'],
+                    'recurrence': request.form.get('recurrence', 'daily'),
+                    'recurrence_days': request.form.getlist('recurrence_days') or None,
+                    'recurrence_interval': request.form.get('recurrence_interval') or 1,
+                    'recurrence_start': request.form.get('recurrence_start') or (
+                        date.today() if request.form.get('recurrence') == 'interval' else None)
                 }
 
                 task = RegularTask(**reg_task_data)
+                conflicts = _regular_task_conflicts(db, task)
 
                 response = db.get_client().table('regularTasks').insert(task.to_dict()).execute()
 
                 if response.data:
+                    get_data_versions().bump(session['user_id'])
                     flash('Regular task created successfully!', 'success')
+                    for day, other, start, end in conflicts[:3]:
+                        flash(f'Overlaps {other} on {day:%a %d %b} ({format_time(start)[:5]}-{format_time(end)[:5]})',
+                              'warning')
+                    if len(conflicts) > 3:
+                        flash(f'...and {len(conflicts) - 3} more overlaps in the next week', 'warning')
                     return redirect(url_for('dashboard'))
                 else:
                     flash('Failed to create task', 'error')
@@ -137,7 +417,10 @@ def create_task():
                     'name': request.form['name'],
                     'effort': int(request.form['effort']),
                     'urgency': int(request.form['urgency']),
-                    'length': float(request.form['length'])
+                    'length': float(request.form['length']),
+                    'splittable': request.form.get('splittable') == 'true',
+                    'min_chunk': request.form.get('min_chunk') or None,
+                    'max_chunks': request.form.get('max_chunks') or None
                 }
 
                 # Validate using our Task model
@@ -147,6 +430,7 @@ def create_task():
                 response = db.get_client().table('tasks').insert(task.to_dict()).execute()
 
                 if response.data:
+                    get_data_versions().bump(session['user_id'])
                     flash('Task created successfully!', 'success')
                     return redirect(url_for('dashboard'))
                 else:
@@ -155,193 +439,167 @@ def create_task():
             except Exception as e:
                 flash(f'Error creating task: {str(e)}', 'error')
 
-    return render_template('create_tasks.html')
+    return render('create_tasks.html')
+
+@route('/import_tasks', methods=['POST'])
+def import_tasks():
+    """
+    Bulk import tasks and regular tasks from an uploaded CSV or JSON file
+    (field 'file'), or from a raw text/csv, application/json or
+    application/x-ndjson request body.
+    """
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not logged in'}), 401
+
+    from services.task_import import TaskImporter, iter_csv_rows, iter_json_rows
+
+    upload = request.files.get('file')
+    if upload is not None:
+        stream = upload.stream
+        is_json = upload.filename.lower().endswith(('.json', '.ndjson', '.jsonl')) or \
+            upload.mimetype in ('application/json', 'application/x-ndjson')
+    else:
+        stream = request.stream
+        is_json = request.mimetype in ('application/json', 'application/x-ndjson')
+
+    rows = iter_json_rows(stream) if is_json else iter_csv_rows(stream)
+    summary = TaskImporter(get_db()).import_rows(rows, session['user_id'])
+
+    # Chunks before a failure are committed, so plans must see them either way
+    if summary['imported_tasks'] or summary['imported_regular_tasks']:
+        get_data_versions().bump(session['user_id'])
+
+    if 'error' in summary:
+        summary['error'] = f"Import failed: {summary['error']}"
+        return jsonify(summary), 400
+    return jsonify(summary)
+
+@route('/import_calendar', methods=['POST'])
+def import_calendar():
+    """Import external commitments from an uploaded .ics file as fixed blocks"""
+    if 'user_id' not in session:
+        return redirect(url_for('login'))
+
+    upload = request.files.get('file')
+    if upload is None or not upload.filename:
+        flash('Please choose an .ics file to import', 'error')
+        return redirect(url_for('dashboard'))
+
+    try:
+        summary = get_external_blocks().import_ics(
+            upload.stream,
+            session['user_id'],
+            horizon_days=int(request.form.get('horizon_days') or 0) or None
+        )
+        get_data_versions().bump(session['user_id'])
+        flash(f'Imported {summary["events"]} calendar events as {summary["blocks"]} blocked time slots.', 'success')
+    except Exception as e:
+        flash(f'Error importing calendar: {str(e)}', 'error')
+
+    return redirect(url_for('dashboard'))
 
-@app.route('/generate_schedule', methods=['POST'])
+@route('/generate_schedule', methods=['POST'])
 def generate_schedule():
+    """Queue schedule generation and return the job id without waiting for it"""
     if 'user_id' not in session:
         return jsonify({'error': 'Not logged in'}), 401
 
     try:
-        print("=== STEP 1: Fetching tasks ===")
-        # Get user's tasks
-        tasks_response = db.get_client().table('tasks').select('*').eq('user_id', session['user_id']).execute()
-        regular_tasks_response = db.get_client().table('regularTasks').select('*').eq('userId', session['user_id']).execute()
-
-        print(f"Tasks response: {tasks_response.data}")
-        print(f"Regular tasks response: {regular_tasks_response.data}")
-
-        if not tasks_response.data:
-            return jsonify({'error': 'No tasks found. Please create tasks first.'}), 400
-
-        print("=== STEP 2: Converting to Task objects + building regular entries ===")
-        # Convert to Task objects
-        tasks = []
-        for task_data in tasks_response.data:
-            print(f"Processing task: {task_data}")
-            task = Task(
-                task_id=task_data['task_id'],
-                user_id=task_data['user_id'],
-                name=task_data['name'],
-                effort=task_data['effort'],
-                urgency=task_data['urgency'],
-                length=task_data['length'],
-                priority=task_data.get('priority')
-                
-            )
-            print(f"Created Task object: priority={task.priority}")
-            tasks.append(task)
+        payload = {
+            'chronotype': session.get('chronotype', 'Early'),
+            'date': date.today().isoformat(),
+            # Identical requests while one is queued or running share its job
+            'version': get_data_versions().get(session['user_id'])
+        }
+        # Optional per-run placement policy ('earliest' or 'best_fit')
+        placement = request.values.get('placement')
+        if placement:
+            from core.algorithms.scheduler import GreedyScheduler
+            if placement not in GreedyScheduler.PLACEMENTS:
+                return jsonify({'error': f"Unknown placement policy '{placement}'"}), 400
+            payload['placement'] = placement
+
+        job_id = get_job_queue().submit('generate_schedule', session['user_id'], payload, coalesce=True)
+    except Exception as e:
+        return jsonify({'error': str(e), 'error_type': type(e).__name__}), 500
 
-        # Build regular task schedule entries
-        regular_tasks = []
-        reg_schedule_entry = []
+    if request.accept_mimetypes.best == 'application/json':
+        return jsonify({
+            'job_id': job_id,
+            'status_url': url_for('job_status', job_id=job_id)
+        }), 202
 
-        for reg_task_data in regular_tasks_response.data:
-            print(f"Processing regular task: {reg_task_data}")
-            
-            reg_task = RegularTask(
-                regular_task_id=reg_task_data['regularTaskId'],
-                user_id=reg_task_data['userId'],
-                name=reg_task_data['name'],
-                length=reg_task_data['length'],
-                start_time=reg_task_data['start_time']
-            )
-            regular_tasks.append(reg_task)
-            
-            # Build schedule entry
-            start_time_obj = datetime.strptime(reg_task.start_time, '%H:%M:%S').time()
-            end_minutes = (start_time_obj.hour * 60 + start_time_obj.minute) + int(reg_task.length * 60)
-            
-            reg_schedule_entry.append({
-                'user_id': session['user_id'],
-                'task_id': None,
-                'regular_task_id': reg_task.regular_task_id,
-                'start_time': start_time_obj.isoformat(),
-                'end_time': time(end_minutes // 60, end_minutes % 60).isoformat(),
-                'date': date.today().isoformat(),
-                'is_regular_task': True
-            })
-
-        print("=== STEP 3: Fetching existing schedules ===")
-        # Get existing schedule for today
-        existing_schedules = []
-        schedule_response = db.get_client().table('schedules').select('*').eq('user_id', 
-            session['user_id']).eq('date', date.today().isoformat()).execute()
+    flash('Generating schedule...', 'success')
+    return redirect(url_for('dashboard', job=job_id))
 
-        print(f"Existing schedules: {schedule_response.data}")
-
-        if schedule_response.data:
-            for sched_data in schedule_response.data:
-                try:
-                    existing_schedules.append(Schedule(
-                        schedule_id=sched_data['schedule_id'],
-                        user_id=sched_data['user_id'],
-                        task_id=sched_data['task_id'],
-                        #task_name=sched_data['task_name'],
-                        start_time=datetime.fromisoformat(sched_data['start_time']).time(),
-                        end_time=datetime.fromisoformat(sched_data['end_time']).time(),
-                        date=datetime.fromisoformat(sched_data['date']).date()
-                    ))
-                except Exception as e:
-                    print(f"Error parsing schedule: {e}, data: {sched_data}")
-                    continue
-
-        print("=== STEP 4: Scheduling regular tasks ===")
-        # First schedule regular tasks at their preferred times
-        for reg_task in regular_tasks:
-            if reg_task.length is None or reg_task.start_time is None:
-                print(f"Skipping regular task {reg_task.name}: missing length or start_time")
-                continue
-            try:
-                scheduler.add_regular_task(
-                    reg_task,
-                    reg_task.start_time,
-                    reg_task.length,
-                    date.today()
-                )
-                # Fix: Align this print statement with the scheduler call above
-                print(f"Scheduled regular task: {reg_task.name} at {reg_task.start_time}")
-            except Exception as e:
-                print(f"Error scheduling regular task {reg_task.name}: {str(e)}")
-                
+@route('/api/scenarios', methods=['POST'])
+def api_scenarios():
+    """
+    Compare scheduling variants for today in one round-trip
+
+    Body: {"scenarios": [{"name", "weights": [w1, w2, w3], "chronotype",
+    "placement"}, ...]}, every field optional. Nothing is stored.
+    """
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not logged in'}), 401
+
+    from core.algorithms.scenarios import parse_scenario, MAX_SCENARIOS
+    from services.schedule_service import NoTasksError
+
+    body = request.get_json(silent=True) or {}
+    raw_scenarios = body.get('scenarios') or []
+    if not 1 <= len(raw_scenarios) <= MAX_SCENARIOS:
+        return jsonify({'error': f'Send between 1 and {MAX_SCENARIOS} scenarios'}), 400
+    try:
+        scenarios = [parse_scenario(raw, index) for index, raw in enumerate(raw_scenarios)]
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
 
-        print("=== STEP 5: Running scheduler ===")
-        # Generate schedule using greedy algorithm
-        scheduled, waitlist = scheduler.schedule_tasks(
-            tasks,
+    try:
+        result = get_schedule_service().evaluate_scenarios(
+            session['user_id'],
             session.get('chronotype', 'Early'),
             date.today(),
-            existing_schedules
+            scenarios,
+            executor=get_scenario_executor()
         )
+    except NoTasksError as e:
+        return jsonify({'error': str(e)}), 404
+    except Exception as e:
+        return jsonify({'error': str(e), 'error_type': type(e).__name__}), 500
 
-        print(f"Scheduled: {len(scheduled)} tasks")
-        print(f"Waitlist: {len(waitlist)} tasks")
-        print(f"Scheduled entries: {scheduled}")
-
-        print("=== STEP 6: Building schedule entries ===")
-        # Build schedule entries
-        schedule_entries = []
-        for entry in scheduled:
-            print(f"Entry: {entry}")
-            print(f"Task: {entry['task']}")
-            print(f"Task ID: {entry['task'].task_id}")
-            
-            schedule_entry = {
-                'user_id': session['user_id'],
-                'task_id': entry['task'].task_id,
-                #'task_name': entry['task'].name,
-                'start_time': entry['start_time'].isoformat(),
-                'end_time': entry['end_time'].isoformat(),
-                'date': entry['date'].isoformat(),
-                'is_regular_task': False
-            }
-            print(f"Built schedule entry: {schedule_entry}")
-            schedule_entries.append(schedule_entry)
-
-        print("=== STEP 7: Inserting into database ===")
-        all_schedule_entries = schedule_entries + reg_schedule_entry
-        if all_schedule_entries:
-
-            clear_existing = db.get_client().table('schedules').delete().eq('user_id', 
-                session['user_id']).eq('date', date.today().isoformat()).execute()
-            print(f"Cleared existing schedules: {clear_existing}")
-
-            print(f"Inserting {len(all_schedule_entries)} entries")
-            print(f"Entry data: {all_schedule_entries}")
-            
-            # Insert new schedules
-            insert_response = db.get_client().table('schedules').insert(all_schedule_entries).execute()
-            
-            print(f"Insert response: {insert_response}")
-            print(f"Insert response data: {insert_response.data}")
-            
-            if not insert_response.data:
-                raise Exception("Database insertion returned no data")
-        else:
-            print("No schedule entries to insert")
+    return jsonify(result)
 
-        print("=== SUCCESS ===")
-        flash(f'Schedule generated! Successfully scheduled {len(scheduled)} tasks.', 'success')
-        return redirect(url_for('dashboard'))
-        
+@route('/jobs/<job_id>')
+def job_status(job_id):
+    """Status and result of a background job"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not logged in'}), 401
 
-    except Exception as e:
-        print(f"=== ERROR ===")
-        print(f"Error type: {type(e).__name__}")
-        print(f"Error message: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        
-        return jsonify({
-            'error': str(e),
-            'error_type': type(e).__name__
-        }), 500
+    queue = get_job_queue()
+    job = queue.get(job_id)
+    if job is None or job['user_id'] != session['user_id']:
+        return jsonify({'error': 'Job not found'}), 404
 
-@app.route('/export_csv')
+    job['queue_depth'] = queue.depth()
+    return jsonify(job)
+
+@route('/jobs')
+def job_stats():
+    """Queue depth and running job count for this host"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not logged in'}), 401
+
+    queue = get_job_queue()
+    return jsonify({'queue_depth': queue.depth(), 'running': queue.running()})
+
+@route('/export_csv')
 def export_csv():
     if 'user_id' not in session:
         return redirect(url_for('login'))
 
+    db = get_db()
+
     try:
         # Get user's schedule for today
         response = db.get_client().table('schedules').select('*').eq('user_id', 
@@ -384,32 +642,66 @@ def export_csv():
         flash(f'Error exporting CSV: {str(e)}', 'error')
         return redirect(url_for('dashboard'))
 
-@app.route('/delete_task/<task_id>', methods=['POST'])
+@route('/delete_task/<task_id>', methods=['POST'])
 def delete_task(task_id):
     if 'user_id' not in session:
         return jsonify({'error': 'Not logged in'}), 401
 
     try:
-        # Delete schedules pointing to standard tasks
-        db.get_client().table('schedules').delete().eq('task_id', task_id).execute()
-        # Delete schedules pointing to regular tasks
-        db.get_client().table('schedules').delete().eq('regular_task_id', task_id).execute()
-        # Delete the tasks 
-        db.get_client().table('tasks').delete().eq('task_id', task_id).execute()
-        db.get_client().table('regularTasks').delete().eq('regularTaskId', task_id).execute()
-
-        flash('Task deleted successfully.')
+        summary = get_task_deleter().delete(session['user_id'], [task_id])
+        result = summary['results'][0]
+        if result['status'] == 'error':
+            return jsonify({'error': result['error']}), 500
+        if summary['deleted']:
+            get_data_versions().bump(session['user_id'])
+            flash('Task deleted successfully.')
+        else:
+            flash('Task not found', 'error')
         return redirect(url_for('dashboard'))
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@route('/api/tasks/delete', methods=['POST'])
+def api_delete_tasks():
+    """
+    Delete many tasks and regular tasks with their schedules
+
+    Body: {"ids": [...]}. Returns per-id outcomes.
+    """
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not logged in'}), 401
+
+    body = request.get_json(silent=True) or {}
+    ids = body.get('ids')
+    if not isinstance(ids, list) or not ids:
+        return jsonify({'error': 'ids must be a non-empty list'}), 400
 
-@app.route('/complete_task/<schedule_id>', methods=['POST'])
+    try:
+        summary = get_task_deleter().delete(session['user_id'], ids)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+    if summary['deleted']:
+        get_data_versions().bump(session['user_id'])
+    return jsonify(summary), 207 if summary['errors'] else 200
+
+
+@route('/start_task/<schedule_id>', methods=['POST'])
+def start_task(schedule_id):
+    """Record when the user actually starts a scheduled task"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not logged in'}), 401
+
+    get_task_starts().start(session['user_id'], schedule_id)
+    return redirect(url_for('dashboard'))
+
+@route('/complete_task/<schedule_id>', methods=['POST'])
 def complete_task(schedule_id):
     """Record task completion in history"""
     if 'user_id' not in session:
         return jsonify({'error': 'Not logged in'}), 401
-    
+
+    db = get_db()
     try:
         # Get schedule details
         sched_response = db.get_client().table('schedules').select(
@@ -420,21 +712,43 @@ def complete_task(schedule_id):
             return jsonify({'error': 'Schedule not found'}), 404
         
         schedule = sched_response.data[0]
-        
+
+        # Measured times when the user pressed Start; the scheduled slot otherwise
+        completed_at = datetime.now()
+        started_at = get_task_starts().finish(session['user_id'], schedule_id)
+        if started_at is not None and started_at < completed_at:
+            start_time, end_time, day = started_at.time(), completed_at.time(), started_at.date()
+        else:
+            started_at = None
+            start_time = time.fromisoformat(schedule['start_time'])
+            end_time = time.fromisoformat(schedule['end_time'])
+            day = datetime.fromisoformat(schedule['date']).date()
+
         # Record to history
-        success = history_service.record_task_completion(
+        success = get_history_service().record_task_completion(
             user_id=session['user_id'],
             task_id=schedule['task_id'],
-            start_time=time.fromisoformat(schedule['start_time']),
-            end_time=time.fromisoformat(schedule['end_time']),
-            date_obj=datetime.fromisoformat(schedule['date']).date()
+            start_time=start_time,
+            end_time=end_time,
+            date_obj=day
         )
         
         if success:
-            completed = session.get('completed_tasks', [])
-            completed.append(schedule_id)
-            session['completed_tasks'] = completed
-            session.modified = True
+            # Only measured durations train the model: the planned slot is
+            # often its own earlier prediction
+            if started_at is not None and schedule.get('tasks') and schedule['tasks'].get('name'):
+                get_duration_estimator().observe(
+                    session['user_id'],
+                    schedule['tasks']['name'],
+                    (completed_at - started_at).total_seconds() / 3600,
+                    completed_at
+                )
+
+            get_completion_store().add(
+                session['user_id'],
+                datetime.fromisoformat(schedule['date']).date(),
+                schedule_id
+            )
             flash('Task marked as complete!', 'success')
         else:
             flash('Failed to record completion', 'error')
@@ -446,7 +760,7 @@ def complete_task(schedule_id):
         return redirect(url_for('dashboard'))
     
 
-@app.route('/history')
+@route('/history')
 def view_history():
     """Display task history to user"""
     if 'user_id' not in session:
@@ -454,49 +768,54 @@ def view_history():
     
     try:
         # Get history for last 90 days (Objective 3b)
-        history = history_service.get_task_history(
+        history = get_history_service().get_task_history(
             user_id=session['user_id'],
             limit=50  # Objective 3a
         )
         
         # Get total count for display
-        total_count = history_service.get_history_count(session['user_id'])
+        total_count = get_history_service().get_history_count(session['user_id'])
         
         # Get most frequent tasks (Objective 5)
-        task_freq = history_service.get_task_frequency(session['user_id'])
+        task_freq = get_history_service().get_task_frequency(session['user_id'])
         recommended = []
         sorted_tasks = sorted(task_freq.items(), key=lambda x: x[1]['count'], reverse=True)[:5]
         for name, data in sorted_tasks:
             recommended.append((name, data['count'], data['task_id']))
         
-        return render_template('history.html', 
-                             history=history,
-                             total_count=total_count,
-                             recommended_tasks=recommended)
+        return render('history.html',
+                      history=history,
+                      total_count=total_count,
+                      recommended_tasks=recommended)
     
     except Exception as e:
         flash(f'Error loading history: {str(e)}', 'error')
-        return render_template('history.html', history=[], total_count=0)
+        return render('history.html', history=[], total_count=0)
 
-@app.route('/admin/cleanup_history', methods=['POST'])
-def cleanup_old_history():
-    """
-    Maintenance endpoint for automated cleanup.
-    Objective 3b: Remove records older than 90 days.
-    """
+@route('/metrics')
+def metrics():
+    """Prometheus text-format metrics for this worker process"""
+    from services.metrics import REGISTRY
+
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+@route('/db_stats')
+def db_stats():
+    """Per-process connection counters, used to size worker pools"""
     if 'user_id' not in session:
         return jsonify({'error': 'Not authorized'}), 401
-    
-    success = history_service.delete_old_history(session['user_id'], days=90)
-    
-    return jsonify({'success': success})
 
-@app.route('/add_again/<task_id>', methods=['POST'])
+    db = get_db()
+
+    return jsonify(db.get_stats())
+
+@route('/add_again/<task_id>', methods=['POST'])
 def add_again(task_id):
     """Add a recommended task again for the user"""
     if 'user_id' not in session:
         return redirect(url_for('login'))
-    
+
+    db = get_db()
     try:
         # Fetch task details
         task_response = db.get_client().table('tasks').select('*')\
@@ -521,6 +840,7 @@ def add_again(task_id):
         insert_response = db.get_client().table('tasks').insert(new_task).execute()
         
         if insert_response.data:
+            get_data_versions().bump(session['user_id'])
             flash(f'Task "{task_data["name"]}" added again!', 'success')
         else:
             flash('Failed to add task', 'error')
@@ -531,51 +851,192 @@ def add_again(task_id):
         flash(f'Error adding task: {str(e)}', 'error')
         return redirect(url_for('view_history'))
     
-@app.route('/adjust_task/<task_id>', methods = ['POST'])
+@route('/adjust_task/<task_id>', methods = ['POST'])
 def adjust_task(task_id):
     if 'user_id' not in session:
         return redirect(url_for('login'))
     
     try:
-        task = db.get_client().table('tasks').select('*')\
-        .eq('user_id', session['user_id'])\
-        .eq('task_id', task_id).execute()
+        outcome = get_task_updater().update(session['user_id'], task_id, {
+            'effort': request.form['effort'],
+            'urgency': request.form['urgency'],
+            'length': request.form['length']
+        })
 
-        if not task.data:
+        if outcome is None:
             flash('Task not found', 'error')
             return '<script>window.opener.location.reload(); window.close();</script>'
-        
-        task_data = task.data[0]
-
-        new_task = {
-            'user_id': session['user_id'],
-            'name': task_data['name'],
-            'effort': int(request.form['effort']),
-            'urgency': int(request.form['urgency']),
-            'length': float(request.form['length'])
-        }
 
-        insert = db.get_client().table('tasks').insert(new_task).execute()
-        delete = db.get_client().table('tasks').delete()\
-        .eq('user_id', session['user_id'])\
-        .eq('task_id', task_id).execute()
-
-        if insert.data:
-            flash(f'task {task_data["name"]} adjusted', 'sucess')
-        else:
-            flash('Failed to adjust task', 'error')
+        if outcome['changed']:
+            get_data_versions().bump(session['user_id'])
+        flash(f'task {outcome["task"]["name"]} adjusted', 'success')
+        if outcome['needs_reschedule']:
+            flash('This task is already scheduled. Regenerate your schedule to apply the change.', 'warning')
 
         return '<script>window.opener.location.reload(); window.close();</script>'
     
     except Exception as e:
         flash(f'Error adjusting task: {str(e)}', 'error')
         return '<script>window.opener.location.reload(); window.close();</script>'
+
+@route('/api/tasks/<task_id>', methods=['PATCH'])
+def api_update_task(task_id):
+    """
+    Change only the supplied fields of a task, keeping its id
+
+    Body: any of name, effort, urgency, length, splittable, min_chunk,
+    max_chunks. The response says whether the current schedule needs
+    regenerating.
+    """
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not logged in'}), 401
+
+    patch = request.get_json(silent=True)
+    if not isinstance(patch, dict) or not patch:
+        return jsonify({'error': 'Send a JSON object with the fields to change'}), 400
+
+    try:
+        outcome = get_task_updater().update(session['user_id'], task_id, patch)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+    if outcome is None:
+        return jsonify({'error': 'Task not found'}), 404
+    if outcome['changed']:
+        get_data_versions().bump(session['user_id'])
+    return jsonify(outcome)
     
-@app.route('/adjust_task_popup/<task_id>')
+def _conditional_json(resource, *parts, loader):
+    """
+    Serve JSON with a strong ETag derived from the user's data version.
+
+    If-None-Match is answered with 304 before any database query; otherwise
+    loader() is called to build the payload.
+    """
+    etag, not_modified = get_data_versions().conditional(
+        session['user_id'], request.headers.get('If-None-Match'), resource, *parts
+    )
+
+    if not_modified:
+        response = Response(status=304)
+    else:
+        response = jsonify(loader())
+
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+@route('/api/schedule')
+def api_schedule():
+    """
+    Schedule entries for a date range.
+
+    Query params:
+        start: YYYY-MM-DD (default today)
+        end: YYYY-MM-DD inclusive (default start, or start + 6 days for view=week)
+    """
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not logged in'}), 401
+
+    start = date.today()
+    if request.args.get('start'):
+        valid, start = validate_date(request.args['start'])
+        if not valid:
+            return jsonify({'error': start}), 400
+
+    end = start + timedelta(days=6 if request.args.get('view') == 'week' else 0)
+    if request.args.get('end'):
+        valid, end = validate_date(request.args['end'])
+        if not valid:
+            return jsonify({'error': end}), 400
+
+    if end < start or (end - start).days > 31:
+        return jsonify({'error': 'Range must be 0-31 days with end after start'}), 400
+
+    def load():
+        db = get_db()
+        schedules = db.execute_read(
+            db.get_client().table('schedules') \
+                .select('*, tasks(name, priority), regularTasks(name, length)') \
+                .eq('user_id', session['user_id']) \
+                .gte('date', start.isoformat()) \
+                .lte('date', end.isoformat()) \
+                .order('date') \
+                .order('start_time')
+        )
+        occurrences = get_recurrence_cache().occurrences(
+            session['user_id'],
+            get_data_versions().get(session['user_id']),
+            start,
+            end,
+            lambda: db.execute_read(
+                db.get_client().table('regularTasks').select('*').eq('userId', session['user_id'])
+            ).data
+        )
+        return {
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'schedules': schedules.data or [],
+            'regular_occurrences': [
+                {
+                    'date': day.isoformat(),
+                    'regular_task_id': task.regular_task_id,
+                    'name': task.name,
+                    'start_time': format_time(start_minute),
+                    'end_time': format_time(end_minute)
+                }
+                for day, items in occurrences.items()
+                for start_minute, end_minute, task in items
+            ]
+        }
+
+    return _conditional_json('schedule', start, end, loader=load)
+
+@route('/api/tasks')
+def api_tasks():
+    """The user's tasks and regular tasks"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not logged in'}), 401
+
+    def load():
+        db = get_db()
+        tasks = db.execute_read(db.get_client().table('tasks').select('*').eq('user_id', session['user_id']))
+        regular_tasks = db.execute_read(db.get_client().table('regularTasks').select('*').eq('userId', session['user_id']))
+        return {
+            'tasks': tasks.data or [],
+            'regular_tasks': regular_tasks.data or []
+        }
+
+    return _conditional_json('tasks', loader=load)
+
+@route('/api/schedule_quality')
+def api_schedule_quality():
+    """Stored quality metrics of the user's recent runs (?days=, default 30)"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not logged in'}), 401
+
+    try:
+        days = int(request.args.get('days', 30))
+    except ValueError:
+        return jsonify({'error': 'days must be a number'}), 400
+    if not 1 <= days <= 366:
+        return jsonify({'error': 'days must be 1-366'}), 400
+
+    since = date.today() - timedelta(days=days - 1)
+    store = get_quality_store()
+    return jsonify({
+        'runs': store.history(session['user_id'], since),
+        'summary': store.summary(since, user_id=session['user_id'])
+    })
+
+@route('/adjust_task_popup/<task_id>')
 def adjust_task_popup(task_id):
     if 'user_id' not in session:
         return redirect(url_for('login'))
-    
+
+    db = get_db()
     task = db.get_client().table('tasks').select('*')\
         .eq('user_id', session['user_id'])\
         .eq('task_id', task_id).execute()
@@ -586,11 +1047,14 @@ def adjust_task_popup(task_id):
     
     task_data = task.data[0]
 
-    return render_template('popup.html', task=task_data)
+    return render('popup.html', task=task_data)
 
 
         
 
+# WSGI entry point (gunicorn app:app); services are still created on first use
+app = create_app()
+
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5051)
 
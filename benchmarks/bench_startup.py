@@ -0,0 +1,91 @@
+"""
+Worker startup benchmark.
+
+Measures, in fresh interpreters, how long it takes to import app.py (which
+builds the module-level WSGI app) and to build another app with
+create_app(), lists the slowest imports from
+``python -X importtime`` and checks that heavy modules stay unloaded until a
+request needs them.
+
+Run from the repository root:
+    python benchmarks/bench_startup.py --runs 10
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that must not be imported just by booting a worker
+DEFERRED_MODULES = ['supabase', 'postgrest', 'httpx', 'pydantic']
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+app.create_app()
+created = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported - start) * 1000,
+    'create_app_ms': (created - imported) * 1000,
+    'loaded': [name for name in %r if name in sys.modules],
+}))
+""" % (DEFERRED_MODULES,)
+
+
+def run_probe():
+    output = subprocess.run(
+        [sys.executable, '-c', PROBE], cwd=ROOT, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def slowest_imports(limit):
+    """Parse -X importtime output and return the top cumulative import times"""
+    stderr = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import app'],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    ).stderr
+
+    timings = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, self_us, cumulative_us, module = [part.strip() for part in line.split('|')]
+        timings.append((int(cumulative_us), module))
+    return sorted(timings, reverse=True)[:limit]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark worker import and startup time')
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--top', type=int, default=15, help='Number of slowest imports to list')
+    args = parser.parse_args(argv)
+
+    results = [run_probe() for _ in range(args.runs)]
+    import_ms = [r['import_ms'] for r in results]
+    create_ms = [r['create_app_ms'] for r in results]
+
+    print(f"import app      median {statistics.median(import_ms):7.1f} ms  max {max(import_ms):7.1f} ms")
+    print(f"create_app()    median {statistics.median(create_ms):7.1f} ms  max {max(create_ms):7.1f} ms")
+
+    print("\nSlowest imports (cumulative):")
+    for cumulative_us, module in slowest_imports(args.top):
+        print(f"  {cumulative_us / 1000:7.1f} ms  {module}")
+
+    loaded = results[-1]['loaded']
+    if loaded:
+        print(f"\nFAIL: heavy modules loaded at startup: {', '.join(loaded)}")
+        return 1
+
+    print(f"\nOK: {', '.join(DEFERRED_MODULES)} not loaded at startup")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
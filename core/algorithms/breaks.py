@@ -1,4 +1,3 @@
-from datetime import time, timedelta, datetime
 import math
 
 class BreakInsertion:
@@ -12,19 +11,21 @@ class BreakInsertion:
         Insert Pomodoro breaks into schedule
         
         Args:
-            scheduled_tasks: List of scheduled task dictionaries
+            scheduled_tasks: Scheduler entries ({'task', 'start', 'end', 'date'},
+                timeline minutes)
         
         Returns:
-            List of tasks and breaks combined
+            List of WORK and BREAK segments with 'start'/'end' minutes
         """
         modified_schedule = []
         
         for task_entry in scheduled_tasks:
             task = task_entry['task']
-            start_time = task_entry['start_time']
+            start_time = task_entry['start']
             
-            # Calculate task duration in minutes
-            task_duration = task.length * 60
+            # Calculate task duration in minutes (as placed: a chunk of a
+            # split task, or a predicted length)
+            task_duration = task_entry['end'] - task_entry['start']
             
             # Calculate number of work segments
             num_segments = math.ceil(task_duration / self.WORK_DURATION)
@@ -37,13 +38,13 @@ class BreakInsertion:
                 segment_duration = min(self.WORK_DURATION, remaining_duration)
                 
                 # Add work segment
-                segment_end = self._add_minutes(current_time, segment_duration)
+                segment_end = current_time + segment_duration
                 
                 work_segment = {
                     'type': 'WORK',
                     'task': task,
-                    'start_time': current_time,
-                    'end_time': segment_end,
+                    'start': current_time,
+                    'end': segment_end,
                     'date': task_entry['date']
                 }
                 modified_schedule.append(work_segment)
@@ -53,13 +54,13 @@ class BreakInsertion:
                 
                 # Add break after segment (unless last segment)
                 if i < num_segments - 1 and remaining_duration > 0:
-                    break_end = self._add_minutes(current_time, self.BREAK_DURATION)
+                    break_end = current_time + self.BREAK_DURATION
                     
                     break_segment = {
                         'type': 'BREAK',
                         'task': None,
-                        'start_time': current_time,
-                        'end_time': break_end,
+                        'start': current_time,
+                        'end': break_end,
                         'date': task_entry['date']
                     }
                     modified_schedule.append(break_segment)
@@ -67,12 +68,3 @@ class BreakInsertion:
                     current_time = break_end
         
         return modified_schedule
-    
-    def _add_minutes(self, time_obj, minutes):
-        """Add minutes to a time object"""
-        if isinstance(time_obj, time):
-            # Convert to datetime for arithmetic
-            dt = datetime.combine(datetime.today(), time_obj)
-            dt += timedelta(minutes=minutes)
-            return dt.time()
-        return time_obj
\ No newline at end of file
@@ -0,0 +1,83 @@
+import heapq
+from itertools import groupby
+
+from utils.time_helpers import parse_span
+
+
+def find_conflicts(intervals):
+    """
+    Report every overlapping pair with a sweep line
+
+    Intervals are sorted by start; a min-heap holds the ends of the intervals
+    still active at the sweep position. Each new interval first retires the
+    active ones that ended at or before its start, then overlaps all that
+    remain. O(n log n + k) for k reported pairs.
+
+    Args:
+        intervals: Iterable of (start, end, label) with half-open [start, end)
+            minutes; touching intervals don't conflict
+
+    Returns:
+        list: (label_a, label_b, overlap_start, overlap_end) tuples, label_a
+            being the interval that started first
+    """
+    ordered = sorted(
+        (interval for interval in intervals if interval[1] > interval[0]),
+        key=lambda interval: (interval[0], interval[1])
+    )
+
+    conflicts = []
+    active = []  # (end, index into ordered)
+    for index, (start, end, label) in enumerate(ordered):
+        while active and active[0][0] <= start:
+            heapq.heappop(active)
+
+        for active_end, active_index in active:
+            conflicts.append((ordered[active_index][2], label, start, min(end, active_end)))
+
+        heapq.heappush(active, (end, index))
+    return conflicts
+
+
+def schedule_row_intervals(rows):
+    """(start, end, row) intervals for stored schedule rows (times as stored)"""
+    intervals = []
+    for row in rows:
+        start, end = parse_span(row['start_time'], row['end_time'])
+        intervals.append((start, end, row))
+    return intervals
+
+
+def day_conflicts(schedule_rows=(), regular_occurrences=(), fixed_blocks=()):
+    """
+    All conflicts in one user's day across every source
+
+    Args:
+        schedule_rows: Stored schedules rows for the day
+        regular_occurrences: (start, end, RegularTask) tuples
+        fixed_blocks: (start, end, summary) imported calendar blocks
+
+    Returns:
+        list: (label_a, label_b, overlap_start, overlap_end) where labels are
+            ('schedule', row), ('regular', RegularTask) or ('event', summary)
+    """
+    intervals = [(start, end, ('schedule', row)) for start, end, row in schedule_row_intervals(schedule_rows)]
+    intervals.extend((start, end, ('regular', task)) for start, end, task in regular_occurrences)
+    intervals.extend((start, end, ('event', summary)) for start, end, summary, *_ in fixed_blocks)
+    return find_conflicts(intervals)
+
+
+def partition_conflicts(rows):
+    """
+    Audit schedule rows partitioned by (user_id, date)
+
+    Args:
+        rows: Schedule rows sorted by user_id then date
+
+    Yields:
+        tuple: (user_id, date, conflicts) for partitions with conflicts
+    """
+    for (user_id, day), partition in groupby(rows, key=lambda row: (row['user_id'], row['date'])):
+        conflicts = find_conflicts(schedule_row_intervals(partition))
+        if conflicts:
+            yield user_id, day, conflicts
@@ -6,8 +6,10 @@ import uuid
 class HistoryService:
     """Database operations for task history (Objective 3)"""
     
-    def __init__(self):
-        self.client = SupabaseClient.get_client()
+    @property
+    def client(self):
+        # Looked up per call so forked workers get their own connection pool
+        return SupabaseClient.get_client()
     
     def record_task_completion(self, user_id, task_id, start_time, end_time, date_obj):
         """
@@ -64,7 +66,7 @@ class HistoryService:
             # Limit results (Objective 3a)
             query = query.limit(limit)
             
-            response = query.execute()
+            response = SupabaseClient.execute_read(query)
             
             # Format results
             history = []
@@ -89,8 +91,10 @@ class HistoryService:
     
     def delete_old_history(self, user_id, days=90):
         """
-        Cleanup old history records.
+        Cleanup old history records for a single user.
         Objective 3b: Maintain 90-day retention policy.
+
+        Global retention runs as a batch job, see services/history_retention.py
         """
         cutoff_date = datetime.now() - timedelta(days=days)
         
@@ -118,12 +122,13 @@ class HistoryService:
         
         try:
             # Query with task name filter
-            response = self.client.table('taskHistory').select(
-                'startTime, tasks!inner(name)'
-            ).eq('userId', user_id)\
-             .eq('tasks.name', task_name)\
-             .gte('date', thirty_days_ago.isoformat())\
-             .execute()
+            response = SupabaseClient.execute_read(
+                self.client.table('taskHistory').select(
+                    'startTime, tasks!inner(name)'
+                ).eq('userId', user_id)\
+                 .eq('tasks.name', task_name)\
+                 .gte('date', thirty_days_ago.isoformat())
+            )
             
             if not response.data:
                 return None
@@ -150,9 +155,11 @@ class HistoryService:
         """
         try:
             # Get all history with task names
-            response = self.client.table('taskHistory').select(
-                'tasks(name, task_id)'
-            ).eq('userId', user_id).execute()
+            response = SupabaseClient.execute_read(
+                self.client.table('taskHistory').select(
+                    'tasks(name, task_id)'
+                ).eq('userId', user_id)
+            )
             
             # Count task frequencies
             task_data = {}
@@ -175,9 +182,11 @@ class HistoryService:
         Objective 3a: Verify 50+ entries stored.
         """
         try:
-            response = self.client.table('taskHistory').select(
-                'historyId', count='exact'
-            ).eq('userId', user_id).execute()
+            response = SupabaseClient.execute_read(
+                self.client.table('taskHistory').select(
+                    'historyId', count='exact'
+                ).eq('userId', user_id)
+            )
             
             return response.count
         
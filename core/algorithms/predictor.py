@@ -1,12 +1,150 @@
 from datetime import datetime, timedelta, time
 from collections import Counter
-from history import HistoryService
+from statistics import NormalDist
+import math
+import threading
+from utils.time_helpers import parse_span
+
+
+def validate_percentile(percentile):
+    """
+    Check a duration quantile (None means the mean)
+
+    Raises:
+        ValueError: Unless percentile is None or strictly between 0 and 1
+    """
+    if percentile is not None and not 0 < percentile < 1:
+        raise ValueError(f'Duration percentile must be between 0 and 1 (exclusive), got {percentile}')
+    return percentile
+
+
+class DurationEstimator:
+    """
+    Streaming per-(user, task) duration model.
+
+    Keeps a time-decayed weighted Welford mean/variance for every task so each
+    completion is folded in with O(1) work and predictions never touch the
+    database. Older observations lose half their weight every
+    ``half_life_days``.
+
+    State lives in process memory here; subclasses persist it by overriding
+    ``_read``, ``_update`` and ``clear`` (see services.duration_store).
+    """
+
+    def __init__(self, half_life_days=14, min_samples=3):
+        self.half_life_days = half_life_days
+        self.min_samples = min_samples
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def _key(self, user_id, task_name):
+        return (user_id, task_name.strip().lower())
+
+    def _read(self, key):
+        """Stats list for a key, or None"""
+        return self._stats.get(key)
+
+    def _update(self, key, update):
+        """Atomically replace a key's stats with update(current stats or None)"""
+        with self._lock:
+            self._stats[key] = update(self._stats.get(key))
+
+    def _fold(self, stats, duration_hours, observed_at):
+        """
+        Stats after one more observation
+
+        Args:
+            stats: [weight, mean, m2, samples, last_seen] or None
+            duration_hours: Measured duration in hours
+            observed_at: datetime of the observation
+
+        Returns:
+            list: New stats
+        """
+        if stats is None:
+            return [1.0, float(duration_hours), 0.0, 1, observed_at]
+
+        weight, mean, m2, samples, last_seen = stats
+
+        # Decay accumulated weight since the last observation
+        elapsed_days = (observed_at - last_seen).total_seconds() / 86400
+        if elapsed_days > 0:
+            decay = 0.5 ** (elapsed_days / self.half_life_days)
+            weight *= decay
+            m2 *= decay
+            last_seen = observed_at
+
+        # Weighted Welford update (new observation has weight 1)
+        weight += 1.0
+        delta = duration_hours - mean
+        mean += delta / weight
+        m2 += delta * (duration_hours - mean)
+
+        return [weight, mean, m2, samples + 1, last_seen]
+
+    def observe(self, user_id, task_name, duration_hours, observed_at=None):
+        """
+        Fold one completed duration into the model.
+
+        Args:
+            user_id: Owner of the task
+            task_name: Task name (case-insensitive)
+            duration_hours: Measured duration in hours (how long the task
+                actually took, not its scheduled slot)
+            observed_at: datetime of the completion (defaults to now)
+        """
+        if duration_hours is None or duration_hours <= 0:
+            return
+        observed_at = observed_at or datetime.now()
+        self._update(
+            self._key(user_id, task_name),
+            lambda stats: self._fold(stats, duration_hours, observed_at)
+        )
+
+    def predict(self, user_id, task_name, percentile=None):
+        """
+        Predict the duration of a task in hours.
+
+        Args:
+            user_id: Owner of the task
+            task_name: Task name (case-insensitive)
+            percentile: Optional quantile in (0, 1); None returns the mean
+
+        Returns:
+            float or None: Predicted hours, or None with too little history
+
+        Raises:
+            ValueError: If percentile is outside (0, 1)
+        """
+        validate_percentile(percentile)
+        stats = self._read(self._key(user_id, task_name))
+        if stats is None or stats[3] < self.min_samples:
+            return None
+
+        weight, mean, m2 = stats[0], stats[1], stats[2]
+        if percentile is None:
+            return mean
+
+        std = math.sqrt(max(m2 / weight, 0.0))
+        return max(mean + NormalDist().inv_cdf(percentile) * std, 0.0)
+
+    def sample_count(self, user_id, task_name):
+        stats = self._read(self._key(user_id, task_name))
+        return stats[3] if stats else 0
+
+    def clear(self):
+        with self._lock:
+            self._stats.clear()
+
 
 class TimePrediction:
     """Frequency-based time prediction for recurring tasks"""
     
-    def __init__(self):
+    def __init__(self, duration_estimator=None):
+        from core.algorithms.history import HistoryService
+
         self.history_service = HistoryService()
+        self.duration_estimator = duration_estimator or DurationEstimator()
     
     def predict_start_time(self, task_name, user_id):
         """
@@ -25,6 +163,11 @@ class TimePrediction:
     
     def get_average_duration(self, task_name, user_id):
         """Calculate average duration for a task from history"""
+        # Served from the streaming model once it has enough samples
+        estimate = self.duration_estimator.predict(user_id, task_name)
+        if estimate is not None:
+            return estimate
+
         thirty_days_ago = datetime.now() - timedelta(days=30)
         
         history = self.history_service.get_task_history(
@@ -36,17 +179,13 @@ class TimePrediction:
         if not history:
             return None
         
-        # Calculate durations
+        # History rows hold the scheduled slot, so this is only a rough
+        # fallback; the model itself learns from measured durations
         durations = []
         for entry in history:
-            start = entry['start_time']
-            end = entry['end_time']
-            
-            start_minutes = start.hour * 60 + start.minute
-            end_minutes = end.hour * 60 + end.minute
-            duration_hours = (end_minutes - start_minutes) / 60
-            durations.append(duration_hours)
-        
+            start_minutes, end_minutes = parse_span(entry['start_time'], entry['end_time'])
+            durations.append((end_minutes - start_minutes) / 60)
+
         return sum(durations) / len(durations) if durations else None
     
     def suggest_recommended_tasks(self, user_id, limit=5):
@@ -21,4 +21,23 @@ def calculate_priority(effort, urgency, length, w1=0.3, w2=0.5, w3=0.2):
     
     priority = (effort * w1) + (urgency * w2) + (normalized_length * w3)
     
-    return round(priority, 2)
\ No newline at end of file
+    return round(priority, 2)
+
+def task_priority(effort, urgency, length, w1=0.3, w2=0.5, w3=0.2):
+    
+    #Priority a Task is stored and scheduled with (Task.__init__ uses this)
+    
+    #Unlike calculate_priority, length counts at 10 points per hour, uncapped.
+    #Scenarios re-score with this too, so their default weights reproduce
+    #the live priorities exactly.
+    
+    #Args:
+    #    effort (int): Task effort (1-10)
+    #    urgency (int): Task urgency (1-10)
+    #    length (float): Task length in hours
+    #    w1, w2, w3 (float): Weights
+    
+    #Returns:
+    #    float: Priority score
+    
+    return round((effort * w1) + (urgency * w2) + (length * w3 * 10), 2)
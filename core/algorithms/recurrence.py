@@ -0,0 +1,124 @@
+import logging
+import threading
+from collections import OrderedDict
+
+from core.models.regular_task import RegularTask
+
+logger = logging.getLogger(__name__)
+
+
+class RecurrenceCache:
+    """
+    Parsed recurring tasks and their expansions, per user and data version
+
+    Entries are keyed by (user_id, version), so any edit that bumps the
+    user's data version invalidates them. Each user keeps only the newest
+    version; users are evicted least recently used first. Expansions are
+    memoized per day, so overlapping ranges (a week view, then today's
+    schedule) share work.
+    """
+
+    def __init__(self, max_users=512):
+        self.max_users = max_users
+        # user_id -> {'version', 'tasks', 'days': {date: [(start, end, task)]}}
+        self._users = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def regular_tasks(self, user_id, version, load_rows):
+        """
+        RegularTask objects for a user at a data version
+
+        Args:
+            user_id: User id
+            version: The user's current data version
+            load_rows: Callable returning the user's regularTasks rows; only
+                called on a miss
+
+        Returns:
+            list: RegularTask objects (rows that fail to parse are skipped)
+        """
+        return self._entry(user_id, version, load_rows)['tasks']
+
+    def occurrences(self, user_id, version, start_date, end_date, load_rows):
+        """
+        Occurrences of the user's recurring tasks over [start_date, end_date]
+
+        Returns:
+            dict: {date: [(start minute, end minute, RegularTask), ...]} for
+                every day in the range (sorted by start)
+        """
+        entry = self._entry(user_id, version, load_rows)
+        days = entry['days']
+
+        missing = []
+        day = start_date
+        while day <= end_date:
+            if day not in days:
+                missing.append(day)
+            day = day.fromordinal(day.toordinal() + 1)
+
+        if missing:
+            expanded = {day: [] for day in missing}
+            for task in entry['tasks']:
+                for occurrence_day, start, end in task.occurrences(missing[0], missing[-1]):
+                    if occurrence_day in expanded:
+                        expanded[occurrence_day].append((start, end, task))
+            with self._lock:
+                for day, items in expanded.items():
+                    days[day] = sorted(items, key=lambda item: item[0])
+
+        result = {}
+        day = start_date
+        while day <= end_date:
+            result[day] = days[day]
+            day = day.fromordinal(day.toordinal() + 1)
+        return result
+
+    def _entry(self, user_id, version, load_rows):
+        with self._lock:
+            entry = self._users.get(user_id)
+            if entry is not None and entry['version'] == version:
+                self._users.move_to_end(user_id)
+                self.hits += 1
+                return entry
+            self.misses += 1
+
+        entry = {'version': version, 'tasks': parse_regular_tasks(load_rows()), 'days': {}}
+        with self._lock:
+            current = self._users.get(user_id)
+            # Don't overwrite a newer version loaded concurrently
+            if current is None or current['version'] <= version:
+                self._users[user_id] = entry
+                self._users.move_to_end(user_id)
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+        return entry
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._users.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._users.clear()
+
+
+def parse_regular_tasks(rows):
+    """RegularTask objects for regularTasks rows, skipping invalid ones"""
+    tasks = []
+    for row in rows or []:
+        try:
+            tasks.append(RegularTask.from_row(row))
+        except (ValueError, KeyError, TypeError) as e:
+            logger.warning("Skipping regular task with invalid recurrence: %s, data: %s", e, row)
+    return tasks
+
+
+def occurrences_on(tasks, day):
+    """(start minute, end minute, RegularTask) for the tasks occurring on day, by start"""
+    return sorted(
+        ((start, end, task) for task in tasks for _, start, end in task.occurrences(day, day)),
+        key=lambda item: item[0]
+    )
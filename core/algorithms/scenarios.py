@@ -0,0 +1,153 @@
+"""
+What-if evaluation of scheduling variants.
+
+A scenario re-runs GreedyScheduler.schedule_tasks over one already fetched
+input snapshot with different priority weights, chronotype or placement
+policy, and reports how the day would turn out. Nothing here touches the
+database, so scenarios can run side by side in a thread or process pool
+(everything passed to ``run_scenario`` is picklable).
+"""
+import copy
+
+from core.algorithms.priority import task_priority
+from core.algorithms.scheduler import GreedyScheduler
+from utils.time_helpers import format_time
+
+
+MAX_SCENARIOS = 8
+CHRONOTYPES = ('Early', 'Middle', 'Late')
+
+
+def parse_scenario(raw, index=0):
+    """
+    Validate one scenario from a request body
+
+    Args:
+        raw: dict with optional 'name', 'weights' ([w1, w2, w3] for
+            task_priority), 'chronotype' and 'placement'
+        index: Position in the request, used for the default name
+
+    Returns:
+        dict: Normalized scenario
+
+    Raises:
+        ValueError: If a field is invalid
+    """
+    if not isinstance(raw, dict):
+        raise ValueError(f'Scenario {index + 1} must be an object')
+
+    scenario = {'name': str(raw.get('name') or f'scenario-{index + 1}')}
+
+    weights = raw.get('weights')
+    if weights is not None:
+        if len(weights) != 3:
+            raise ValueError(f"Scenario '{scenario['name']}': weights must be [w1, w2, w3]")
+        weights = tuple(float(weight) for weight in weights)
+        if abs(sum(weights) - 1.0) > 0.001:
+            raise ValueError(f"Scenario '{scenario['name']}': weights must sum to 1")
+        scenario['weights'] = weights
+
+    chronotype = raw.get('chronotype')
+    if chronotype is not None:
+        if chronotype not in CHRONOTYPES:
+            raise ValueError(f"Scenario '{scenario['name']}': unknown chronotype '{chronotype}'")
+        scenario['chronotype'] = chronotype
+
+    placement = raw.get('placement')
+    if placement is not None:
+        if placement not in GreedyScheduler.PLACEMENTS:
+            raise ValueError(f"Scenario '{scenario['name']}': unknown placement policy '{placement}'")
+        scenario['placement'] = placement
+
+    return scenario
+
+
+def _scenario_tasks(tasks, task_lengths, weights):
+    """
+    Shallow copies of the tasks with the scenario's priority and planned length
+
+    Priorities are re-scored from the entered length with task_priority, the
+    formula live tasks use, so weights of [0.3, 0.5, 0.2] reproduce the
+    baseline; the planned (possibly predicted) length is what gets placed.
+    """
+    copies = []
+    for task in tasks:
+        variant = copy.copy(task)
+        if weights is not None:
+            variant.priority = task_priority(task.effort, task.urgency, task.length, *weights)
+        variant.length = task_lengths.get(task.task_id, task.length)
+        copies.append(variant)
+    return copies
+
+
+def run_scenario(inputs, fixed_blocks, day, chronotype, scenario, scheduler_options=None):
+    """
+    Schedule one variant and summarize the outcome
+
+    Args:
+        inputs: ScheduleService.build_inputs() result plus 'task_lengths'
+            ({task_id: planned hours})
+        fixed_blocks: Imported calendar blocks for the day
+        day: Date being scheduled
+        chronotype: The user's chronotype (used unless the scenario sets one)
+        scenario: parse_scenario() result
+        scheduler_options: GreedyScheduler keyword arguments (no estimator;
+            lengths are already planned)
+
+    Returns:
+        dict: name, parameters, scheduled, priority_placed, peak_hit_rate,
+            waitlist, fragmentation, quality and placements
+    """
+    scheduler = GreedyScheduler(**(scheduler_options or {}))
+    chronotype = scenario.get('chronotype', chronotype)
+    placement = scenario.get('placement', scheduler.placement)
+
+    for start_minutes, end_minutes, reg_task in inputs['regular_occurrences']:
+        scheduler.add_regular_task(reg_task, start_minutes, (end_minutes - start_minutes) / 60, day)
+
+    tasks = _scenario_tasks(inputs['tasks'], inputs.get('task_lengths') or {}, scenario.get('weights'))
+    scheduled, waitlist = scheduler.schedule_tasks(
+        tasks,
+        chronotype,
+        day,
+        inputs['existing'],
+        use_predicted_durations=False,
+        fixed_blocks=fixed_blocks,
+        placement=placement,
+        carried_over=inputs.get('carried_over')
+    )
+
+    # A split task counts once; it hits the peak only if every chunk does
+    peak_start, peak_end = (hour * 60 for hour in scheduler._get_peak_hours(chronotype))
+    placed = {}
+    for entry in scheduled:
+        in_peak = peak_start <= entry['start'] and entry['end'] <= peak_end
+        task = entry['task']
+        placed[id(task)] = (task, placed.get(id(task), (task, True))[1] and in_peak)
+
+    high = [in_peak for task, in_peak in placed.values() if task.priority >= scheduler.HIGH_PRIORITY_THRESHOLD]
+
+    return {
+        'name': scenario['name'],
+        'weights': list(scenario['weights']) if 'weights' in scenario else None,
+        'chronotype': chronotype,
+        'placement': placement,
+        'scheduled': len(placed),
+        'priority_placed': round(sum(task.priority for task, _ in placed.values()), 2),
+        'peak_hit_rate': round(sum(high) / len(high), 3) if high else None,
+        'waitlist': [
+            {'task_id': task.task_id, 'name': task.name, 'priority': task.priority}
+            for task in waitlist
+        ],
+        'fragmentation': scheduler.last_report,
+        'quality': scheduler.last_quality,
+        'placements': [
+            {
+                'task_id': entry['task'].task_id,
+                'name': entry['task'].name,
+                'start_time': format_time(entry['start']),
+                'end_time': format_time(entry['end'])
+            }
+            for entry in sorted(scheduled, key=lambda entry: entry['start'])
+        ]
+    }
@@ -0,0 +1,134 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+
+def schedule_fingerprint(tasks, regular_entries, existing_schedule, user_chronotype, date, task_lengths=None,
+                         fixed_blocks=None, placement=None, carried_over=None):
+    """
+    Stable hash of everything GreedyScheduler.schedule_tasks depends on
+
+    Args:
+        tasks: List of Task objects
+        regular_entries: List of regular-task schedule entry dicts
+        existing_schedule: (task_id, start_minute, end_minute) tuples already scheduled
+        user_chronotype: 'Early', 'Middle' or 'Late'
+        date: Date being scheduled
+        task_lengths: Optional {task_id: hours} actually used for placement
+            (e.g. predicted durations); defaults to Task.length
+        fixed_blocks: Optional (start_minute, end_minute, ...) tuples
+        placement: Placement policy the run uses
+        carried_over: Optional {task_id: day ordinal} of waitlisted tasks
+            carried over from earlier runs
+
+    Returns:
+        str: Hex digest
+    """
+    task_lengths = task_lengths or {}
+    payload = {
+        'tasks': sorted(
+            (str(task.task_id), float(task.priority), float(task_lengths.get(task.task_id, task.length)),
+             bool(getattr(task, 'splittable', False)), getattr(task, 'min_chunk', None),
+             getattr(task, 'max_chunks', None))
+            for task in tasks
+        ),
+        'regular': sorted(
+            (str(entry['regular_task_id']), entry['start_time'], entry['end_time'])
+            for entry in regular_entries
+        ),
+        'existing': sorted(
+            (str(task_id), start, end) for task_id, start, end in (existing_schedule or [])
+        ),
+        'fixed': sorted((block[0], block[1]) for block in (fixed_blocks or [])),
+        'chronotype': user_chronotype,
+        'placement': placement,
+        'carried': sorted((str(task_id), day) for task_id, day in (carried_over or {}).items()),
+        'date': date.isoformat(),
+    }
+    encoded = json.dumps(payload, separators=(',', ':'), sort_keys=True)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+def rows_digest(rows):
+    """
+    Order-independent hash of persisted schedule rows
+
+    Args:
+        rows: Schedule row dicts as stored in (or read back from) the database
+
+    Returns:
+        str: Hex digest
+    """
+    keys = sorted(
+        (str(row.get('task_id')), str(row.get('regular_task_id')),
+         row['start_time'], row['end_time'], row['date'])
+        for row in rows
+    )
+    return hashlib.sha256(json.dumps(keys).encode('utf-8')).hexdigest()
+
+
+class ScheduleCache:
+    """
+    LRU cache of scheduling results keyed by input fingerprint
+
+    Bounded both by number of results and by the total number of scheduled
+    entries held, so a few huge schedules can't crowd out memory.
+    """
+
+    def __init__(self, max_results=256, max_entries=20000):
+        self.max_results = max_results
+        self.max_entries = max_entries
+        self._results = OrderedDict()
+        self._total_entries = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _size(self, result):
+        return len(result['scheduled']) + len(result['waitlist'])
+
+    def get(self, key):
+        with self._lock:
+            result = self._results.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self._results.move_to_end(key)
+            self.hits += 1
+            return result
+
+    def put(self, key, result):
+        """
+        Store a result dict with 'scheduled' and 'waitlist' lists (plus any
+        extra fields the caller wants to keep, such as a rows digest)
+        """
+        size = self._size(result)
+        if size > self.max_entries:
+            return
+
+        with self._lock:
+            previous = self._results.pop(key, None)
+            if previous is not None:
+                self._total_entries -= self._size(previous)
+
+            self._results[key] = result
+            self._total_entries += size
+
+            while len(self._results) > self.max_results or self._total_entries > self.max_entries:
+                _, evicted = self._results.popitem(last=False)
+                self._total_entries -= self._size(evicted)
+
+    def invalidate(self, key):
+        with self._lock:
+            result = self._results.pop(key, None)
+            if result is not None:
+                self._total_entries -= self._size(result)
+
+    def clear(self):
+        with self._lock:
+            self._results.clear()
+            self._total_entries = 0
+
+    def __len__(self):
+        return len(self._results)
@@ -1,14 +1,41 @@
-from datetime import time, timedelta, datetime
 from core.data_structures.priority_queue import PriorityQueue
 from core.data_structures.interval_tree import IntervalTree
+from core.data_structures.interval_index import StaticIntervalIndex
+from core.data_structures.gap_index import GapIndex
+from core.algorithms.predictor import validate_percentile
+from utils.time_helpers import parse_minutes, hours_to_minutes, format_time
 
 class GreedyScheduler:
     HIGH_PRIORITY_THRESHOLD = 7
     LOW_PRIORITY_THRESHOLD = 4
-
-    def __init__(self):
+    DAY_WINDOW = (6, 22)
+    EARLIEST_FIT = 'earliest'
+    BEST_FIT = 'best_fit'
+    PLACEMENTS = (EARLIEST_FIT, BEST_FIT)
+    # Free gaps shorter than this are reported as unusable slivers
+    SLIVER_MINUTES = 30
+    # Priority a waitlisted task gains per day it is carried over
+    AGING_RATE = 0.5
+
+    def __init__(self, duration_estimator=None, duration_percentile=None, placement=EARLIEST_FIT,
+                 aging_rate=AGING_RATE):
+        # Blocks known before a run (regular tasks, existing entries, imported
+        # events) live in a frozen array index; only placements made during
+        # the run go into the dynamic conflict tree on top of it
+        self.fixed_index = StaticIntervalIndex()
+        self.regular_blocks = []
         self.conflict_tree = IntervalTree()
+        self.gaps = GapIndex(self.DAY_WINDOW[0] * 60, self.DAY_WINDOW[1] * 60)
         self.waitlist = PriorityQueue()
+        # Optional streaming duration model (see core.algorithms.predictor)
+        self.duration_estimator = duration_estimator
+        self.duration_percentile = validate_percentile(duration_percentile)
+        if placement not in self.PLACEMENTS:
+            raise ValueError(f"Unknown placement policy '{placement}'")
+        self.placement = placement
+        self.aging_rate = aging_rate
+        self.last_report = None
+        self.last_quality = None
 
     def _get_peak_hours(self, user_chronotype):
         """
@@ -26,38 +53,31 @@ class GreedyScheduler:
             'Late': (14, 20),      # 2 PM - 8 PM (Evening chronotype)
         }
 
-        return chronotype_peak_hours.get(user_chronotype, (6, 22))
+        return chronotype_peak_hours.get(user_chronotype, self.DAY_WINDOW)
 
-    def _time_to_minutes(self, time_obj):
+    def _task_length(self, task, use_predicted, percentile):
         """
-        Convert time object to minutes since midnight
+        Length to schedule a task with
 
         Args:
-            time_obj: datetime.time object
+            task: Task object
+            use_predicted: Whether to consult the duration estimator
+            percentile: Optional quantile of the predicted duration
 
         Returns:
-            int: Total minutes since midnight
+            float: Duration in hours (falls back to the user-entered length)
         """
-        if isinstance(time_obj, time):
-            return time_obj.hour * 60 + time_obj.minute
-        elif isinstance(time_obj, datetime):
-            return time_obj.hour * 60 + time_obj.minute
-        else:
-            raise TypeError(f"Expected time or datetime object, got {type(time_obj)}")
+        if not use_predicted or self.duration_estimator is None:
+            return task.length
 
-    def _minutes_to_time(self, minutes):
-        """
-        Convert minutes since midnight to time object
+        predicted = self.duration_estimator.predict(task.user_id, task.name, percentile)
+        if predicted is None or predicted <= 0:
+            return task.length
+        return predicted
 
-        Args:
-            minutes: Minutes since midnight
-
-        Returns:
-            datetime.time: Time object
-        """
-        hours = minutes // 60
-        mins = minutes % 60
-        return time(hours, mins)
+    def planned_length(self, task):
+        """Length schedule_tasks will use for a task with the default settings"""
+        return self._task_length(task, self.duration_estimator is not None, self.duration_percentile)
 
     def _find_earliest_slot(self, task_length, search_window, date):
         """
@@ -69,12 +89,13 @@ class GreedyScheduler:
             date: Date to search on
 
         Returns:
-            dict: {'start': time, 'end': time} or None if no slot found
+            dict: {'start': int, 'end': int} timeline minutes, or None if no
+                slot found
         """
         start_hour, end_hour = search_window
         start_minutes = start_hour * 60
         end_minutes = end_hour * 60
-        task_duration_minutes = int(task_length * 60)
+        task_duration_minutes = hours_to_minutes(task_length)
 
         # ADDED: Validation
         if task_duration_minutes <= 0:
@@ -91,14 +112,12 @@ class GreedyScheduler:
             slot_start = current_time
             slot_end = current_time + task_duration_minutes
 
-            # Check if this slot conflicts with existing schedule
-            conflicts = self.conflict_tree.query_overlaps(slot_start, slot_end)
+            # Check if this slot conflicts with fixed blocks or earlier placements
+            conflicts = self.fixed_index.query_overlaps(slot_start, slot_end) + \
+                self.conflict_tree.query_overlaps(slot_start, slot_end)
 
             if not conflicts:  # No conflicts found
-                return {
-                    'start': self._minutes_to_time(slot_start),
-                    'end': self._minutes_to_time(slot_end)
-                }
+                return {'start': slot_start, 'end': slot_end}
 
             # Move to next potential slot (after the conflicting task ends)
             max_conflict_end = max(conflict[1] for conflict in conflicts)
@@ -107,30 +126,157 @@ class GreedyScheduler:
         # No available slot found in search window
         return None
 
+    def _find_best_fit_slot(self, task_length, search_window, prefer=None):
+        """
+        Find the smallest free gap in a window that fits a task
+
+        Args:
+            task_length: Duration of task in hours
+            search_window: Tuple of (start_hour, end_hour)
+            prefer: Optional (start_hour, end_hour) window preferred on ties
+
+        Returns:
+            dict: {'start': int, 'end': int} timeline minutes, or None
+        """
+        task_duration_minutes = hours_to_minutes(task_length)
+        if task_duration_minutes <= 0:
+            print(f"WARNING: Invalid task length: {task_length} hours")
+            return None
+
+        start = self.gaps.best_fit(
+            task_duration_minutes,
+            search_window[0] * 60,
+            search_window[1] * 60,
+            (prefer[0] * 60, prefer[1] * 60) if prefer else None
+        )
+        if start is None:
+            return None
+        return {'start': start, 'end': start + task_duration_minutes}
+
+    def _find_slot(self, task_length, search_window, date, placement, prefer=None):
+        if placement == self.BEST_FIT:
+            return self._find_best_fit_slot(task_length, search_window, prefer)
+        return self._find_earliest_slot(task_length, search_window, date)
+
+    def fragmentation_report(self):
+        """Unusable slivers left in the day window by the last run"""
+        report = self.gaps.fragmentation(self.SLIVER_MINUTES)
+        report['sliver_threshold'] = self.SLIVER_MINUTES
+        return report
+
+    def _priority_band(self, priority):
+        if priority >= self.HIGH_PRIORITY_THRESHOLD:
+            return 'high'
+        if priority >= self.LOW_PRIORITY_THRESHOLD:
+            return 'medium'
+        return 'low'
+
+    def quality_report(self, scheduled, waitlist, peak_hours):
+        """
+        Outcome metrics for a run, in one pass over its entries
+
+        Args:
+            scheduled: Entries returned by schedule_tasks
+            waitlist: Tasks left on the waitlist
+            peak_hours: (start_hour, end_hour) chronotype peak
+
+        Returns:
+            dict: utilization (busy share of the day window, fixed blocks
+                included), task_utilization (share filled by placed tasks),
+                peak_share (share of high-priority minutes inside the peak),
+                mean start_delay minutes from the window start per priority
+                band, waitlisted_priority and the fragmentation counters
+        """
+        window_start, window_end = self.DAY_WINDOW[0] * 60, self.DAY_WINDOW[1] * 60
+        peak_start, peak_end = peak_hours[0] * 60, peak_hours[1] * 60
+        window = window_end - window_start
+
+        task_minutes = high_minutes = high_peak_minutes = 0
+        delay_totals = {'high': 0, 'medium': 0, 'low': 0}
+        delay_counts = {'high': 0, 'medium': 0, 'low': 0}
+        for entry in scheduled:
+            start, end = entry['start'], entry['end']
+            task_minutes += min(end, window_end) - max(start, window_start)
+            band = self._priority_band(entry['task'].priority)
+            if band == 'high':
+                high_minutes += end - start
+                high_peak_minutes += max(0, min(end, peak_end) - max(start, peak_start))
+            # A split task's delay is its first chunk's
+            if entry.get('chunk', 1) == 1:
+                delay_totals[band] += start - window_start
+                delay_counts[band] += 1
+
+        fragmentation = self.fragmentation_report()
+        return {
+            'utilization': round(1 - fragmentation['free_minutes'] / window, 4),
+            'task_utilization': round(task_minutes / window, 4),
+            'peak_share': round(high_peak_minutes / high_minutes, 4) if high_minutes else None,
+            'start_delay': {
+                band: round(delay_totals[band] / delay_counts[band], 1) if delay_counts[band] else None
+                for band in delay_totals
+            },
+            'waitlisted_priority': round(sum(task.priority for task in waitlist), 2),
+            'scheduled': sum(1 for entry in scheduled if entry.get('chunk', 1) == 1),
+            'waitlisted': len(waitlist),
+            'slivers': fragmentation['slivers'],
+            'sliver_minutes': fragmentation['sliver_minutes'],
+        }
+
+    def _plan_chunks(self, task_minutes, min_chunk_minutes, max_chunks, search_window):
+        """
+        Split a task across the earliest free gaps of a window
+
+        Gaps are taken in order; each chunk fills as much of its gap as
+        needed, but never leaves a remainder shorter than the minimum chunk.
+        All or nothing: returns None if the task can't be fully placed within
+        ``max_chunks`` chunks.
+
+        Returns:
+            list: [(start, end), ...] timeline minutes, or None
+        """
+        lo, hi = search_window[0] * 60, search_window[1] * 60
+        chunks = []
+        remaining = task_minutes
+
+        for gap_start, gap_end in self.gaps.iter_gaps(lo, hi, min_chunk_minutes):
+            take = min(gap_end - gap_start, remaining)
+            if take < remaining and remaining - take < min_chunk_minutes:
+                take = remaining - min_chunk_minutes
+            if take < min_chunk_minutes:
+                continue
+
+            chunks.append((gap_start, gap_start + take))
+            remaining -= take
+            if remaining == 0:
+                return chunks
+            if len(chunks) == max_chunks:
+                return None
+        return None
+
     def add_regular_task(self, task, start_time, length, date):
-        # Add a regular task to the conflict tree
-        start_minutes = self._time_to_minutes(start_time)
-        end_minutes = start_minutes + int(length * 60)
+        # Reserve a regular task's block for the next schedule_tasks run
+        # (start_time: timeline minute or a time-like value; the end may run
+        # past midnight)
+        start_minutes = parse_minutes(start_time)
+        end_minutes = start_minutes + hours_to_minutes(length)
         scheduled_results = []
 
         print(f"[SCHEDULER] Adding regular task '{task}' to schedule")
         schedule_entry = {
             'task': task,
-            'start_time': start_time,
-            'end_time': self._minutes_to_time(end_minutes),
+            'start': start_minutes,
+            'end': end_minutes,
             'date': date  # Date can be set as needed
         }
         scheduled_results.append(schedule_entry)
 
-        self.conflict_tree.insert(
-            start_minutes,
-            end_minutes,
-            schedule_entry
-        )
+        self.regular_blocks.append((start_minutes, end_minutes, schedule_entry))
         return scheduled_results
 
 
-    def schedule_tasks(self, tasks, user_chronotype, date, existing_schedule=None):
+    def schedule_tasks(self, tasks, user_chronotype, date, existing_schedule=None,
+                       use_predicted_durations=None, duration_percentile=None, fixed_blocks=None,
+                       placement=None, carried_over=None):
         """
         Schedule tasks using greedy algorithm
 
@@ -138,99 +284,167 @@ class GreedyScheduler:
             tasks: List of Task objects
             user_chronotype: 'morning', 'evening', or 'intermediate'
             date: Date to schedule for
-            existing_schedule: List of already scheduled tasks
+            existing_schedule: (task_id, start_minute, end_minute) tuples
+                already scheduled
+            use_predicted_durations: Schedule with the duration estimator's
+                prediction instead of Task.length (defaults to True when an
+                estimator is configured)
+            duration_percentile: Quantile of the predicted duration to use,
+                e.g. 0.8; None uses the mean
+            fixed_blocks: (start_minute, end_minute, label) tuples that can't
+                be moved, e.g. imported calendar events; loaded into the
+                static fixed index with regular and existing entries
+            placement: 'earliest' (first slot that fits) or 'best_fit'
+                (smallest gap that fits, peak hours preferred on ties);
+                defaults to the scheduler's policy
+            carried_over: Optional {task_id: day ordinal first waitlisted}
+                for tasks carried over from earlier runs; they age by
+                aging_rate per day and win ties against fresh tasks
 
         Returns:
-            tuple: (scheduled_tasks, waitlist_tasks)
+            tuple: (scheduled_tasks, waitlist_tasks); scheduled entries are
+                {'task', 'start', 'end', 'date'} with timeline minutes, plus
+                'chunk'/'chunks' numbering when a splittable task was split
         """
 
         print(f"[SCHEDULER] Starting with {len(tasks)} tasks")
         print(f"[SCHEDULER] Chronotype: {user_chronotype}")
 
         # CRITICAL FIX: Reset data structures for new scheduling run
+        # (regular blocks added beforehand are kept in the fixed index)
         self.conflict_tree = IntervalTree()
-        self.waitlist = PriorityQueue()
+        self.waitlist = PriorityQueue(self.aging_rate)
+
+        # Queue time is in days relative to the run's date (now = 0), so a
+        # task carried over from n days ago was enqueued at -n and fresh
+        # tasks keep their exact base priority
+        today = date.toordinal()
+        enqueued = {
+            task_id: min(first_day - today, 0)
+            for task_id, first_day in (carried_over or {}).items()
+        }
 
-        # Sort tasks by priority (descending)
-        sorted_tasks = sorted(tasks, key=lambda t: t.priority, reverse=True)
+        # Order tasks by effective priority (descending): base priority plus
+        # aging for carried-over tasks, computed lazily by the queue
+        queue = PriorityQueue(self.aging_rate)
+        for task in tasks:
+            queue.push(task.priority, task, enqueued.get(task.task_id, 0))
+        ordered_tasks = [queue.pop() for _ in range(queue.length())]
         
         print("[SCHEDULER] Tasks sorted by priority:")
-        for i, task in enumerate(sorted_tasks):
-            print(f"  {i+1}. {task.name}: Priority={task.priority}, Length={task.length}hrs")
+        for i, (priority, task) in enumerate(ordered_tasks):
+            aged = f" (aged from {task.priority})" if priority != task.priority else ""
+            print(f"  {i+1}. {task.name}: Priority={priority}{aged}, Length={task.length}hrs")
 
         # Get chronotype peak hours
         peak_hours = self._get_peak_hours(user_chronotype)
         print(f"[SCHEDULER] Peak hours for {user_chronotype}: {peak_hours[0]}:00 - {peak_hours[1]}:00")
 
-        # Initialize conflict tree with existing schedule
+        # Everything known up front goes into one frozen index, built once
+        fixed = list(self.regular_blocks)
+        if fixed_blocks:
+            print(f"[SCHEDULER] Loading {len(fixed_blocks)} fixed blocks")
+            fixed.extend((start, end) for start, end, *_ in fixed_blocks)
         if existing_schedule:
-            print(f"[SCHEDULER] Loading {len(existing_schedule)} existing schedules into conflict tree")
-            for scheduled in existing_schedule:
-                self.conflict_tree.insert(
-                    self._time_to_minutes(scheduled.start_time),
-                    self._time_to_minutes(scheduled.end_time),
-                    (self._time_to_minutes(scheduled.start_time), self._time_to_minutes(scheduled.end_time))
-                )
+            print(f"[SCHEDULER] Loading {len(existing_schedule)} existing schedules")
+            fixed.extend((start, end) for _, start, end in existing_schedule)
         else:
             print("[SCHEDULER] No existing schedule to load")
+        self.fixed_index = StaticIntervalIndex(fixed)
+        print(f"[SCHEDULER] Fixed index: {len(self.fixed_index)} blocks ({len(self.regular_blocks)} regular)")
+        # Free gaps of the day, kept in step with placements (for splitting)
+        self.gaps = GapIndex(self.DAY_WINDOW[0] * 60, self.DAY_WINDOW[1] * 60, fixed)
+
+        if use_predicted_durations is None:
+            use_predicted_durations = self.duration_estimator is not None
+        if duration_percentile is None:
+            duration_percentile = self.duration_percentile
+        validate_percentile(duration_percentile)
+        placement = placement or self.placement
+        if placement not in self.PLACEMENTS:
+            raise ValueError(f"Unknown placement policy '{placement}'")
+        print(f"[SCHEDULER] Placement policy: {placement}")
 
         scheduled_results = []
 
-        for task in sorted_tasks:
-            print(f"\n[SCHEDULER] Processing: {task.name} (Priority: {task.priority})")
+        for priority, task in ordered_tasks:
+            print(f"\n[SCHEDULER] Processing: {task.name} (Priority: {priority})")
 
             slot = None
+            task_length = self._task_length(task, use_predicted_durations, duration_percentile)
+            if task_length != task.length:
+                print(f"  → Using predicted length {task_length:.2f}hrs (entered {task.length}hrs)")
 
             # CRITICAL FIX: Changed from > to >= for inclusive threshold
-            if task.priority >= self.HIGH_PRIORITY_THRESHOLD:
+            if priority >= self.HIGH_PRIORITY_THRESHOLD:
                 print(f"  → High priority task, first searching in peak hours: {peak_hours}")
 
                 # First try peak hours (optimal placement)
-                slot = self._find_earliest_slot(
-                    task.length,
+                slot = self._find_slot(
+                    task_length,
                     peak_hours,
-                    date
+                    date,
+                    placement
                 )
 
                 # If no slot in peak hours, try any available slot in full day
                 if not slot:
                     print(f"  → Peak hours full, searching entire day for high priority task")
-                    slot = self._find_earliest_slot(
-                        task.length,
-                        (6, 22),  # Full day
-                        date
+                    slot = self._find_slot(
+                        task_length,
+                        self.DAY_WINDOW,  # Full day
+                        date,
+                        placement,
+                        prefer=peak_hours
                     )
             else:
-                print(f"  → Normal priority task, searching full day: (6, 22)")
-                search_window = (6, 22)  # 6am - 10pm (full day)
-                slot = self._find_earliest_slot(
-                    task.length,
+                print(f"  → Normal priority task, searching full day: {self.DAY_WINDOW}")
+                search_window = self.DAY_WINDOW  # 6am - 10pm (full day)
+                slot = self._find_slot(
+                    task_length,
                     search_window,
-                    date
+                    date,
+                    placement
                 )
 
-            if slot:
-                print(f"  ✓ Slot found: {slot['start']} - {slot['end']}")
-
-                # Create schedule entry
-                schedule_entry = {
-                    'task': task,
-                    'start_time': slot['start'],
-                    'end_time': slot['end'],
-                    'date': date
-                }
-                scheduled_results.append(schedule_entry)
-
-                # Add to conflict tree
-                self.conflict_tree.insert(
-                    self._time_to_minutes(slot['start']),
-                    self._time_to_minutes(slot['end']),
-                    schedule_entry
+            chunks = None
+            if not slot and task.splittable:
+                # No contiguous window: fill the day's gaps in order
+                chunks = self._plan_chunks(
+                    hours_to_minutes(task_length),
+                    hours_to_minutes(task.min_chunk),
+                    task.max_chunks,
+                    self.DAY_WINDOW
                 )
+                if chunks:
+                    print(f"  → Split into {len(chunks)} chunks")
+
+            if slot:
+                chunks = [(slot['start'], slot['end'])]
+
+            if chunks:
+                for index, (start, end) in enumerate(chunks):
+                    print(f"  ✓ Slot found: {format_time(start)} - {format_time(end)}")
+
+                    # Create schedule entry
+                    schedule_entry = {
+                        'task': task,
+                        'start': start,
+                        'end': end,
+                        'date': date
+                    }
+                    if len(chunks) > 1:
+                        schedule_entry['chunk'] = index + 1
+                        schedule_entry['chunks'] = len(chunks)
+                    scheduled_results.append(schedule_entry)
+
+                    # Add to conflict tree and take the gap
+                    self.conflict_tree.insert(start, end, schedule_entry)
+                    self.gaps.reserve(start, end)
             else:
                 print(f"  ✗ No slot available, adding to waitlist")
                 # No slot found, add to waitlist
-                self.waitlist.push(task.priority, task)
+                self.waitlist.push(task.priority, task, enqueued.get(task.task_id, 0))
 
         # Process waitlist tasks
         waitlist_results = []
@@ -238,6 +452,11 @@ class GreedyScheduler:
             _, task = self.waitlist.pop()
             waitlist_results.append(task)
 
+        self.last_report = dict(self.fragmentation_report(), placement=placement)
+        self.last_quality = self.quality_report(scheduled_results, waitlist_results, peak_hours)
         print(f"\n[SCHEDULER] Completed: {len(scheduled_results)} scheduled, {len(waitlist_results)} waitlisted")
+        print(f"[SCHEDULER] Fragmentation ({placement}): {self.last_report['slivers']} slivers, "
+              f"{self.last_report['sliver_minutes']} min unusable of {self.last_report['free_minutes']} min free")
+        print(f"[SCHEDULER] Quality: {self.last_quality}")
 
         return scheduled_results, waitlist_results
\ No newline at end of file
@@ -0,0 +1,161 @@
+from bisect import bisect_left, bisect_right, insort
+
+
+class GapIndex:
+    """
+    Free gaps of a scheduling window, kept sorted by start
+
+    Gaps are two parallel sorted lists (starts, ends) of disjoint half-open
+    [start, end) minute ranges. Enumerating the gaps inside a sub-window is a
+    bisect plus a walk over just those gaps; reserving a placed interval
+    splits at most one gap. A third list orders the same gaps by
+    (length, start) for best-fit lookups.
+    """
+
+    __slots__ = ('window_start', 'window_end', 'starts', 'ends', 'by_size')
+
+    def __init__(self, window_start, window_end, busy=()):
+        """
+        Args:
+            window_start, window_end: Window in timeline minutes
+            busy: Iterable of (start, end, ...) intervals already taken;
+                empty intervals are dropped (as StaticIntervalIndex does)
+        """
+        self.window_start = window_start
+        self.window_end = window_end
+        self.starts = []
+        self.ends = []
+
+        cursor = window_start
+        for start, end, *_ in sorted(busy, key=lambda interval: interval[0]):
+            # An empty interval would split a free gap in two
+            if end <= start or end <= cursor or start >= window_end:
+                continue
+            if start > cursor:
+                self.starts.append(cursor)
+                self.ends.append(start)
+            cursor = max(cursor, end)
+        if cursor < window_end:
+            self.starts.append(cursor)
+            self.ends.append(window_end)
+        self.by_size = sorted((end - start, start) for start, end in zip(self.starts, self.ends))
+
+    def __len__(self):
+        return len(self.starts)
+
+    def iter_gaps(self, lo=None, hi=None, min_length=1):
+        """
+        Gaps clipped to [lo, hi), in start order
+
+        Yields:
+            tuple: (start, end) of each gap at least ``min_length`` long
+        """
+        lo = self.window_start if lo is None else lo
+        hi = self.window_end if hi is None else hi
+
+        # First gap that ends after lo
+        index = bisect_right(self.ends, lo)
+        while index < len(self.starts) and self.starts[index] < hi:
+            start = max(self.starts[index], lo)
+            end = min(self.ends[index], hi)
+            if end - start >= min_length:
+                yield start, end
+            index += 1
+
+    def first_fit(self, length, lo=None, hi=None):
+        """Start of the earliest gap in [lo, hi) that fits ``length``, or None"""
+        for start, _ in self.iter_gaps(lo, hi, length):
+            return start
+        return None
+
+    def reserve(self, start, end):
+        """
+        Mark [start, end) as taken
+
+        Raises:
+            ValueError: If the range isn't entirely inside one free gap
+        """
+        index = bisect_right(self.starts, start) - 1
+        if index < 0 or self.ends[index] < end:
+            raise ValueError(f"[{start}, {end}) is not free")
+
+        gap_start, gap_end = self.starts[index], self.ends[index]
+        del self.starts[index], self.ends[index]
+        del self.by_size[bisect_left(self.by_size, (gap_end - gap_start, gap_start))]
+        if end < gap_end:
+            self.starts.insert(index, end)
+            self.ends.insert(index, gap_end)
+            insort(self.by_size, (gap_end - end, end))
+        if gap_start < start:
+            self.starts.insert(index, gap_start)
+            self.ends.insert(index, start)
+            insort(self.by_size, (start - gap_start, gap_start))
+
+    def best_fit(self, length, lo=None, hi=None, prefer=None):
+        """
+        Start of the smallest gap that fits ``length`` inside [lo, hi)
+
+        Gaps are visited in size order from the first that could fit, so
+        the usual cost is a bisect plus a few steps. Among gaps of the same
+        (smallest) size, one where the task fits inside the ``prefer``
+        window wins, then the earliest.
+
+        Args:
+            length: Minutes needed
+            lo, hi: Search window (defaults to the whole index window)
+            prefer: Optional (start, end) window to prefer on ties
+
+        Returns:
+            int or None: Placement start (the preferred window's start when
+                it was the tie-breaker, else the gap's start)
+        """
+        lo = self.window_start if lo is None else lo
+        hi = self.window_end if hi is None else hi
+
+        best = None  # (size, not preferred, start, placement)
+        index = bisect_left(self.by_size, (length, float('-inf')))
+        while index < len(self.by_size):
+            size, gap_start = self.by_size[index]
+            if best is not None and size > best[0]:
+                break
+            index += 1
+
+            start = max(gap_start, lo)
+            end = min(gap_start + size, hi)
+            if end - start < length:
+                continue
+
+            placement, preferred = start, False
+            if prefer is not None:
+                preferred_start = max(start, prefer[0])
+                if preferred_start + length <= min(end, prefer[1]):
+                    placement, preferred = preferred_start, True
+
+            candidate = (size, not preferred, start, placement)
+            if best is None or candidate < best:
+                best = candidate
+        return best[3] if best is not None else None
+
+    def fragmentation(self, min_useful):
+        """
+        Free gaps too short to be useful
+
+        Args:
+            min_useful: Gaps shorter than this many minutes count as slivers
+
+        Returns:
+            dict: gaps, free_minutes, slivers, sliver_minutes
+        """
+        cut = bisect_left(self.by_size, (min_useful, float('-inf')))
+        return {
+            'gaps': len(self.by_size),
+            'free_minutes': self.free_minutes(),
+            'slivers': cut,
+            'sliver_minutes': sum(size for size, _ in self.by_size[:cut]),
+        }
+
+    def free_minutes(self):
+        return sum(end - start for start, end in zip(self.starts, self.ends))
+
+    def gaps(self):
+        return list(zip(self.starts, self.ends))
@@ -0,0 +1,68 @@
+from array import array
+from bisect import bisect_left, bisect_right
+
+
+class StaticIntervalIndex:
+    """
+    Frozen interval index for intervals known before a scheduling run
+
+    Intervals are stored as three int arrays sorted by start: starts, ends
+    and the running (prefix) maximum of ends. No per-node objects; built once
+    in O(n log n). An overlap query for [start, end) bisects starts for the
+    candidates that begin before ``end`` and the prefix maximum for the first
+    candidate that could still be running at ``start``, then scans only that
+    range.
+    """
+
+    __slots__ = ('starts', 'ends', 'max_ends', 'labels')
+
+    def __init__(self, intervals=()):
+        """
+        Args:
+            intervals: Iterable of (start, end) or (start, end, label) in
+                minutes; empty intervals are dropped
+        """
+        items = sorted(
+            (interval for interval in intervals if interval[1] > interval[0]),
+            key=lambda interval: (interval[0], interval[1])
+        )
+        self.starts = array('i', (interval[0] for interval in items))
+        self.ends = array('i', (interval[1] for interval in items))
+        self.max_ends = array('i')
+        running = None
+        for end in self.ends:
+            running = end if running is None or end > running else running
+            self.max_ends.append(running)
+        # Labels are optional; kept only if any interval carries one
+        labels = [interval[2] if len(interval) > 2 else None for interval in items]
+        self.labels = labels if any(label is not None for label in labels) else None
+
+    def __len__(self):
+        return len(self.starts)
+
+    def _candidates(self, start, end):
+        hi = bisect_left(self.starts, end)
+        lo = bisect_right(self.max_ends, start, 0, hi)
+        return lo, hi
+
+    def query_overlaps(self, start, end):
+        """
+        Intervals overlapping [start, end)
+
+        Returns:
+            List of tuples: [(start, end), ...] (same shape as IntervalTree)
+        """
+        lo, hi = self._candidates(start, end)
+        starts, ends = self.starts, self.ends
+        return [(starts[i], ends[i]) for i in range(lo, hi) if ends[i] > start]
+
+    def overlaps(self, start, end):
+        """Whether anything overlaps [start, end)"""
+        lo, hi = self._candidates(start, end)
+        ends = self.ends
+        return any(ends[i] > start for i in range(lo, hi))
+
+    def intervals(self):
+        """All (start, end, label) intervals in start order"""
+        labels = self.labels or [None] * len(self.starts)
+        return list(zip(self.starts, self.ends, labels))
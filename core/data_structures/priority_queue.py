@@ -8,39 +8,66 @@ class PriorityQueue:
     max-heap behavior (higher priority values are extracted first).
     
     The counter ensures stable ordering when priorities are equal (FIFO).
+
+    Optional lazy aging: with an aging_rate, an item's effective priority is
+    priority + aging_rate * (now - enqueued_at). Since aging_rate * now is
+    the same for every item, the order only depends on the static key
+    priority - aging_rate * enqueued_at, so aging needs no per-tick updates
+    or re-heapifying; the effective priority is computed when popped. Equal
+    keys go to the item enqueued earlier.
     
     Attributes:
-        _heap: List storing (negated_priority, counter, item) tuples
+        _heap: List storing (negated_key, enqueued_at, counter, item) tuples
         _counter: Monotonically increasing counter for tie-breaking
+        aging_rate: Priority gained per clock unit waited (0 = no aging)
+        clock: Callable returning the current time in the same units as
+            enqueued_at
     """
     
-    def __init__(self):
+    def __init__(self, aging_rate=0.0, clock=None):
         self._heap = []
         self._counter = 0
+        self.aging_rate = aging_rate
+        self.clock = clock
+
+    def _now(self):
+        return self.clock() if self.clock is not None else 0
 
-    def push(self, priority, item):
+    def push(self, priority, item, enqueued_at=None):
         """
         Add an item to the priority queue.
         
         Args:
             priority (float): Priority value (higher = more important)
             item: The item to store
+            enqueued_at: When the item started waiting (defaults to now); an
+                earlier time means an older item
             
         Note:
             Priority is negated internally to convert min-heap to max-heap behavior.
             Counter ensures FIFO ordering for equal priorities (Objective 11).
         """
+        if enqueued_at is None:
+            enqueued_at = self._now()
+        key = priority - self.aging_rate * enqueued_at if self.aging_rate else priority
+
         # CRITICAL FIX: Negate priority to convert min-heap to max-heap
         # Python's heapq is min-heap by default, so we negate to get highest priority first
-        heapq.heappush(self._heap, (-priority, self._counter, item))
+        heapq.heappush(self._heap, (-key, enqueued_at, self._counter, item))
         self._counter += 1
 
+    def _effective(self, negated_key):
+        if self.aging_rate:
+            return -negated_key + self.aging_rate * self._now()
+        return -negated_key
+
     def pop(self):
         """
         Remove and return the highest priority item.
         
         Returns:
-            tuple: (priority, item) - priority is the original (positive) value
+            tuple: (priority, item) - priority is the original (positive)
+                value, plus any aging accrued by now
             
         Raises:
             IndexError: If queue is empty
@@ -48,11 +75,10 @@ class PriorityQueue:
         if self.is_empty():
             raise IndexError("pop from an empty priority queue")
         
-        negated_priority, counter, item = heapq.heappop(self._heap)
+        negated_key, enqueued_at, counter, item = heapq.heappop(self._heap)
         
         # CRITICAL FIX: Return original (positive) priority
-        original_priority = -negated_priority
-        return original_priority, item
+        return self._effective(negated_key), item
     
     def peek(self):
         """
@@ -67,8 +93,8 @@ class PriorityQueue:
         if self.is_empty():
             raise IndexError("peek from an empty priority queue")
         
-        negated_priority, counter, item = self._heap[0]
-        return -negated_priority, item
+        negated_key, enqueued_at, counter, item = self._heap[0]
+        return self._effective(negated_key), item
     
     def is_empty(self):
         """
@@ -1,13 +1,107 @@
-from datetime import time
+from datetime import date, timedelta
+
+from utils.time_helpers import parse_minutes, hours_to_minutes
+
+DAILY = 'daily'
+WEEKDAYS = 'weekdays'
+DAYS = 'days'          # specific weekdays, 0 = Monday
+INTERVAL = 'interval'  # every N days from recurrence_start
+RECURRENCES = (DAILY, WEEKDAYS, DAYS, INTERVAL)
+
+
+def _parse_days(days):
+    """'0,2,4' or an iterable of ints -> sorted tuple of weekday numbers"""
+    if days is None or days == '':
+        return None
+    if isinstance(days, str):
+        days = [part for part in days.split(',') if part.strip()]
+    parsed = tuple(sorted({int(day) for day in days}))
+    if any(day < 0 or day > 6 for day in parsed):
+        raise ValueError('Recurrence days must be weekday numbers 0-6')
+    return parsed
+
 
 class RegularTask:
-    def __init__(self, user_id, name, length, start_time, regular_task_id=None):
+    def __init__(self, user_id, name, length, start_time, regular_task_id=None,
+                 recurrence=DAILY, recurrence_days=None, recurrence_interval=1, recurrence_start=None):
         self.regular_task_id = regular_task_id
         self.user_id = user_id
         self.name = name
         self.length = length
         self.start_time = start_time
-    
+
+        # Recurrence rule (defaults keep the old every-day behaviour)
+        recurrence = recurrence or DAILY
+        if recurrence not in RECURRENCES:
+            raise ValueError(f'Recurrence must be one of {", ".join(RECURRENCES)}')
+        self.recurrence = recurrence
+        self.recurrence_days = _parse_days(recurrence_days)
+        if recurrence == DAYS and not self.recurrence_days:
+            raise ValueError('Pick at least one day for a specific-days recurrence')
+
+        self.recurrence_interval = int(recurrence_interval or 1)
+        if self.recurrence_interval < 1:
+            raise ValueError('Recurrence interval must be at least 1 day')
+        if isinstance(recurrence_start, str):
+            recurrence_start = date.fromisoformat(recurrence_start[:10])
+        self.recurrence_start = recurrence_start
+        if recurrence == INTERVAL and recurrence_start is None:
+            raise ValueError('An interval recurrence needs a start date')
+
+    @classmethod
+    def from_row(cls, row):
+        """Build from a regularTasks row (recurrence columns are optional)"""
+        return cls(
+            regular_task_id=row.get('regularTaskId'),
+            user_id=row.get('userId'),
+            name=row['name'],
+            length=row['length'],
+            start_time=row.get('start_time'),
+            recurrence=row.get('recurrence'),
+            recurrence_days=row.get('recurrence_days'),
+            recurrence_interval=row.get('recurrence_interval'),
+            recurrence_start=row.get('recurrence_start')
+        )
+
+    def occurs_on(self, day):
+        if self.recurrence_start is not None and day < self.recurrence_start:
+            return False
+        if self.recurrence == WEEKDAYS:
+            return day.weekday() < 5
+        if self.recurrence == DAYS:
+            return day.weekday() in self.recurrence_days
+        if self.recurrence == INTERVAL:
+            return (day - self.recurrence_start).days % self.recurrence_interval == 0
+        return True
+
+    def occurrences(self, start_date, end_date):
+        """
+        Lazily expand the rule over [start_date, end_date]
+
+        Yields:
+            tuple: (date, start minute, end minute); the end may run past
+                midnight (see utils.time_helpers)
+        """
+        if self.start_time in (None, '') or self.length is None:
+            return
+
+        start_minute = parse_minutes(self.start_time)
+        end_minute = start_minute + hours_to_minutes(self.length)
+
+        day = start_date
+        step = timedelta(days=1)
+        if self.recurrence == INTERVAL:
+            # Jump straight to the first matching day
+            first = max(start_date, self.recurrence_start)
+            offset = (first - self.recurrence_start).days % self.recurrence_interval
+            day = first + timedelta(days=(self.recurrence_interval - offset) % self.recurrence_interval)
+            step = timedelta(days=self.recurrence_interval)
+
+        while day <= end_date:
+            if self.occurs_on(day):
+                yield day, start_minute, end_minute
+            day += step
+
     def to_dict(self):
         # Serialize RegularTask to dictionary
         data = {
@@ -18,4 +112,14 @@ class RegularTask:
         }
         if self.regular_task_id:
             data["regularTaskId"] = self.regular_task_id
-        return data
\ No newline at end of file
+        # Recurrence columns only when not the default, so plain daily tasks
+        # still insert into tables without them
+        if self.recurrence != DAILY:
+            data["recurrence"] = self.recurrence
+        if self.recurrence_days:
+            data["recurrence_days"] = ','.join(str(day) for day in self.recurrence_days)
+        if self.recurrence_interval != 1:
+            data["recurrence_interval"] = self.recurrence_interval
+        if self.recurrence_start is not None:
+            data["recurrence_start"] = self.recurrence_start.isoformat()
+        return data
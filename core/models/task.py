@@ -1,7 +1,13 @@
 from datetime import datetime
 
+from core.algorithms.priority import task_priority
+
 class Task:
-    def __init__(self, user_id, name, effort, urgency, length, task_id=None, priority=None, created_at=None):
+    DEFAULT_MIN_CHUNK = 0.5  # hours
+    DEFAULT_MAX_CHUNKS = 4
+
+    def __init__(self, user_id, name, effort, urgency, length, task_id=None, priority=None, created_at=None,
+                 splittable=False, min_chunk=None, max_chunks=None):
         self.task_id = task_id
         self.user_id = user_id
         
@@ -20,10 +26,17 @@ class Task:
         self.length = length
 
         self.created_at = created_at or datetime.now()
+
+        # Splittable tasks may be scheduled as several chunks
+        self.splittable = bool(splittable)
+        self.min_chunk = float(min_chunk) if min_chunk else self.DEFAULT_MIN_CHUNK
+        self.max_chunks = int(max_chunks) if max_chunks else self.DEFAULT_MAX_CHUNKS
+        if self.min_chunk <= 0 or self.max_chunks < 1:
+            raise ValueError('Minimum chunk must be positive and maximum chunks at least 1')
         
         # Calculate priority if not provided
         if priority is None:
-            self.priority = round((self.effort * 0.3) + (self.urgency * 0.5) + (self.length * 0.2 * 10), 2)
+            self.priority = task_priority(self.effort, self.urgency, self.length)
         else:
             self.priority = priority
 
@@ -31,7 +44,7 @@ class Task:
         return self.priority > 7
     
     def to_dict(self):
-        return {
+        data = {
             "user_id": self.user_id,
             "name": self.name,
             "effort": self.effort,
@@ -39,6 +52,13 @@ class Task:
             "length": self.length,
             "created_at": self.created_at.isoformat()
         }
+        # Split columns only for splittable tasks, so other inserts don't
+        # need them
+        if self.splittable:
+            data["splittable"] = True
+            data["min_chunk"] = self.min_chunk
+            data["max_chunks"] = self.max_chunks
+        return data
 
     def to_dict_with_priority(self):
         task_dict = self.to_dict()
@@ -0,0 +1,60 @@
+"""
+Server-side completion state for the dashboard.
+
+Completed schedule ids are kept per (user, day) in the local store, one row
+per completion under a composite primary key, so marking and checking a
+completion are index lookups. State follows the user across logins and
+devices on the host; the session cookie carries nothing.
+"""
+from datetime import date, timedelta
+
+from services.local_store import get_local_store
+
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS completed_schedules (
+    user_id TEXT NOT NULL,
+    day TEXT NOT NULL,
+    schedule_id TEXT NOT NULL,
+    PRIMARY KEY (user_id, day, schedule_id)
+);
+CREATE INDEX IF NOT EXISTS completed_schedules_day ON completed_schedules (day);
+'''
+
+
+class CompletionStore:
+    """Per-user, per-day set of completed schedule ids"""
+
+    RETENTION_DAYS = 7
+
+    def __init__(self, store=None):
+        self.store = store or get_local_store()
+        self.store.ensure_schema(SCHEMA)
+
+    def add(self, user_id, day, schedule_id):
+        """Mark a schedule entry as completed (idempotent)"""
+        with self.store.transaction() as conn:
+            conn.execute(
+                'INSERT OR IGNORE INTO completed_schedules (user_id, day, schedule_id) VALUES (?, ?, ?)',
+                (str(user_id), day.isoformat(), str(schedule_id))
+            )
+            conn.execute(
+                'DELETE FROM completed_schedules WHERE day < ?',
+                ((date.today() - timedelta(days=self.RETENTION_DAYS)).isoformat(),)
+            )
+
+    def get(self, user_id, day):
+        """
+        Completed schedule ids for one day.
+
+        Returns:
+            set: Schedule id strings, for O(1) membership checks while rendering
+        """
+        if not user_id:
+            return set()
+
+        rows = self.store.execute(
+            'SELECT schedule_id FROM completed_schedules WHERE user_id = ? AND day = ?',
+            (str(user_id), day.isoformat())
+        ).fetchall()
+        return {row[0] for row in rows}
@@ -0,0 +1,159 @@
+"""
+Data-integrity sweep for overlapping schedule rows.
+
+Walks the users table with keyset pagination and, per user, reads that
+user's schedules sorted by date and start time, a page at a time until a
+page comes back empty (so the server's max-rows cap can't truncate a
+user). Each (user, date) partition
+is checked with the sweep-line detector in core.algorithms.conflicts, so only
+one user's rows are in memory at a time and the cost is O(n log n + k)
+overall.
+
+Run with:
+    python -m services.conflict_audit --since 2026-01-01 --output instance/conflicts.jsonl
+"""
+import argparse
+import json
+import logging
+import time
+from datetime import date
+
+from core.algorithms.conflicts import partition_conflicts
+
+
+logger = logging.getLogger(__name__)
+
+
+class ConflictAudit:
+    """Audit the whole schedules table, partitioned by user and date"""
+
+    def __init__(self, page_size=500, since=None, pause_seconds=0.0, client=None):
+        self.page_size = page_size
+        self.since = since
+        self.pause_seconds = pause_seconds
+        self.client = client
+
+    def _client(self):
+        if self.client is not None:
+            return self.client
+        from services.database_client import SupabaseClient
+        return SupabaseClient.get_client()
+
+    def _read(self, query):
+        if self.client is not None:
+            return query.execute()
+        from services.database_client import SupabaseClient
+        return SupabaseClient.execute_read(query)
+
+    def iter_user_ids(self):
+        """Every user id, paged by keyset on user_id"""
+        last = None
+        while True:
+            query = self._client().table('users').select('user_id').order('user_id').limit(self.page_size)
+            if last is not None:
+                query = query.gt('user_id', last)
+            rows = self._read(query).data or []
+            # A short page may just be the max-rows cap; only empty means done
+            if not rows:
+                return
+            for row in rows:
+                yield row['user_id']
+            last = rows[-1]['user_id']
+
+    def user_rows(self, user_id):
+        """
+        Every schedule row of one user (from ``since``), ordered by date and
+        start time
+
+        Rows are read in .range() pages over an order made unique by
+        schedule_id, so rows sharing a start time aren't skipped or repeated.
+        """
+        rows = []
+        while True:
+            query = self._client().table('schedules') \
+                .select('schedule_id, user_id, task_id, regular_task_id, start_time, end_time, date') \
+                .eq('user_id', user_id)
+            if self.since is not None:
+                query = query.gte('date', self.since.isoformat())
+            query = query.order('date').order('start_time').order('schedule_id') \
+                .range(len(rows), len(rows) + self.page_size - 1)
+            page = self._read(query).data or []
+            if not page:
+                return rows
+            rows.extend(page)
+
+    def audit_user(self, user_id):
+        """
+        Returns:
+            tuple: (rows checked, [(user_id, date, conflicts), ...])
+        """
+        rows = self.user_rows(user_id)
+        return len(rows), list(partition_conflicts(rows))
+
+    def run(self, on_conflict=None):
+        """
+        Audit every user
+
+        Args:
+            on_conflict: Optional callable(user_id, date, conflicts) per
+                conflicting partition
+
+        Returns:
+            dict: users, rows, conflicting partitions and conflicting pairs
+        """
+        summary = {'users': 0, 'rows': 0, 'partitions': 0, 'conflicts': 0}
+        started = time.time()
+
+        for user_id in self.iter_user_ids():
+            rows, partitions = self.audit_user(user_id)
+            summary['users'] += 1
+            summary['rows'] += rows
+            for user, day, conflicts in partitions:
+                summary['partitions'] += 1
+                summary['conflicts'] += len(conflicts)
+                logger.info("%s %s: %d overlapping pair(s)", user, day, len(conflicts))
+                if on_conflict is not None:
+                    on_conflict(user, day, conflicts)
+            if self.pause_seconds:
+                time.sleep(self.pause_seconds)
+
+        summary['elapsed'] = round(time.time() - started, 2)
+        logger.info("Done: %s", summary)
+        return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Report overlapping schedule rows for every user and date')
+    parser.add_argument('--since', default=None, help='Only audit dates on or after YYYY-MM-DD')
+    parser.add_argument('--page-size', type=int, default=500)
+    parser.add_argument('--pause', type=float, default=0.0, help='Seconds to sleep between users')
+    parser.add_argument('--output', default=None, help='Write conflicts as JSON lines to this file')
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='[AUDIT] %(message)s')
+
+    audit = ConflictAudit(
+        page_size=args.page_size,
+        since=date.fromisoformat(args.since) if args.since else None,
+        pause_seconds=args.pause
+    )
+
+    if args.output is None:
+        audit.run()
+        return
+
+    with open(args.output, 'w', encoding='utf-8') as output:
+        def write(user_id, day, conflicts):
+            for first, second, start, end in conflicts:
+                output.write(json.dumps({
+                    'user_id': user_id,
+                    'date': day,
+                    'first': first.get('schedule_id'),
+                    'second': second.get('schedule_id'),
+                    'overlap_start': start,
+                    'overlap_end': end
+                }) + '\n')
+        audit.run(on_conflict=write)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""
+Per-user data version counters.
+
+Every write to a user's tasks, regular tasks or schedules bumps their
+version. Read endpoints derive ETags from it, so a conditional GET can be
+answered with 304 without querying Supabase.
+
+Single host only: the counters live in the host's local SQLite store, shared
+by every worker process on that host but not across hosts or containers.
+Behind a load balancer spanning several hosts, a write on one host doesn't
+bump the others' counters and they would answer 304 with stale data, so
+deploy conditional GETs that way only with sticky sessions or move the
+counter into the database.
+"""
+import hashlib
+
+from services.local_store import get_local_store
+
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS data_versions (
+    user_id TEXT PRIMARY KEY,
+    version INTEGER NOT NULL
+);
+'''
+
+
+class DataVersions:
+    """Monotonic per-user version numbers shared by all local workers"""
+
+    def __init__(self, store=None):
+        self.store = store or get_local_store()
+        self.store.ensure_schema(SCHEMA)
+
+    def get(self, user_id):
+        row = self.store.execute(
+            'SELECT version FROM data_versions WHERE user_id = ?', (user_id,)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def bump(self, user_id):
+        """Record that the user's data changed; returns the new version"""
+        with self.store.transaction() as conn:
+            conn.execute(
+                'INSERT INTO data_versions (user_id, version) VALUES (?, 1) '
+                'ON CONFLICT(user_id) DO UPDATE SET version = version + 1',
+                (user_id,)
+            )
+            return conn.execute(
+                'SELECT version FROM data_versions WHERE user_id = ?', (user_id,)
+            ).fetchone()[0]
+
+    def etag(self, user_id, *parts):
+        """Strong ETag for a resource of this user at the current version"""
+        key = ':'.join([user_id, str(self.get(user_id))] + [str(part) for part in parts])
+        return hashlib.sha1(key.encode('utf-8')).hexdigest()[:20]
+
+    def conditional(self, user_id, if_none_match, *parts):
+        """
+        ETag for a conditional GET and whether the client's copy is current
+
+        Args:
+            user_id: User id
+            if_none_match: Raw If-None-Match header value, or None
+            *parts: Resource name and parameters, as for etag()
+
+        Returns:
+            tuple: (etag, not_modified); answer 304 when not_modified
+        """
+        etag = self.etag(user_id, *parts)
+        return etag, etag_matches(if_none_match, etag)
+
+
+def etag_matches(if_none_match, etag):
+    """Whether an If-None-Match header lists etag (weak comparison, '*' matches anything)"""
+    for candidate in (if_none_match or '').split(','):
+        candidate = candidate.strip()
+        if candidate == '*':
+            return True
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate.strip('"') == etag:
+            return True
+    return False
@@ -1,37 +1,193 @@
-from supabase import create_client, Client
+import logging
 import os
+import random
+import threading
+import time
 from dotenv import load_dotenv
 from typing import Optional
 
+from services import query_profiler
+
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+
+def _env_number(name, default, cast=float):
+    value = os.getenv(name)
+    return cast(value) if value else default
+
+
 class SupabaseClient:
+    """
+    Process-wide Supabase client.
+
+    The underlying client is created lazily on first use and re-created when
+    the process id changes, so a pre-forking server never shares sockets
+    between workers. Pool size, timeouts and read retries are configured via
+    SUPABASE_POOL_SIZE, SUPABASE_TIMEOUT, SUPABASE_CONNECT_TIMEOUT and
+    SUPABASE_READ_RETRIES.
+    """
     _instance = None
-    _client: Optional[Client] = None
+    _client = None
+    _pid: Optional[int] = None
+    _lock = threading.Lock()
+
+    POOL_SIZE = _env_number('SUPABASE_POOL_SIZE', 10, int)
+    TIMEOUT = _env_number('SUPABASE_TIMEOUT', 10.0)
+    CONNECT_TIMEOUT = _env_number('SUPABASE_CONNECT_TIMEOUT', 3.0)
+    READ_RETRIES = _env_number('SUPABASE_READ_RETRIES', 2, int)
+    RETRY_BASE_DELAY = 0.2  # seconds, doubled per attempt with full jitter
+
+    # Connection counters for sizing worker pools (per process)
+    stats = {
+        'in_flight': 0,
+        'requests': 0,
+        'new_connections': 0,
+        'reused_connections': 0,
+        'retries': 0,
+        'clients_created': 0,
+    }
+    _stats_lock = threading.Lock()
 
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super().__new__(cls)
-            cls._initialize_client()
         return cls._instance
-    
+
+    @classmethod
+    def _count(cls, name, amount=1):
+        with cls._stats_lock:
+            cls.stats[name] += amount
+
+    @classmethod
+    def _build_http_client(cls):
+        import httpx
+
+        class CountingTransport(httpx.HTTPTransport):
+            """
+            Tracks in-flight requests and whether a pooled connection was reused
+
+            httpcore reports a connect through the request's trace extension,
+            so each request learns whether it opened a connection on its own,
+            without looking at the shared pool.
+            """
+
+            def handle_request(self, request):
+                opened = []
+                outer_trace = request.extensions.get('trace')
+
+                def trace(event_name, info):
+                    if event_name.startswith('connection.connect_') and event_name.endswith('.complete'):
+                        opened.append(True)
+                    if outer_trace is not None:
+                        outer_trace(event_name, info)
+
+                request.extensions['trace'] = trace
+                cls._count('in_flight')
+                cls._count('requests')
+                try:
+                    response = super().handle_request(request)
+                except Exception:
+                    if opened:
+                        cls._count('new_connections')
+                    raise
+                finally:
+                    cls._count('in_flight', -1)
+                cls._count('new_connections' if opened else 'reused_connections')
+                return response
+
+        limits = httpx.Limits(
+            max_connections=cls.POOL_SIZE,
+            max_keepalive_connections=cls.POOL_SIZE,
+            keepalive_expiry=30.0
+        )
+        return httpx.Client(
+            transport=CountingTransport(limits=limits),
+            timeout=httpx.Timeout(cls.TIMEOUT, connect=cls.CONNECT_TIMEOUT),
+        )
+
     @classmethod
     def _initialize_client(cls):
+        from supabase import create_client, ClientOptions
+
         url = os.getenv('SUPABASE_URL')
         key = os.getenv('SUPABASE_KEY')
         
         if not url or not key:
             raise ValueError("SUPABASE_URL and SUPABASE_KEY must be set in environment variables")
-        
-        cls._client = create_client(url, key)
+
+        try:
+            options = ClientOptions(
+                postgrest_client_timeout=cls.TIMEOUT,
+                httpx_client=cls._build_http_client()
+            )
+        except TypeError:
+            # Older supabase releases don't accept a custom httpx client
+            logger.warning(
+                "This supabase release doesn't accept a custom httpx client; SUPABASE_POOL_SIZE, "
+                "SUPABASE_CONNECT_TIMEOUT and the connection counters are not in effect"
+            )
+            options = ClientOptions(postgrest_client_timeout=cls.TIMEOUT)
+
+        cls._client = create_client(url, key, options=options)
+        cls._pid = os.getpid()
+        cls._count('clients_created')
 
     @classmethod
-    def get_client(cls) -> Client:
-        """Get the Supabase client instance"""
-        if cls._client is None:
-            cls._initialize_client()
+    def get_client(cls):
+        """
+        Get the Supabase client instance for the current process
+
+        With TIMELY_QUERY_PROFILE set, the client is wrapped so table queries
+        are recorded by services.query_profiler.
+        """
+        if cls._client is None or cls._pid != os.getpid():
+            with cls._lock:
+                if cls._client is None or cls._pid != os.getpid():
+                    if cls._pid != os.getpid():
+                        # Forked child: counters describe the parent's sockets
+                        cls._stats_lock = threading.Lock()
+                        for name in cls.stats:
+                            cls.stats[name] = 0
+                    cls._initialize_client()
+        if query_profiler.ENABLED:
+            return query_profiler.ProfiledClient(cls._client)
         return cls._client
 
+    @classmethod
+    def execute_read(cls, query, retries=None):
+        """
+        Execute an idempotent read query with bounded retries.
+
+        Transport errors and timeouts are retried with exponential backoff and
+        full jitter. Never use this for inserts, updates or deletes.
+
+        Args:
+            query: A built (not yet executed) postgrest select query
+            retries: Override for SUPABASE_READ_RETRIES
+
+        Returns:
+            The query response
+        """
+        import httpx
+
+        retries = cls.READ_RETRIES if retries is None else retries
+        for attempt in range(retries + 1):
+            try:
+                return query.execute()
+            except httpx.TransportError:
+                if attempt == retries:
+                    raise
+                cls._count('retries')
+                time.sleep(random.uniform(0, cls.RETRY_BASE_DELAY * (2 ** attempt)))
+
+    @classmethod
+    def get_stats(cls):
+        """Snapshot of this process's connection counters"""
+        with cls._stats_lock:
+            return dict(cls.stats, pid=os.getpid(), pool_size=cls.POOL_SIZE)
+
     @classmethod
     def signup(cls, email: str, password: str, chronotype: str):
         client = cls.get_client()
@@ -0,0 +1,124 @@
+"""
+Measured task durations, persisted in the local store.
+
+TaskStarts records when the user actually starts a scheduled task; on
+completion the elapsed time is what the duration model learns from, never
+the scheduled slot (which is often the model's own prediction).
+PersistentDurationEstimator keeps the model's per-(user, task) state in the
+local store, so it survives restarts and every worker on the host shares it.
+"""
+import time
+from datetime import datetime
+
+from core.algorithms.predictor import DurationEstimator
+from services.local_store import get_local_store
+
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS duration_stats (
+    user_id TEXT NOT NULL,
+    task_key TEXT NOT NULL,
+    weight REAL NOT NULL,
+    mean REAL NOT NULL,
+    m2 REAL NOT NULL,
+    samples INTEGER NOT NULL,
+    last_seen REAL NOT NULL,
+    PRIMARY KEY (user_id, task_key)
+);
+CREATE TABLE IF NOT EXISTS task_starts (
+    user_id TEXT NOT NULL,
+    schedule_id TEXT NOT NULL,
+    started_at REAL NOT NULL,
+    PRIMARY KEY (user_id, schedule_id)
+);
+'''
+
+
+class PersistentDurationEstimator(DurationEstimator):
+    """DurationEstimator whose state is a row per (user, task) in the local store"""
+
+    def __init__(self, store=None, **kwargs):
+        super().__init__(**kwargs)
+        self.store = store or get_local_store()
+        self.store.ensure_schema(SCHEMA)
+
+    def _select(self, conn, key):
+        row = conn.execute(
+            'SELECT weight, mean, m2, samples, last_seen FROM duration_stats WHERE user_id = ? AND task_key = ?',
+            (str(key[0]), key[1])
+        ).fetchone()
+        if row is None:
+            return None
+        weight, mean, m2, samples, last_seen = row
+        return [weight, mean, m2, samples, datetime.fromtimestamp(last_seen)]
+
+    def _read(self, key):
+        return self._select(self.store.connection(), key)
+
+    def _update(self, key, update):
+        with self.store.transaction() as conn:
+            weight, mean, m2, samples, last_seen = update(self._select(conn, key))
+            conn.execute(
+                'INSERT OR REPLACE INTO duration_stats (user_id, task_key, weight, mean, m2, samples, last_seen) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (str(key[0]), key[1], weight, mean, m2, samples, last_seen.timestamp())
+            )
+
+    def clear(self):
+        self.store.execute('DELETE FROM duration_stats')
+
+
+class TaskStarts:
+    """When the user started each scheduled task they haven't completed yet"""
+
+    # Starts older than this are abandoned, not measured
+    MAX_AGE_SECONDS = 24 * 3600
+
+    def __init__(self, store=None):
+        self.store = store or get_local_store()
+        self.store.ensure_schema(SCHEMA)
+
+    def start(self, user_id, schedule_id, at=None):
+        """Record a start (a second start keeps the first)"""
+        at = at or datetime.now()
+        with self.store.transaction() as conn:
+            conn.execute(
+                'INSERT OR IGNORE INTO task_starts (user_id, schedule_id, started_at) VALUES (?, ?, ?)',
+                (str(user_id), str(schedule_id), at.timestamp())
+            )
+            conn.execute(
+                'DELETE FROM task_starts WHERE started_at < ?',
+                (time.time() - self.MAX_AGE_SECONDS,)
+            )
+
+    def started(self, user_id):
+        """
+        Returns:
+            dict: {schedule_id: started_at datetime} for the user's open starts
+        """
+        rows = self.store.execute(
+            'SELECT schedule_id, started_at FROM task_starts WHERE user_id = ? AND started_at >= ?',
+            (str(user_id), time.time() - self.MAX_AGE_SECONDS)
+        ).fetchall()
+        return {schedule_id: datetime.fromtimestamp(started_at) for schedule_id, started_at in rows}
+
+    def finish(self, user_id, schedule_id):
+        """
+        Remove a start on completion
+
+        Returns:
+            datetime or None: When the task was started, if it was and the
+                start isn't stale
+        """
+        with self.store.transaction() as conn:
+            row = conn.execute(
+                'SELECT started_at FROM task_starts WHERE user_id = ? AND schedule_id = ?',
+                (str(user_id), str(schedule_id))
+            ).fetchone()
+            conn.execute(
+                'DELETE FROM task_starts WHERE user_id = ? AND schedule_id = ?',
+                (str(user_id), str(schedule_id))
+            )
+        if row is None or row[0] < time.time() - self.MAX_AGE_SECONDS:
+            return None
+        return datetime.fromtimestamp(row[0])
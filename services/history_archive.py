@@ -0,0 +1,260 @@
+"""
+Append-only columnar archive for task history past the retention window.
+
+Rows moved out of taskHistory by the retention job are stored on local disk
+as fixed-width native-endian integer columns:
+
+    date.col    int32, days since 1970-01-01
+    start.col   int16, start minute of day
+    end.col     int16, end minute of day
+    task.col    int32, code into names.jsonl (dictionary-encoded task name)
+    user.col    int32, code into users.jsonl (dictionary-encoded user id)
+
+Sixteen bytes per row (4 + 2 + 2 + 4 + 4) instead of a JSON record, and
+every column can be memory-mapped and cast to an integer view for aggregate
+scans without parsing anything. meta.json holds the committed row count, so
+a crash in the middle of an append is rolled back the next time the archive
+is opened.
+
+The app only writes the archive (through the retention job); history pages
+never read it. ArchiveReader is for offline aggregate scans, e.g. from a
+shell or a reporting script.
+"""
+import json
+import mmap
+import os
+from array import array
+from collections import Counter
+from datetime import date, time
+
+
+EPOCH = date(1970, 1, 1)
+
+COLUMNS = {
+    'date': 'i',
+    'start': 'h',
+    'end': 'h',
+    'task': 'i',
+    'user': 'i',
+}
+
+
+class HistoryArchive:
+    """Local, append-only, dictionary-encoded columnar history archive"""
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self.rows = self._read_meta()
+        self._names = self._load_dictionary('names.jsonl')
+        self._users = self._load_dictionary('users.jsonl')
+        self._name_codes = {name: code for code, name in enumerate(self._names)}
+        self._user_codes = {user: code for code, user in enumerate(self._users)}
+        # Roll back any partially written append
+        self.truncate(self.rows)
+
+    # ----- storage helpers -----
+
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    def _column_file(self, column):
+        return self._file(f'{column}.col')
+
+    def _read_meta(self):
+        try:
+            with open(self._file('meta.json')) as f:
+                return json.load(f)['rows']
+        except (FileNotFoundError, ValueError, KeyError):
+            return 0
+
+    def _write_meta(self):
+        tmp_path = self._file('meta.json.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump({'rows': self.rows, 'columns': list(COLUMNS)}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self._file('meta.json'))
+
+    def _load_dictionary(self, filename):
+        try:
+            with open(self._file(filename), encoding='utf-8') as f:
+                return [json.loads(line) for line in f if line.strip()]
+        except FileNotFoundError:
+            return []
+
+    def _encode(self, value, values, codes, filename, pending):
+        code = codes.get(value)
+        if code is None:
+            code = len(values)
+            values.append(value)
+            codes[value] = code
+            pending.setdefault(filename, []).append(value)
+        return code
+
+    @staticmethod
+    def _minute_of_day(value):
+        if isinstance(value, str):
+            value = time.fromisoformat(value)
+        return value.hour * 60 + value.minute
+
+    @staticmethod
+    def _day_number(value):
+        if isinstance(value, str):
+            value = date.fromisoformat(value[:10])
+        return (value - EPOCH).days
+
+    # ----- writing -----
+
+    def append(self, records):
+        """
+        Append taskHistory rows to the archive.
+
+        Args:
+            records: Iterable of taskHistory dicts (date, startTime, endTime,
+                userId and an optional joined tasks.name)
+
+        Returns:
+            int: Number of rows appended
+        """
+        columns = {column: array(typecode) for column, typecode in COLUMNS.items()}
+        pending_dictionary = {}
+
+        for record in records:
+            task = record.get('tasks') or {}
+            columns['date'].append(self._day_number(record['date']))
+            columns['start'].append(self._minute_of_day(record['startTime']))
+            columns['end'].append(self._minute_of_day(record['endTime']))
+            columns['task'].append(self._encode(
+                task.get('name') or 'Unknown', self._names, self._name_codes, 'names.jsonl', pending_dictionary
+            ))
+            columns['user'].append(self._encode(
+                record['userId'], self._users, self._user_codes, 'users.jsonl', pending_dictionary
+            ))
+
+        count = len(columns['date'])
+        if not count:
+            return 0
+
+        # Dictionary entries first so committed codes always resolve
+        for filename, values in pending_dictionary.items():
+            with open(self._file(filename), 'a', encoding='utf-8') as f:
+                for value in values:
+                    f.write(json.dumps(value) + '\n')
+
+        for column, values in columns.items():
+            with open(self._column_file(column), 'ab') as f:
+                values.tofile(f)
+                f.flush()
+                os.fsync(f.fileno())
+
+        self.rows += count
+        self._write_meta()
+        return count
+
+    def truncate(self, rows):
+        """Drop every row after the first ``rows`` (used to roll back appends)"""
+        for column, typecode in COLUMNS.items():
+            filename = self._column_file(column)
+            size = rows * array(typecode).itemsize
+            if os.path.exists(filename) and os.path.getsize(filename) > size:
+                with open(filename, 'r+b') as f:
+                    f.truncate(size)
+        if rows != self.rows:
+            self.rows = rows
+            self._write_meta()
+
+    # ----- reading -----
+
+    def open_reader(self):
+        return ArchiveReader(self)
+
+
+class ArchiveReader:
+    """Memory-mapped view over the archive's columns for aggregate scans"""
+
+    def __init__(self, archive):
+        self.rows = archive.rows
+        self.names = list(archive._names)
+        self.users = list(archive._users)
+        self._user_codes = dict(archive._user_codes)
+        self._name_codes = dict(archive._name_codes)
+        self._maps = []
+        self.columns = {}
+
+        for column, typecode in COLUMNS.items():
+            length = self.rows * array(typecode).itemsize
+            if not length:
+                self.columns[column] = memoryview(array(typecode))
+                continue
+            with open(archive._column_file(column), 'rb') as f:
+                mapped = mmap.mmap(f.fileno(), length, access=mmap.ACCESS_READ)
+            self._maps.append(mapped)
+            self.columns[column] = memoryview(mapped).cast('B').cast(typecode)
+
+    def close(self):
+        for view in self.columns.values():
+            view.release()
+        for mapped in self._maps:
+            mapped.close()
+        self._maps = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _rows_for_user(self, user_id):
+        code = self._user_codes.get(user_id)
+        if code is None:
+            return []
+        return [i for i, value in enumerate(self.columns['user']) if value == code]
+
+    def task_counts(self, user_id=None):
+        """
+        Count archived completions per task name.
+
+        Returns:
+            dict: {task_name: count}
+        """
+        tasks = self.columns['task']
+        if user_id is None:
+            counts = Counter(tasks)
+        else:
+            counts = Counter(tasks[i] for i in self._rows_for_user(user_id))
+        return {self.names[code]: count for code, count in counts.items()}
+
+    def start_time_histogram(self, bucket_minutes=60, user_id=None, task_name=None):
+        """
+        Histogram of start minute-of-day.
+
+        Args:
+            bucket_minutes: Bucket width in minutes
+            user_id: Optional user filter
+            task_name: Optional task name filter
+
+        Returns:
+            list: Counts per bucket starting at midnight
+        """
+        histogram = [0] * -(-1440 // bucket_minutes)
+        starts = self.columns['start']
+        tasks = self.columns['task']
+
+        indices = range(self.rows) if user_id is None else self._rows_for_user(user_id)
+        task_code = self._name_codes.get(task_name) if task_name else None
+        if task_name and task_code is None:
+            return histogram
+
+        for i in indices:
+            if task_code is None or tasks[i] == task_code:
+                histogram[starts[i] // bucket_minutes] += 1
+        return histogram
+
+    def date_range(self):
+        """Earliest and latest archived dates, or None when empty"""
+        if not self.rows:
+            return None
+        dates = self.columns['date']
+        return (date.fromordinal(EPOCH.toordinal() + min(dates)),
+                date.fromordinal(EPOCH.toordinal() + max(dates)))
@@ -0,0 +1,173 @@
+"""
+Global history retention job (Objective 3b).
+
+Sweeps every user's taskHistory rows older than the retention cutoff in
+bounded batches, sleeping between batches so the database is never hit with
+one huge delete. Progress is checkpointed to a local JSON file so an
+interrupted run resumes with the same cutoff and running totals.
+
+With --archive, expired rows are moved into a local HistoryArchive before
+they are deleted instead of being dropped.
+
+Run with:
+    python -m services.history_retention --days 90 --batch-size 200 --archive instance/history_archive
+"""
+import argparse
+import json
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+
+from services.history_archive import HistoryArchive
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHECKPOINT = os.path.join('instance', 'history_retention.json')
+
+
+class HistoryRetentionJob:
+    """Batched, throttled and resumable deletion of expired task history"""
+
+    # Ids per in_ delete, keeps request URLs short
+    BATCH_SIZE = 200
+
+    def __init__(self, days=90, batch_size=BATCH_SIZE, pause_seconds=0.5,
+                 checkpoint_path=DEFAULT_CHECKPOINT, max_batches=None, client=None,
+                 archive=None):
+        self.days = days
+        self.batch_size = batch_size
+        self.pause_seconds = pause_seconds
+        self.checkpoint_path = checkpoint_path
+        self.max_batches = max_batches
+        self.client = client
+        self.archive = archive
+
+    def _load_checkpoint(self):
+        try:
+            with open(self.checkpoint_path) as f:
+                state = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        return state if state.get('status') == 'running' else None
+
+    def _save_checkpoint(self, state):
+        directory = os.path.dirname(self.checkpoint_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.checkpoint_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def _fetch_batch(self, cutoff):
+        return self.client.table('taskHistory').select(
+            'historyId, userId, taskId, startTime, endTime, date, completed_at, tasks(name)'
+        ).lt('date', cutoff)\
+         .order('date')\
+         .order('historyId')\
+         .limit(self.batch_size)\
+         .execute().data or []
+
+    def run(self):
+        """
+        Run (or resume) the sweep.
+
+        Returns:
+            dict: Final checkpoint state with deleted rows and rows/second
+        """
+        if self.client is None:
+            from services.database_client import SupabaseClient
+            self.client = SupabaseClient.get_client()
+
+        state = self._load_checkpoint()
+        if state:
+            logger.info("Resuming run started %s (cutoff %s, %d rows deleted so far)",
+                        state['started_at'], state['cutoff'], state['deleted'])
+            # The last batch was archived but possibly not deleted. If its
+            # rows are still in the table they will be archived again.
+            if self.archive is not None and state.get('archive_rows') is not None:
+                remaining = self.client.table('taskHistory').select('historyId')\
+                    .in_('historyId', state['pending_ids']).limit(1).execute()
+                if remaining.data:
+                    self.archive.truncate(state['archive_rows'])
+        else:
+            state = {
+                'status': 'running',
+                'cutoff': (datetime.now() - timedelta(days=self.days)).date().isoformat(),
+                'started_at': datetime.now().isoformat(),
+                'deleted': 0,
+                'batches': 0,
+                'elapsed_seconds': 0.0
+            }
+            self._save_checkpoint(state)
+
+        batches_this_run = 0
+        while self.max_batches is None or batches_this_run < self.max_batches:
+            batch_start = time.monotonic()
+            rows = self._fetch_batch(state['cutoff'])
+            if not rows:
+                state['status'] = 'done'
+                break
+
+            ids = [row['historyId'] for row in rows]
+
+            if self.archive is not None:
+                state['archive_rows'] = self.archive.rows
+                state['pending_ids'] = ids
+                self._save_checkpoint(state)
+                self.archive.append(rows)
+
+            self.client.table('taskHistory').delete().in_('historyId', ids).execute()
+            state['archive_rows'] = None
+            state['pending_ids'] = None
+
+            state['deleted'] += len(ids)
+            state['batches'] += 1
+            state['elapsed_seconds'] += time.monotonic() - batch_start
+            self._save_checkpoint(state)
+            batches_this_run += 1
+
+            rate = state['deleted'] / state['elapsed_seconds'] if state['elapsed_seconds'] else 0.0
+            logger.info("Batch %d: deleted %d rows (%d total, %.1f rows/s)",
+                        state['batches'], len(ids), state['deleted'], rate)
+
+            if len(rows) < self.batch_size:
+                state['status'] = 'done'
+                break
+            time.sleep(self.pause_seconds)
+
+        state['rows_per_second'] = (
+            state['deleted'] / state['elapsed_seconds'] if state['elapsed_seconds'] else 0.0
+        )
+        self._save_checkpoint(state)
+        logger.info("%s: %d rows deleted in %d batches (%.1f rows/s)",
+                    state['status'], state['deleted'], state['batches'], state['rows_per_second'])
+        return state
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Delete task history older than the retention window')
+    parser.add_argument('--days', type=int, default=90)
+    parser.add_argument('--batch-size', type=int, default=HistoryRetentionJob.BATCH_SIZE)
+    parser.add_argument('--pause', type=float, default=0.5, help='Seconds to sleep between batches')
+    parser.add_argument('--max-batches', type=int, default=None, help='Stop after N batches (resume later)')
+    parser.add_argument('--checkpoint', default=DEFAULT_CHECKPOINT)
+    parser.add_argument('--archive', default=None, help='Archive directory for expired rows')
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='[RETENTION] %(message)s')
+
+    job = HistoryRetentionJob(
+        days=args.days,
+        batch_size=args.batch_size,
+        pause_seconds=args.pause,
+        checkpoint_path=args.checkpoint,
+        max_batches=args.max_batches,
+        archive=HistoryArchive(args.archive) if args.archive else None
+    )
+    job.run()
+
+
+if __name__ == '__main__':
+    main()
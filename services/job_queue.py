@@ -0,0 +1,252 @@
+"""
+In-process background job queue backed by the local SQLite store.
+
+Jobs are rows in the local store, so queued work survives a restart and is
+visible to every worker process on the host. Each process runs a small pool
+of daemon threads that claim queued jobs, at most ``per_user_limit`` running
+at once for any one user.
+"""
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+
+from services.local_store import get_local_store
+
+
+logger = logging.getLogger(__name__)
+
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    owner_pid INTEGER,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created_at);
+CREATE INDEX IF NOT EXISTS jobs_user_kind ON jobs (user_id, kind, created_at);
+'''
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+
+# Jobs this pid started before now belong to an earlier process that reused it
+_LOADED_AT = time.time()
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class JobQueue:
+    """Durable job queue with a lazily started worker pool"""
+
+    POLL_SECONDS = 1.0
+    RETENTION_SECONDS = 24 * 3600
+
+    def __init__(self, store=None, workers=2, per_user_limit=1):
+        self.store = store or get_local_store()
+        self.store.ensure_schema(SCHEMA)
+        self.workers = workers
+        self.per_user_limit = per_user_limit
+        self._handlers = {}
+        self._threads = []
+        self._pid = None
+        self._wakeup = threading.Condition()
+        self._start_lock = threading.Lock()
+
+    def register(self, kind, handler):
+        """
+        Register a job handler
+
+        Args:
+            kind: Job type name
+            handler: Callable(user_id, payload) returning a JSON-serializable result
+        """
+        self._handlers[kind] = handler
+
+    def submit(self, kind, user_id, payload=None, coalesce=False):
+        """
+        Queue a job and return its id immediately
+
+        Args:
+            kind: Job type name
+            user_id: User the job runs for
+            payload: JSON-serializable handler arguments
+            coalesce: Reuse a queued or running job of the same kind, user
+                and payload instead of queuing another. Finished jobs are
+                never reused: their payload predates their own writes, so
+                debouncing finished work is left to the handler (schedule
+                runs go through SingleFlight, which keys results by the
+                version after the run).
+
+        Returns:
+            str: Job id (an existing job's when coalesced)
+        """
+        if kind not in self._handlers:
+            raise ValueError(f"No handler registered for job kind '{kind}'")
+
+        encoded = json.dumps(payload or {}, sort_keys=True)
+        now = time.time()
+        with self.store.transaction() as conn:
+            if coalesce:
+                row = conn.execute(
+                    'SELECT job_id FROM jobs WHERE user_id = ? AND kind = ? AND payload = ? AND status IN (?, ?) '
+                    'ORDER BY created_at DESC LIMIT 1',
+                    (user_id, kind, encoded, QUEUED, RUNNING)
+                ).fetchone()
+                if row is not None:
+                    logger.info("Coalesced %s for %s into job %s", kind, user_id, row[0])
+                    return row[0]
+
+            job_id = str(uuid.uuid4())
+            conn.execute(
+                'INSERT INTO jobs (job_id, user_id, kind, payload, status, created_at) VALUES (?, ?, ?, ?, ?, ?)',
+                (job_id, user_id, kind, encoded, QUEUED, now)
+            )
+        self._ensure_workers()
+        with self._wakeup:
+            self._wakeup.notify()
+        return job_id
+
+    def get(self, job_id):
+        """
+        Job status
+
+        Returns:
+            dict or None: job_id, user_id, kind, status, result, error and timestamps
+        """
+        row = self.store.execute(
+            'SELECT job_id, user_id, kind, status, result, error, created_at, started_at, finished_at '
+            'FROM jobs WHERE job_id = ?', (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        job = dict(zip(
+            ('job_id', 'user_id', 'kind', 'status', 'result', 'error', 'created_at', 'started_at', 'finished_at'),
+            row
+        ))
+        job['result'] = json.loads(job['result']) if job['result'] else None
+        return job
+
+    def depth(self):
+        """Number of queued (not yet running) jobs"""
+        return self.store.execute('SELECT COUNT(*) FROM jobs WHERE status = ?', (QUEUED,)).fetchone()[0]
+
+    def running(self):
+        return self.store.execute('SELECT COUNT(*) FROM jobs WHERE status = ?', (RUNNING,)).fetchone()[0]
+
+    # ----- workers -----
+
+    def _ensure_workers(self):
+        if self._pid == os.getpid() and all(thread.is_alive() for thread in self._threads):
+            return
+
+        with self._start_lock:
+            if self._pid == os.getpid() and all(thread.is_alive() for thread in self._threads):
+                return
+
+            self._recover()
+            self._pid = os.getpid()
+            self._threads = []
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f'job-worker-{i}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def start(self):
+        """Start workers eagerly (e.g. at boot, to pick up jobs left by a restart)"""
+        self._ensure_workers()
+
+    def _recover(self):
+        """
+        Requeue jobs whose worker process died mid-run
+
+        Jobs owned by a live process stay running, this process included:
+        its other worker threads may still be on them.
+        """
+        with self.store.transaction() as conn:
+            rows = conn.execute(
+                'SELECT job_id, owner_pid, started_at FROM jobs WHERE status = ?', (RUNNING,)
+            ).fetchall()
+            for job_id, owner_pid, started_at in rows:
+                reused_pid = owner_pid == os.getpid() and (started_at or 0) < _LOADED_AT
+                if owner_pid is None or not _pid_alive(owner_pid) or reused_pid:
+                    conn.execute(
+                        'UPDATE jobs SET status = ?, owner_pid = NULL, started_at = NULL WHERE job_id = ?',
+                        (QUEUED, job_id)
+                    )
+            conn.execute(
+                'DELETE FROM jobs WHERE status IN (?, ?) AND finished_at < ?',
+                (DONE, FAILED, time.time() - self.RETENTION_SECONDS)
+            )
+
+    def _claim(self):
+        """Atomically move the oldest eligible queued job to running"""
+        with self.store.transaction() as conn:
+            row = conn.execute(
+                'SELECT job_id, user_id, kind, payload FROM jobs '
+                'WHERE status = ? AND user_id NOT IN ('
+                '    SELECT user_id FROM jobs WHERE status = ? GROUP BY user_id HAVING COUNT(*) >= ?'
+                ') ORDER BY created_at LIMIT 1',
+                (QUEUED, RUNNING, self.per_user_limit)
+            ).fetchone()
+            if row is None:
+                return None
+
+            conn.execute(
+                'UPDATE jobs SET status = ?, owner_pid = ?, started_at = ? WHERE job_id = ?',
+                (RUNNING, os.getpid(), time.time(), row[0])
+            )
+            return row
+
+    def _finish(self, job_id, status, result=None, error=None):
+        self.store.execute(
+            'UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? WHERE job_id = ?',
+            (status, json.dumps(result) if result is not None else None, error, time.time(), job_id)
+        )
+        # A finished job may unblock another job for the same user
+        with self._wakeup:
+            self._wakeup.notify_all()
+
+    def _work(self):
+        while True:
+            try:
+                job = self._claim()
+            except Exception as e:
+                logger.warning("Error claiming job: %s", e)
+                job = None
+
+            if job is None:
+                with self._wakeup:
+                    self._wakeup.wait(self.POLL_SECONDS)
+                continue
+
+            job_id, user_id, kind, payload = job
+            logger.info("Running %s job %s for %s", kind, job_id, user_id)
+            try:
+                result = self._handlers[kind](user_id, json.loads(payload))
+                self._finish(job_id, DONE, result=result)
+            except Exception as e:
+                logger.exception("%s job %s failed", kind, job_id)
+                self._finish(job_id, FAILED, error=str(e))
@@ -0,0 +1,82 @@
+"""
+Process-local SQLite store for server-side state that doesn't belong in
+Supabase or in the session cookie.
+
+One connection per thread and process (connections are reopened after a
+fork). The database lives at TIMELY_LOCAL_DB, defaulting to
+instance/timely_local.sqlite3.
+"""
+import os
+import sqlite3
+import threading
+
+
+DEFAULT_PATH = os.path.join('instance', 'timely_local.sqlite3')
+
+
+class LocalStore:
+    """Thin wrapper around a WAL-mode SQLite file shared by all workers"""
+
+    def __init__(self, path=None):
+        self.path = path or os.environ.get('TIMELY_LOCAL_DB', DEFAULT_PATH)
+        self._local = threading.local()
+        self._schemas = []
+        self._schema_lock = threading.Lock()
+
+    def connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            for schema in self._schemas:
+                conn.executescript(schema)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def ensure_schema(self, schema):
+        """Register CREATE ... IF NOT EXISTS statements run on every new connection"""
+        with self._schema_lock:
+            if schema not in self._schemas:
+                self._schemas.append(schema)
+                conn = getattr(self._local, 'conn', None)
+                if conn is not None:
+                    conn.executescript(schema)
+
+    def execute(self, sql, params=()):
+        return self.connection().execute(sql, params)
+
+    def transaction(self):
+        """Context manager running its body in a write (IMMEDIATE) transaction"""
+        return _Transaction(self.connection())
+
+
+class _Transaction:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute('BEGIN IMMEDIATE')
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute('ROLLBACK' if exc_type else 'COMMIT')
+        return False
+
+
+_default_store = None
+_default_lock = threading.Lock()
+
+
+def get_local_store():
+    """Shared LocalStore for this process"""
+    global _default_store
+    if _default_store is None:
+        with _default_lock:
+            if _default_store is None:
+                _default_store = LocalStore()
+    return _default_store
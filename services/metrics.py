@@ -0,0 +1,224 @@
+"""
+In-process metrics with Prometheus text exposition.
+
+Request latency is recorded per route by middleware registered in
+create_app(); named spans time the stages inside a route (or a background
+job). Everything is per process: scrape each worker, or aggregate upstream.
+"""
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Route (Flask endpoint or job name) the current code runs under
+current_route = ContextVar('current_route', default='none')
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonically increasing counter with optional labels"""
+
+    kind = 'counter'
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        return [(self.name, _format_labels(self.labelnames, key), value) for key, value in items]
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram with optional labels"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # key -> [per-bucket counts (+Inf last), sum, count]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def samples(self):
+        with self._lock:
+            items = [(key, list(series[0]), series[1], series[2]) for key, series in self._series.items()]
+
+        samples = []
+        for key, counts, total, count in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                samples.append((self.name + '_bucket', labels, cumulative))
+            labels = _format_labels(self.labelnames, key)
+            samples.append((self.name + '_sum', labels, total))
+            samples.append((self.name + '_count', labels, count))
+        return samples
+
+
+class Gauge:
+    """Gauge whose value is read from a callback at scrape time"""
+
+    kind = 'gauge'
+
+    def __init__(self, name, help_text, callback):
+        self.name = name
+        self.help = help_text
+        self.callback = callback
+
+    def samples(self):
+        try:
+            return [(self.name, '', self.callback())]
+        except Exception as e:
+            logger.warning("Error reading gauge %s: %s", self.name, e)
+            return []
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name, help_text, labelnames=()):
+        return self._register(Counter(name, help_text, labelnames))
+
+    def histogram(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, help_text, labelnames, buckets))
+
+    def gauge(self, name, help_text, callback):
+        """Register (or replace) a callback gauge"""
+        with self._lock:
+            self._metrics[name] = Gauge(name, help_text, callback)
+            return self._metrics[name]
+
+    def render(self):
+        """Prometheus text exposition format (version 0.0.4)"""
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            for name, labels, value in metric.samples():
+                lines.append(f'{name}{labels} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+REQUEST_LATENCY = REGISTRY.histogram(
+    'timely_request_duration_seconds', 'HTTP request latency by route', ('route', 'method', 'status')
+)
+STAGE_LATENCY = REGISTRY.histogram(
+    'timely_stage_duration_seconds', 'Latency of named stages within a route or job', ('route', 'stage')
+)
+TASKS_SCHEDULED = REGISTRY.counter('timely_tasks_scheduled_total', 'Tasks placed by the scheduler')
+TASKS_WAITLISTED = REGISTRY.counter('timely_tasks_waitlisted_total', 'Tasks the scheduler could not place')
+SLIVERS = REGISTRY.counter(
+    'timely_schedule_slivers_total', 'Unusably short free gaps left by scheduling runs', ('placement',)
+)
+SLIVER_MINUTES = REGISTRY.counter(
+    'timely_schedule_sliver_minutes_total', 'Minutes in unusably short free gaps', ('placement',)
+)
+
+
+@contextmanager
+def span(stage):
+    """Time a named stage of the current route"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_LATENCY.observe(time.perf_counter() - start, route=current_route.get(), stage=stage)
+
+
+@contextmanager
+def route_context(route):
+    """Attribute spans to ``route`` (used for work outside a request, e.g. jobs)"""
+    token = current_route.set(route)
+    try:
+        yield
+    finally:
+        current_route.reset(token)
+
+
+def init_app(app):
+    """Register request timing middleware on a Flask app"""
+    from flask import g, request
+
+    @app.before_request
+    def _start_request_timer():
+        g.metrics_start = time.perf_counter()
+        g.metrics_route_token = current_route.set(request.endpoint or 'unknown')
+
+    @app.after_request
+    def _record_request(response):
+        start = g.pop('metrics_start', None)
+        if start is not None:
+            REQUEST_LATENCY.observe(
+                time.perf_counter() - start,
+                route=request.endpoint or 'unknown',
+                method=request.method,
+                status=str(response.status_code)
+            )
+        return response
+
+    @app.teardown_request
+    def _reset_route(exc=None):
+        token = g.pop('metrics_route_token', None)
+        if token is not None:
+            try:
+                current_route.reset(token)
+            except ValueError:
+                current_route.set('none')
@@ -0,0 +1,109 @@
+"""
+Schedule quality metrics per user and day.
+
+Each generate run stores the scheduler's quality report (utilization, peak
+share, fragmentation, start delay by priority band, waitlisted priority) in
+the local store, replacing that day's previous run. Aggregates are plain SQL
+over fixed columns, so comparing algorithms or backends across many runs
+doesn't load the rows into Python.
+"""
+import time
+
+from services.local_store import get_local_store
+
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS schedule_quality (
+    user_id TEXT NOT NULL,
+    day TEXT NOT NULL,
+    placement TEXT,
+    scheduled INTEGER NOT NULL,
+    waitlisted INTEGER NOT NULL,
+    utilization REAL NOT NULL,
+    task_utilization REAL NOT NULL,
+    peak_share REAL,
+    delay_high REAL,
+    delay_medium REAL,
+    delay_low REAL,
+    waitlisted_priority REAL NOT NULL,
+    slivers INTEGER NOT NULL,
+    sliver_minutes INTEGER NOT NULL,
+    recorded_at REAL NOT NULL,
+    PRIMARY KEY (user_id, day)
+);
+CREATE INDEX IF NOT EXISTS schedule_quality_day ON schedule_quality (day);
+'''
+
+COLUMNS = (
+    'day', 'placement', 'scheduled', 'waitlisted', 'utilization', 'task_utilization', 'peak_share',
+    'delay_high', 'delay_medium', 'delay_low', 'waitlisted_priority', 'slivers', 'sliver_minutes'
+)
+
+
+class QualityStore:
+    """Latest quality report per (user, day)"""
+
+    def __init__(self, store=None):
+        self.store = store or get_local_store()
+        self.store.ensure_schema(SCHEMA)
+
+    def record(self, user_id, day, quality, placement=None):
+        """Store a run's GreedyScheduler.quality_report(), replacing the day's previous run"""
+        delay = quality['start_delay']
+        self.store.execute(
+            'INSERT OR REPLACE INTO schedule_quality (user_id, day, placement, scheduled, waitlisted, '
+            'utilization, task_utilization, peak_share, delay_high, delay_medium, delay_low, '
+            'waitlisted_priority, slivers, sliver_minutes, recorded_at) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (
+                str(user_id), day.isoformat(), placement, quality['scheduled'], quality['waitlisted'],
+                quality['utilization'], quality['task_utilization'], quality['peak_share'],
+                delay['high'], delay['medium'], delay['low'], quality['waitlisted_priority'],
+                quality['slivers'], quality['sliver_minutes'], time.time()
+            )
+        )
+
+    def history(self, user_id, since):
+        """
+        A user's stored reports from ``since`` on, oldest first
+
+        Returns:
+            list: dicts keyed by COLUMNS
+        """
+        rows = self.store.execute(
+            f'SELECT {", ".join(COLUMNS)} FROM schedule_quality WHERE user_id = ? AND day >= ? ORDER BY day',
+            (str(user_id), since.isoformat())
+        ).fetchall()
+        return [dict(zip(COLUMNS, row)) for row in rows]
+
+    def summary(self, since, user_id=None):
+        """
+        Averages per placement policy over runs from ``since`` on
+
+        Args:
+            since: First day to include
+            user_id: Optional single user; all users otherwise
+
+        Returns:
+            list: dicts with placement, runs and the averaged metrics (AVG
+                skips NULL peak shares and delays)
+        """
+        sql = (
+            'SELECT placement, COUNT(*), AVG(utilization), AVG(task_utilization), AVG(peak_share), '
+            'AVG(delay_high), AVG(delay_medium), AVG(delay_low), AVG(waitlisted_priority), '
+            'AVG(slivers), AVG(waitlisted) FROM schedule_quality WHERE day >= ?'
+        )
+        params = [since.isoformat()]
+        if user_id is not None:
+            sql += ' AND user_id = ?'
+            params.append(str(user_id))
+        rows = self.store.execute(sql + ' GROUP BY placement ORDER BY placement', params).fetchall()
+
+        keys = (
+            'placement', 'runs', 'utilization', 'task_utilization', 'peak_share', 'delay_high',
+            'delay_medium', 'delay_low', 'waitlisted_priority', 'slivers', 'waitlisted'
+        )
+        return [
+            {key: round(value, 4) if isinstance(value, float) else value for key, value in zip(keys, row)}
+            for row in rows
+        ]
@@ -0,0 +1,229 @@
+"""
+Per-request Supabase query profiling with N+1 detection.
+
+When TIMELY_QUERY_PROFILE is set, SupabaseClient.get_client() hands out a
+thin proxy that records every ``table(...)...execute()`` call made while a
+profile is active: table, operation, filters, row count and latency. Calls
+are grouped per request; queries of the same shape (same table, operation
+and filtered columns, any values) repeated TIMELY_QUERY_PROFILE_N1 times or
+more within one request are flagged as N+1.
+
+The summary is logged per request (at WARNING when an N+1 is flagged) and
+returned in an X-Query-Profile response header.
+"""
+import logging
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+
+logger = logging.getLogger(__name__)
+
+ENABLED = os.getenv('TIMELY_QUERY_PROFILE', '').lower() in ('1', 'true', 'yes')
+N_PLUS_ONE_THRESHOLD = int(os.getenv('TIMELY_QUERY_PROFILE_N1') or 3)
+
+OPERATIONS = ('select', 'insert', 'update', 'upsert', 'delete')
+
+# Profile of the request (or job) currently running, if any
+current_profile = ContextVar('current_profile', default=None)
+
+
+def _short(value, limit=40):
+    text = repr(value)
+    return text if len(text) <= limit else text[:limit - 3] + '...'
+
+
+class QueryProfile:
+    """Queries recorded for one request"""
+
+    def __init__(self, label):
+        self.label = label
+        self.queries = []
+
+    def record(self, table, operation, filters, rows, seconds, error=None):
+        self.queries.append({
+            'table': table,
+            'operation': operation,
+            # (method, column, value) triples in call order
+            'filters': filters,
+            'rows': rows,
+            'ms': seconds * 1000,
+            'error': error,
+        })
+
+    @staticmethod
+    def shape(query):
+        """Query identity with filter values left out"""
+        columns = ' '.join(f'{method}({column})' for method, column, _ in query['filters'])
+        return f"{query['table']} {query['operation']} {columns}".strip()
+
+    @property
+    def total_ms(self):
+        return sum(query['ms'] for query in self.queries)
+
+    def n_plus_one(self, threshold=None):
+        """
+        Repeated same-shape queries
+
+        Returns:
+            list: (shape, count, total ms) for shapes seen at least
+                ``threshold`` times, most frequent first
+        """
+        threshold = threshold or N_PLUS_ONE_THRESHOLD
+        groups = {}
+        for query in self.queries:
+            group = groups.setdefault(self.shape(query), [0, 0.0])
+            group[0] += 1
+            group[1] += query['ms']
+        return sorted(
+            ((shape, count, ms) for shape, (count, ms) in groups.items() if count >= threshold),
+            key=lambda item: -item[1]
+        )
+
+    def header(self):
+        """Compact summary for the X-Query-Profile response header"""
+        value = f'queries={len(self.queries)}; time={self.total_ms:.1f}ms'
+        repeated = self.n_plus_one()
+        if repeated:
+            value += '; n+1=' + ', '.join(f'{count}x {shape}' for shape, count, _ in repeated)
+        return value
+
+    def summary(self):
+        """Multi-line log summary"""
+        lines = [f"{self.label}: {len(self.queries)} queries, {self.total_ms:.1f} ms"]
+        for query in self.queries:
+            filters = ' '.join(f'{method}({column}={_short(value)})' for method, column, value in query['filters'])
+            status = f"error {query['error']}" if query['error'] else f"{query['rows']} rows"
+            lines.append(f"  {query['table']} {query['operation']} {filters} -> {status}, {query['ms']:.1f} ms")
+        for shape, count, ms in self.n_plus_one():
+            lines.append(f"  N+1: {count}x {shape} ({ms:.1f} ms total)")
+        return '\n'.join(lines)
+
+
+class ProfiledQuery:
+    """Proxy for a postgrest request builder that records execute() calls"""
+
+    __slots__ = ('_query', '_table', '_operation', '_filters')
+
+    def __init__(self, query, table, operation=None, filters=()):
+        self._query = query
+        self._table = table
+        self._operation = operation
+        self._filters = filters
+
+    def _chain(self, result, method, args):
+        operation, filters = self._operation, self._filters
+        if method in OPERATIONS:
+            operation = method
+            if method == 'select':
+                operation = f"select({','.join(str(arg) for arg in args) or '*'})"
+        else:
+            column = args[0] if args and isinstance(args[0], str) else ''
+            value = args[1] if len(args) > 1 else (args[0] if args and not column else None)
+            filters = filters + ((method, column, value),)
+        return ProfiledQuery(result, self._table, operation, filters)
+
+    def __getattr__(self, name):
+        attr = getattr(self._query, name)
+        if not callable(attr):
+            # e.g. the ``not_`` property returns a builder
+            return ProfiledQuery(attr, self._table, self._operation, self._filters) \
+                if hasattr(attr, 'execute') else attr
+
+        def call(*args, **kwargs):
+            result = attr(*args, **kwargs)
+            if hasattr(result, 'execute'):
+                return self._chain(result, name, args)
+            return result
+        return call
+
+    def execute(self):
+        profile = current_profile.get()
+        if profile is None:
+            return self._query.execute()
+
+        start = time.perf_counter()
+        try:
+            response = self._query.execute()
+        except Exception as e:
+            profile.record(self._table, self._operation or 'select', self._filters, 0,
+                           time.perf_counter() - start, error=type(e).__name__)
+            raise
+
+        data = getattr(response, 'data', None)
+        rows = len(data) if isinstance(data, list) else int(bool(data))
+        profile.record(self._table, self._operation or 'select', self._filters, rows,
+                       time.perf_counter() - start)
+        return response
+
+
+class ProfiledClient:
+    """Proxy for the Supabase client whose table() queries are profiled"""
+
+    __slots__ = ('_client',)
+
+    def __init__(self, client):
+        self._client = client
+
+    def table(self, name):
+        return ProfiledQuery(self._client.table(name), name)
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+def _log(profile):
+    logger.log(logging.WARNING if profile.n_plus_one() else logging.INFO, "%s", profile.summary())
+
+
+@contextmanager
+def profiling(label):
+    """Record queries made inside the block (e.g. in a background job)"""
+    profile = QueryProfile(label)
+    token = current_profile.set(profile)
+    try:
+        yield profile
+    finally:
+        current_profile.reset(token)
+        if profile.queries:
+            _log(profile)
+
+
+def init_app(app):
+    """Profile each request's queries when TIMELY_QUERY_PROFILE is set"""
+    if not ENABLED:
+        return
+
+    from flask import g, request
+    from services.metrics import REGISTRY
+
+    n_plus_one_counter = REGISTRY.counter(
+        'timely_n_plus_one_total', 'Requests with repeated same-shape queries', ('route',)
+    )
+
+    @app.before_request
+    def _start_query_profile():
+        g.query_profile = QueryProfile(f'{request.method} {request.endpoint or request.path}')
+        g.query_profile_token = current_profile.set(g.query_profile)
+
+    @app.after_request
+    def _report_query_profile(response):
+        profile = g.get('query_profile')
+        if profile is not None:
+            response.headers['X-Query-Profile'] = profile.header()
+            if profile.n_plus_one():
+                n_plus_one_counter.inc(route=request.endpoint or 'unknown')
+            if profile.queries:
+                _log(profile)
+        return response
+
+    @app.teardown_request
+    def _end_query_profile(exc=None):
+        g.pop('query_profile', None)
+        token = g.pop('query_profile_token', None)
+        if token is not None:
+            try:
+                current_profile.reset(token)
+            except ValueError:
+                current_profile.set(None)
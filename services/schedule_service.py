@@ -0,0 +1,429 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from core.models.task import Task
+from core.algorithms.recurrence import RecurrenceCache, parse_regular_tasks, occurrences_on
+from core.algorithms.scenarios import run_scenario
+from core.algorithms.schedule_cache import ScheduleCache, schedule_fingerprint, rows_digest
+from services.metrics import span, TASKS_SCHEDULED, TASKS_WAITLISTED, SLIVERS, SLIVER_MINUTES
+from utils.time_helpers import format_time
+
+
+logger = logging.getLogger(__name__)
+
+
+class NoTasksError(Exception):
+    """Raised when a user asks for a schedule without any tasks"""
+
+
+class ScheduleService:
+    """Fetch, schedule and persist one user's day (the /generate_schedule pipeline)"""
+
+    def __init__(self, db, scheduler_factory, data_versions=None, cache=None, external_blocks=None,
+                 recurrence=None, waitlist=None, quality=None, single_flight=None):
+        self.db = db
+        # Optional ExternalBlockStore with imported calendar commitments
+        self.external_blocks = external_blocks
+        # A fresh scheduler per run: GreedyScheduler keeps per-run state and
+        # runs may happen concurrently on background workers
+        self.scheduler_factory = scheduler_factory
+        self.data_versions = data_versions
+        self.cache = cache if cache is not None else ScheduleCache()
+        # Parsed recurring tasks per user and data version (needs data_versions)
+        self.recurrence = recurrence if recurrence is not None else RecurrenceCache()
+        # Optional WaitlistStore carrying unscheduled tasks into later runs
+        self.waitlist = waitlist
+        # Optional QualityStore keeping each day's run metrics
+        self.quality = quality
+        # Optional SingleFlight coalescing concurrent identical generate calls
+        self.single_flight = single_flight
+
+    def fetch_snapshot(self, user_id, day):
+        """
+        Fetch everything scheduling needs for one user and day
+
+        Returns:
+            dict: raw 'tasks' and 'schedules' rows, the day's
+                'regular_occurrences' ((start, end, RegularTask) tuples),
+                imported calendar 'fixed_blocks' and the 'carried_over'
+                waitlist ({task_id: day ordinal first waitlisted})
+
+        Raises:
+            NoTasksError: If the user has no tasks
+        """
+        db = self.db
+
+        logger.info("Fetching tasks")
+        # Read the version first: rows fetched after it are at least that new
+        version = self.data_versions.get(user_id) if self.data_versions is not None else None
+
+        # Get user's tasks
+        tasks_response = db.execute_read(db.get_client().table('tasks').select('*').eq('user_id', user_id))
+
+        logger.debug("Tasks response: %s", tasks_response.data)
+
+        if not tasks_response.data:
+            raise NoTasksError('No tasks found. Please create tasks first.')
+
+        def load_regular_tasks():
+            response = db.execute_read(db.get_client().table('regularTasks').select('*').eq('userId', user_id))
+            logger.debug("Regular tasks response: %s", response.data)
+            return response.data
+
+        # Recurring tasks are parsed and expanded once per data version
+        if version is not None:
+            regular_occurrences = self.recurrence.occurrences(user_id, version, day, day, load_regular_tasks)[day]
+        else:
+            regular_occurrences = occurrences_on(parse_regular_tasks(load_regular_tasks()), day)
+
+        logger.info("Fetching existing schedules")
+        # Get existing schedule for the day
+        schedule_response = db.execute_read(db.get_client().table('schedules').select('*').eq('user_id',
+            user_id).eq('date', day.isoformat()))
+
+        logger.debug("Existing schedules: %s", schedule_response.data)
+
+        fixed_blocks = []
+        if self.external_blocks is not None:
+            fixed_blocks = self.external_blocks.blocks_for_day(user_id, day)
+            logger.info("Imported calendar blocks: %s", len(fixed_blocks))
+
+        carried_over = {}
+        if self.waitlist is not None:
+            carried_over = self.waitlist.carried(user_id, day)
+            logger.info("Carried-over waitlist: %s tasks", len(carried_over))
+
+        return {
+            'tasks': tasks_response.data,
+            'regular_occurrences': regular_occurrences,
+            'schedules': schedule_response.data or [],
+            'fixed_blocks': fixed_blocks,
+            'carried_over': carried_over
+        }
+
+    def build_inputs(self, snapshot, user_id, day):
+        """
+        Convert a snapshot's rows into scheduler inputs
+
+        Times are parsed to timeline minutes here, once; nothing downstream
+        handles time objects or strings until rows are formatted for storage.
+
+        Returns:
+            dict: 'tasks' (Task objects), 'regular_occurrences' (the day's
+                (start, end, RegularTask) tuples), 'regular_entries' (schedule
+                rows for regular tasks), 'existing' (always empty: stored rows
+                are rewritten, not kept) and 'carried_over' ({task_id: day
+                ordinal} for the tasks still on the waitlist)
+        """
+        logger.info("Converting to Task objects + building regular entries")
+        # Convert to Task objects
+        tasks = []
+        for task_data in snapshot['tasks']:
+            logger.debug("Processing task: %s", task_data)
+            task = Task(
+                task_id=task_data['task_id'],
+                user_id=task_data['user_id'],
+                name=task_data['name'],
+                effort=task_data['effort'],
+                urgency=task_data['urgency'],
+                length=task_data['length'],
+                priority=task_data.get('priority'),
+                splittable=task_data.get('splittable') or False,
+                min_chunk=task_data.get('min_chunk'),
+                max_chunks=task_data.get('max_chunks')
+
+            )
+            logger.debug("Created Task object: priority=%s", task.priority)
+            tasks.append(task)
+
+        # Build regular task schedule entries (occurrences are already
+        # expanded for the day; the end may run past midnight)
+        reg_schedule_entry = []
+
+        for start_minutes, end_minutes, reg_task in snapshot['regular_occurrences']:
+            logger.debug("Processing regular task: %s (%s)", reg_task.name, reg_task.recurrence)
+            reg_schedule_entry.append({
+                'user_id': user_id,
+                'task_id': None,
+                'regular_task_id': reg_task.regular_task_id,
+                'start_time': format_time(start_minutes),
+                'end_time': format_time(end_minutes),
+                'date': day.isoformat(),
+                'is_regular_task': True
+            })
+
+        # The day's stored rows are the previous run's output, and persist
+        # replaces all of them: generated task rows are placements this run
+        # redoes, and regular rows are rebuilt from regular_occurrences.
+        # Neither may block slots or enter the fingerprint, or an unchanged
+        # day would flip between outcomes on every run. Only regular tasks
+        # and imported blocks (passed separately) are fixed.
+        existing_schedules = []
+
+        # Stored waitlist ids are strings; key them by the tasks' own ids
+        carried = snapshot.get('carried_over') or {}
+        carried_over = {
+            task.task_id: carried[str(task.task_id)]
+            for task in tasks if str(task.task_id) in carried
+        }
+
+        return {
+            'tasks': tasks,
+            'regular_occurrences': snapshot['regular_occurrences'],
+            'regular_entries': reg_schedule_entry,
+            'existing': existing_schedules,
+            'carried_over': carried_over
+        }
+
+    def compute(self, inputs, fixed_blocks, user_id, chronotype, day, scheduler, placement=None):
+        """
+        Run the scheduler and build the schedule rows to store
+
+        Returns:
+            dict: 'scheduled', 'waitlist', 'rows', 'rows_digest' and the
+                run's 'fragmentation' and 'quality' reports
+        """
+        logger.info("Scheduling regular tasks")
+        # First schedule regular tasks at their preferred times
+        for start_minutes, end_minutes, reg_task in inputs['regular_occurrences']:
+            try:
+                scheduler.add_regular_task(
+                    reg_task,
+                    start_minutes,
+                    (end_minutes - start_minutes) / 60,
+                    day
+                )
+                logger.debug("Scheduled regular task: %s at %s", reg_task.name, format_time(start_minutes))
+            except Exception as e:
+                logger.warning("Error scheduling regular task %s: %s", reg_task.name, e)
+
+
+        logger.info("Running scheduler")
+        # Generate schedule using greedy algorithm
+        scheduled, waitlist = scheduler.schedule_tasks(
+            inputs['tasks'],
+            chronotype,
+            day,
+            inputs['existing'],
+            fixed_blocks=fixed_blocks,
+            placement=placement,
+            carried_over=inputs.get('carried_over')
+        )
+
+        logger.info("Scheduled: %s tasks", len(scheduled))
+        logger.info("Waitlist: %s tasks", len(waitlist))
+        logger.debug("Scheduled entries: %s", scheduled)
+
+        logger.info("Building schedule entries")
+        # Build schedule entries
+        schedule_entries = []
+        for entry in scheduled:
+            logger.debug("Entry: %s", entry)
+            logger.debug("Task: %s", entry['task'])
+            logger.debug("Task ID: %s", entry['task'].task_id)
+
+            schedule_entry = {
+                'user_id': user_id,
+                'task_id': entry['task'].task_id,
+                #'task_name': entry['task'].name,
+                'start_time': format_time(entry['start']),
+                'end_time': format_time(entry['end']),
+                'date': entry['date'].isoformat(),
+                'is_regular_task': False
+            }
+            logger.debug("Built schedule entry: %s", schedule_entry)
+            schedule_entries.append(schedule_entry)
+
+        all_schedule_entries = schedule_entries + inputs['regular_entries']
+        return {
+            'scheduled': scheduled,
+            'waitlist': waitlist,
+            'rows': all_schedule_entries,
+            'rows_digest': rows_digest(all_schedule_entries),
+            'fragmentation': scheduler.last_report,
+            'quality': scheduler.last_quality
+        }
+
+    def persist(self, result, stored_rows, user_id, day):
+        """
+        Replace the day's stored schedule with the result's rows
+
+        Returns:
+            bool: False when nothing was written (already stored or empty)
+        """
+        db = self.db
+
+        logger.info("Inserting into database")
+        if stored_rows and rows_digest(stored_rows) == result['rows_digest']:
+            logger.info("Stored schedule already matches, skipping rewrite")
+            return False
+
+        all_schedule_entries = result['rows']
+        if not all_schedule_entries:
+            logger.info("No schedule entries to insert")
+            return False
+
+        clear_existing = db.get_client().table('schedules').delete().eq('user_id',
+            user_id).eq('date', day.isoformat()).execute()
+        logger.debug("Cleared existing schedules: %s", clear_existing)
+
+        logger.info("Inserting %s entries", len(all_schedule_entries))
+        logger.debug("Entry data: %s", all_schedule_entries)
+
+        # Insert new schedules
+        insert_response = db.get_client().table('schedules').insert(all_schedule_entries).execute()
+
+        logger.debug("Insert response: %s", insert_response)
+        logger.debug("Insert response data: %s", insert_response.data)
+
+        if not insert_response.data:
+            raise Exception("Database insertion returned no data")
+
+        if self.data_versions is not None:
+            self.data_versions.bump(user_id)
+        return True
+
+    def generate(self, user_id, chronotype, day, placement=None):
+        """
+        Generate and store the schedule for one user and day
+
+        With a single_flight configured, a call made while an identical one
+        (same user, day, chronotype, placement and data version) is running,
+        or shortly after it finished with no writes since, shares that run's
+        result.
+
+        Args:
+            user_id: User to schedule for
+            chronotype: 'Early', 'Middle' or 'Late'
+            day: Date to schedule
+            placement: Optional placement policy for this run ('earliest' or
+                'best_fit'); defaults to the scheduler's
+
+        Returns:
+            dict: {'scheduled': int, 'waitlisted': int, 'carried_over': int,
+                'cached': bool, 'persisted': bool, 'shared': bool,
+                'fragmentation': dict, 'quality': dict}
+
+        Raises:
+            NoTasksError: If the user has no tasks
+        """
+        if self.single_flight is None:
+            return dict(self._generate(user_id, chronotype, day, placement), shared=False)
+
+        def current_version():
+            return self.data_versions.get(user_id) if self.data_versions is not None else None
+
+        result, shared = self.single_flight.do(
+            (user_id, day.isoformat(), chronotype, placement),
+            lambda: self._generate(user_id, chronotype, day, placement),
+            version=current_version(),
+            settled_version=current_version,
+            # Runs for the same user and day all rewrite the same rows
+            lock_key=(user_id, day.isoformat())
+        )
+        if shared:
+            logger.info("Shared an identical in-flight schedule run for %s", user_id)
+        return dict(result, shared=shared)
+
+    def _generate(self, user_id, chronotype, day, placement):
+        scheduler = self.scheduler_factory()
+        placement = placement or scheduler.placement
+
+        with span('db_fetch'):
+            snapshot = self.fetch_snapshot(user_id, day)
+
+        with span('model_conversion'):
+            inputs = self.build_inputs(snapshot, user_id, day)
+
+        # Same inputs as a previous run -> reuse its result
+        fingerprint = (user_id, schedule_fingerprint(
+            inputs['tasks'],
+            inputs['regular_entries'],
+            inputs['existing'],
+            chronotype,
+            day,
+            {task.task_id: scheduler.planned_length(task) for task in inputs['tasks']},
+            snapshot['fixed_blocks'],
+            placement,
+            inputs['carried_over']
+        ))
+        result = self.cache.get(fingerprint)
+        cache_hit = result is not None
+
+        if cache_hit:
+            logger.info("Inputs unchanged, reusing cached schedule")
+        else:
+            with span('scheduling'):
+                result = self.compute(inputs, snapshot['fixed_blocks'], user_id, chronotype, day, scheduler,
+                                      placement)
+            self.cache.put(fingerprint, result)
+            TASKS_SCHEDULED.inc(len({id(entry['task']) for entry in result['scheduled']}))
+            TASKS_WAITLISTED.inc(len(result['waitlist']))
+            SLIVERS.inc(result['fragmentation']['slivers'], placement=placement)
+            SLIVER_MINUTES.inc(result['fragmentation']['sliver_minutes'], placement=placement)
+
+        with span('persist'):
+            persisted = self.persist(result, snapshot['schedules'], user_id, day)
+            if self.waitlist is not None:
+                self.waitlist.record(user_id, day, [task.task_id for task in result['waitlist']])
+            if self.quality is not None:
+                self.quality.record(user_id, day, result['quality'], placement)
+
+        logger.info("Schedule generated for %s on %s", user_id, day)
+        return {
+            'scheduled': len({id(entry['task']) for entry in result['scheduled']}),
+            'waitlisted': len(result['waitlist']),
+            'carried_over': len(inputs['carried_over']),
+            'cached': cache_hit,
+            'persisted': persisted,
+            'fragmentation': result['fragmentation'],
+            'quality': result['quality']
+        }
+
+    def evaluate_scenarios(self, user_id, chronotype, day, scenarios, executor=None):
+        """
+        Compare scheduling variants for one day without writing anything
+
+        The day is fetched once; each scenario (see
+        core.algorithms.scenarios.parse_scenario) then runs on its own
+        scheduler in the executor. Planned lengths are worked out here so
+        workers never need the duration estimator or the database.
+
+        Args:
+            user_id: User to schedule for
+            chronotype: The user's chronotype
+            day: Date to schedule
+            scenarios: Parsed scenarios
+            executor: Optional concurrent.futures executor (a process pool
+                for real parallelism); defaults to a throwaway thread pool
+
+        Returns:
+            dict: {'date': str, 'scenarios': [run_scenario() result, ...]}
+                in request order
+
+        Raises:
+            NoTasksError: If the user has no tasks
+        """
+        scheduler = self.scheduler_factory()
+
+        with span('db_fetch'):
+            snapshot = self.fetch_snapshot(user_id, day)
+
+        with span('model_conversion'):
+            inputs = self.build_inputs(snapshot, user_id, day)
+            inputs['task_lengths'] = {task.task_id: scheduler.planned_length(task) for task in inputs['tasks']}
+
+        options = {'placement': scheduler.placement, 'aging_rate': scheduler.aging_rate}
+        pool = executor or ThreadPoolExecutor(max_workers=max(1, len(scenarios)))
+        try:
+            with span('scenarios'):
+                futures = [
+                    pool.submit(run_scenario, inputs, snapshot['fixed_blocks'], day, chronotype, scenario, options)
+                    for scenario in scenarios
+                ]
+                results = [future.result() for future in futures]
+        finally:
+            if executor is None:
+                pool.shutdown(wait=False)
+
+        return {'date': day.isoformat(), 'scenarios': results}
@@ -0,0 +1,142 @@
+"""
+Single-flight execution of identical work.
+
+While a call for a key is running, later calls for the same key wait for it
+and share its result instead of running again. Finished results are kept for
+a short debounce window so a burst (double-click, several tabs) is absorbed
+too. Keys carry a data version: a result is only shared with callers that
+saw the same version, and a finished result is filed under the version
+current after the run, so nothing written in between is ever hidden.
+
+Within a process this is a lock and an event per key. Across processes,
+an optional directory of fcntl lock files serializes runs for the same key
+(each process still runs its own call once the lock is free).
+"""
+import hashlib
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows
+    fcntl = None
+
+
+logger = logging.getLogger(__name__)
+
+
+class _Flight:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Coalesce concurrent calls per key"""
+
+    def __init__(self, debounce_seconds=0.0, lock_dir=None):
+        """
+        Args:
+            debounce_seconds: How long a finished result is reused
+            lock_dir: Optional directory for cross-process lock files
+        """
+        self.debounce_seconds = debounce_seconds
+        self.lock_dir = lock_dir
+        self._lock = threading.Lock()
+        self._flights = {}
+        self._recent = {}
+        self.shared = 0
+        self.runs = 0
+
+    def _prune(self, now):
+        expired = [key for key, (finished, _) in self._recent.items() if now - finished > self.debounce_seconds]
+        for key in expired:
+            del self._recent[key]
+
+    @contextmanager
+    def _file_lock(self, lock_key):
+        if self.lock_dir is None or fcntl is None:
+            yield
+            return
+
+        os.makedirs(self.lock_dir, exist_ok=True)
+        name = hashlib.sha1(repr(lock_key).encode('utf-8')).hexdigest()[:20]
+        with open(os.path.join(self.lock_dir, f'{name}.lock'), 'a') as handle:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def do(self, key, fn, version=None, settled_version=None, lock_key=None):
+        """
+        Run ``fn`` once for concurrent callers with the same key and version
+
+        Args:
+            key: Hashable identity of the work
+            fn: Callable doing the work
+            version: Data version the caller saw
+            settled_version: Optional callable returning the version after
+                the run (e.g. after the run's own writes); the result is
+                kept for the debounce window under that version
+            lock_key: Cross-process lock file key (defaults to ``key``)
+
+        Returns:
+            tuple: (result, shared) where shared is True when the result
+                came from another caller's run
+
+        Raises:
+            Exception: Whatever ``fn`` raised, for the caller that ran it and
+                every caller waiting on it
+        """
+        flight_key = (key, version)
+        with self._lock:
+            if self.debounce_seconds:
+                self._prune(time.monotonic())
+                recent = self._recent.get(flight_key)
+                if recent is not None:
+                    self.shared += 1
+                    return recent[1], True
+
+            flight = self._flights.get(flight_key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[flight_key] = _Flight()
+                self.runs += 1
+            else:
+                self.shared += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result, True
+
+        try:
+            with self._file_lock(key if lock_key is None else lock_key):
+                flight.result = fn()
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            keep = flight.error is None and self.debounce_seconds
+            after = version
+            if keep and settled_version is not None:
+                try:
+                    after = settled_version()
+                except Exception as e:
+                    logger.warning("Could not read settled version, not keeping result: %s", e)
+                    keep = False
+            with self._lock:
+                del self._flights[flight_key]
+                if keep:
+                    self._recent[(key, after)] = (time.monotonic(), flight.result)
+            flight.done.set()
+
+        return flight.result, False
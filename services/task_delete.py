@@ -0,0 +1,86 @@
+"""
+Bulk deletion of tasks and regular tasks with their schedule rows.
+
+An id can name either a task or a regular task. Each batch of ids is
+resolved with one read per table (scoped to the user, so other users' ids
+come back as not found), then dependent schedule rows and the tasks
+themselves go in one ``in_`` delete per table. A batch costs at most six
+round-trips however many ids it holds.
+"""
+import logging
+
+
+logger = logging.getLogger(__name__)
+
+
+DELETED_TASK = 'deleted_task'
+DELETED_REGULAR_TASK = 'deleted_regular_task'
+NOT_FOUND = 'not_found'
+ERROR = 'error'
+
+
+class TaskDeleter:
+    """Delete many of one user's tasks at once"""
+
+    BATCH_SIZE = 200  # ids per in_ filter, keeps request URLs short
+
+    def __init__(self, db, batch_size=None):
+        self.db = db
+        self.batch_size = batch_size or self.BATCH_SIZE
+
+    def delete(self, user_id, ids):
+        """
+        Delete tasks and regular tasks by id, schedules first
+
+        Args:
+            user_id: Owner; ids belonging to anyone else are not found
+            ids: Task and/or regular task ids (duplicates are ignored)
+
+        Returns:
+            dict: 'deleted' and 'not_found' counts, 'errors' count and
+                'results' with one {'id', 'status'} per distinct id in
+                request order ('error' results also carry 'error')
+        """
+        ids = list(dict.fromkeys(str(task_id) for task_id in ids))
+        outcomes = {}
+        for offset in range(0, len(ids), self.batch_size):
+            batch = ids[offset:offset + self.batch_size]
+            try:
+                outcomes.update(self._delete_batch(user_id, batch))
+            except Exception as e:
+                logger.warning("Batch of %d ids failed: %s", len(batch), e)
+                for task_id in batch:
+                    outcomes[task_id] = {'status': ERROR, 'error': str(e)}
+
+        results = [dict(outcomes[task_id], id=task_id) for task_id in ids]
+        statuses = [result['status'] for result in results]
+        return {
+            'deleted': sum(1 for status in statuses if status in (DELETED_TASK, DELETED_REGULAR_TASK)),
+            'not_found': statuses.count(NOT_FOUND),
+            'errors': statuses.count(ERROR),
+            'results': results
+        }
+
+    def _delete_batch(self, user_id, batch):
+        client = self.db.get_client()
+
+        # Resolve each id's kind once
+        task_ids = [str(row['task_id']) for row in self.db.execute_read(
+            client.table('tasks').select('task_id').eq('user_id', user_id).in_('task_id', batch)
+        ).data or []]
+        regular_ids = [str(row['regularTaskId']) for row in self.db.execute_read(
+            client.table('regularTasks').select('regularTaskId').eq('userId', user_id).in_('regularTaskId', batch)
+        ).data or []]
+
+        # Schedule rows reference the tasks, so they go first
+        if task_ids:
+            client.table('schedules').delete().eq('user_id', user_id).in_('task_id', task_ids).execute()
+            client.table('tasks').delete().eq('user_id', user_id).in_('task_id', task_ids).execute()
+        if regular_ids:
+            client.table('schedules').delete().eq('user_id', user_id).in_('regular_task_id', regular_ids).execute()
+            client.table('regularTasks').delete().eq('userId', user_id).in_('regularTaskId', regular_ids).execute()
+
+        outcomes = {task_id: {'status': NOT_FOUND} for task_id in batch}
+        outcomes.update({task_id: {'status': DELETED_TASK} for task_id in task_ids})
+        outcomes.update({task_id: {'status': DELETED_REGULAR_TASK} for task_id in regular_ids})
+        return outcomes
@@ -0,0 +1,227 @@
+"""
+Bulk task import from CSV or JSON uploads.
+
+Rows are parsed as a stream and handled in chunks: each chunk is turned into
+columns, validated column by column, and the valid rows are built as Task
+objects (so imported tasks get the same stored priority as created ones) and
+written with one multi-row insert per table. Memory stays bounded by the
+chunk size however large the upload is.
+
+Chunks are committed one after another. If a chunk fails to insert, or the
+upload turns out to be malformed part way through, the import stops and the
+summary says how far it got.
+
+Accepted columns: name, effort, urgency, length for tasks; name, length,
+start_time for regular tasks. A row is a regular task when its ``type``
+column is "regular" (or ``is_regular`` is true).
+"""
+import csv
+import io
+import json
+from datetime import datetime
+
+from core.models.task import Task
+from utils.validators import (
+    validate_columns,
+    validate_task_name_column,
+    validate_scale_column,
+    validate_length_column,
+    validate_time_column,
+)
+
+
+TASK_VALIDATORS = {
+    'name': validate_task_name_column,
+    'effort': lambda values: validate_scale_column(values, 'Effort'),
+    'urgency': lambda values: validate_scale_column(values, 'Urgency'),
+    'length': validate_length_column,
+}
+
+REGULAR_TASK_VALIDATORS = {
+    'name': validate_task_name_column,
+    'length': validate_length_column,
+    'start_time': validate_time_column,
+}
+
+
+def iter_csv_rows(stream):
+    """Yield dict rows from a binary or text CSV stream"""
+    if not isinstance(stream, io.TextIOBase):
+        stream = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    for row in csv.DictReader(stream):
+        yield {key.strip().lower(): (value.strip() if isinstance(value, str) else value)
+               for key, value in row.items() if key}
+
+
+class InvalidRow:
+    """Stands in for a JSON element that isn't an object, so it's reported per row"""
+
+    def __init__(self, message):
+        self.message = message
+
+
+def iter_json_rows(stream, chunk_size=65536):
+    """
+    Yield objects from a JSON array or newline-delimited JSON stream
+    without loading the whole document
+
+    Elements that aren't objects are yielded as InvalidRow.
+
+    Raises:
+        ValueError: If the document is truncated or not valid JSON
+    """
+    if not isinstance(stream, io.TextIOBase):
+        stream = io.TextIOWrapper(stream, encoding='utf-8-sig')
+
+    decoder = json.JSONDecoder()
+    buffer = ''
+    started = False
+    eof = False
+
+    while True:
+        # Skip whitespace and array punctuation between objects
+        buffer = buffer.lstrip()
+        if not started and buffer.startswith('['):
+            buffer = buffer[1:]
+            started = True
+            continue
+        if buffer.startswith(',') or buffer.startswith(']'):
+            buffer = buffer[1:]
+            continue
+
+        if buffer:
+            try:
+                obj, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError as e:
+                # Incomplete element: read more, unless there is no more
+                if eof:
+                    raise ValueError(f'Invalid or truncated JSON: {e.msg}') from e
+            else:
+                buffer = buffer[end:]
+                if isinstance(obj, dict):
+                    yield {str(key).lower(): value for key, value in obj.items()}
+                else:
+                    kind = 'null' if obj is None else type(obj).__name__
+                    yield InvalidRow(f'Row must be a JSON object, got {kind}')
+                continue
+        elif eof:
+            return
+
+        data = stream.read(chunk_size)
+        if not data:
+            eof = True
+        buffer += data
+
+
+class TaskImporter:
+    """Validate and bulk insert tasks and regular tasks for one user"""
+
+    CHUNK_SIZE = 500
+    MAX_REPORTED_ERRORS = 500
+
+    def __init__(self, db, chunk_size=None):
+        self.db = db
+        self.chunk_size = chunk_size or self.CHUNK_SIZE
+
+    def import_rows(self, rows, user_id):
+        """
+        Import an iterable of row dicts
+
+        Returns:
+            dict: counts of imported tasks/regular tasks, per-row errors
+                (1-based data row numbers) and the number of high-priority
+                tasks; 'error' is set if the import stopped early, in which
+                case the counts cover the chunks that were committed
+        """
+        summary = {
+            'rows': 0,
+            'imported_tasks': 0,
+            'imported_regular_tasks': 0,
+            'high_priority_tasks': 0,
+            'error_count': 0,
+            'errors': [],
+        }
+
+        chunk = []
+        try:
+            for row in rows:
+                summary['rows'] += 1
+                chunk.append((summary['rows'], row))
+                if len(chunk) >= self.chunk_size:
+                    self._import_chunk(chunk, user_id, summary)
+                    chunk = []
+            if chunk:
+                self._import_chunk(chunk, user_id, summary)
+        except Exception as e:
+            summary['error'] = str(e)
+
+        summary['errors'].sort(key=lambda error: error['row'])
+        return summary
+
+    def _import_chunk(self, chunk, user_id, summary):
+        tasks = []
+        regular_tasks = []
+        invalid = {}
+        for row_number, row in chunk:
+            if isinstance(row, InvalidRow):
+                invalid[row_number] = [row.message]
+                continue
+            is_regular = str(row.get('type', '')).lower() == 'regular' or \
+                str(row.get('is_regular', '')).lower() in ('1', 'true', 'yes')
+            (regular_tasks if is_regular else tasks).append((row_number, row))
+        self._record_errors(summary, invalid)
+
+        if tasks:
+            records, errors = self._validate(tasks, TASK_VALIDATORS)
+            self._record_errors(summary, errors)
+            if records:
+                created_at = datetime.now()
+                new_tasks = [Task(
+                    user_id=user_id,
+                    name=r['name'],
+                    effort=r['effort'],
+                    urgency=r['urgency'],
+                    length=r['length'],
+                    created_at=created_at
+                ) for r in records]
+                self._insert('tasks', [task.to_dict_with_priority() for task in new_tasks])
+                summary['imported_tasks'] += len(new_tasks)
+                summary['high_priority_tasks'] += sum(1 for task in new_tasks if task.is_high_priority())
+
+        if regular_tasks:
+            records, errors = self._validate(regular_tasks, REGULAR_TASK_VALIDATORS)
+            self._record_errors(summary, errors)
+            if records:
+                self._insert('regularTasks', [{
+                    'userId': user_id,
+                    'name': r['name'],
+                    'length': r['length'],
+                    'start_time': r['start_time'].isoformat()
+                } for r in records])
+                summary['imported_regular_tasks'] += len(records)
+
+    def _validate(self, numbered_rows, validators):
+        """Column-wise validation; returns (valid records, {row_number: [messages]})"""
+        columns = {field: [row.get(field) for _, row in numbered_rows] for field in validators}
+        cleaned, row_errors = validate_columns(columns, validators)
+
+        records = []
+        errors = {}
+        for i, (row_number, _) in enumerate(numbered_rows):
+            if i in row_errors:
+                errors[row_number] = row_errors[i]
+            else:
+                records.append({field: cleaned[field][i] for field in validators})
+        return records, errors
+
+    def _record_errors(self, summary, errors):
+        summary['error_count'] += len(errors)
+        for row_number in sorted(errors):
+            if len(summary['errors']) >= self.MAX_REPORTED_ERRORS:
+                break
+            summary['errors'].append({'row': row_number, 'errors': errors[row_number]})
+
+    def _insert(self, table, records):
+        response = self.db.get_client().table(table).insert(records).execute()
+        if not response.data:
+            raise Exception(f"Bulk insert into {table} returned no data")
@@ -0,0 +1,133 @@
+"""
+In-place partial updates of a task.
+
+A patch changes only the fields it names, in one UPDATE on the existing row,
+so the task keeps its id along with the schedule and history rows that
+reference it. The current row is read first, so the new values can be
+validated and the task's priority re-scored; a second read filtered to the
+task's current schedule rows tells the caller whether a plan that includes
+the task needs a reschedule. (An embedded ``schedules(date)`` select would
+save that round-trip but depends on a foreign key the repo doesn't ship a
+migration for.)
+"""
+from datetime import date
+
+from core.models.task import Task
+
+
+EDITABLE_FIELDS = ('name', 'effort', 'urgency', 'length', 'splittable', 'min_chunk', 'max_chunks')
+# Changes that move or resize a scheduled task's placement
+PLACEMENT_FIELDS = ('length', 'splittable', 'min_chunk', 'max_chunks')
+
+
+class TaskUpdater:
+    """PATCH-style updates of one user's tasks"""
+
+    def __init__(self, db):
+        self.db = db
+
+    def _coerce(self, patch):
+        unknown = sorted(set(patch) - set(EDITABLE_FIELDS))
+        if unknown:
+            raise ValueError(f"Fields can't be updated: {', '.join(unknown)}")
+
+        cleaned = {}
+        for field, value in patch.items():
+            try:
+                if field == 'name':
+                    # str() would turn null or an object into 'None' / "{...}"
+                    if not isinstance(value, str):
+                        raise TypeError(field)
+                    cleaned[field] = value.strip()
+                elif field in ('effort', 'urgency', 'max_chunks'):
+                    cleaned[field] = int(value)
+                elif field in ('length', 'min_chunk'):
+                    cleaned[field] = float(value)
+                else:
+                    cleaned[field] = value if isinstance(value, bool) else str(value).lower() in ('1', 'true', 'on', 'yes')
+            except (TypeError, ValueError):
+                raise ValueError(f'{field} has an invalid value')
+        return cleaned
+
+    def update(self, user_id, task_id, patch, today=None):
+        """
+        Apply a partial patch to a task
+
+        Args:
+            user_id: Owner of the task
+            task_id: Task to change (keeps its id)
+            patch: {field: value} for any of EDITABLE_FIELDS
+            today: Schedules from this day on count as current (default today)
+
+        Returns:
+            dict or None: None if the user has no such task, else 'task' (the
+                row after the update), 'priority', 'changed' (field names
+                actually changed), 'needs_reschedule' and 'scheduled_dates'
+                (current days the task is planned on)
+
+        Raises:
+            ValueError: If the patch names unknown fields or the result is
+                not a valid task
+        """
+        patch = self._coerce(patch)
+        today = (today or date.today()).isoformat()
+        client = self.db.get_client()
+
+        response = self.db.execute_read(
+            client.table('tasks').select('*').eq('user_id', user_id).eq('task_id', task_id).limit(1)
+        )
+        if not response.data:
+            return None
+        current = dict(response.data[0])
+
+        # Days the task is planned on from today
+        schedules = self.db.execute_read(
+            client.table('schedules').select('date')
+            .eq('user_id', user_id).eq('task_id', task_id).gte('date', today)
+        )
+        scheduled_dates = sorted({row['date'] for row in schedules.data or []})
+
+        changed = [field for field, value in patch.items() if current.get(field) != value]
+        merged = dict(current, **patch)
+
+        # Task validates the merged values and re-scores priority from them
+        task = Task(
+            task_id=task_id,
+            user_id=user_id,
+            name=merged['name'],
+            effort=merged['effort'],
+            urgency=merged['urgency'],
+            length=merged['length'],
+            splittable=merged.get('splittable') or False,
+            min_chunk=merged.get('min_chunk'),
+            max_chunks=merged.get('max_chunks')
+        )
+        old_priority = current.get('priority')
+        if old_priority is None:
+            old_priority = Task(
+                user_id=user_id,
+                name=current['name'],
+                effort=current['effort'],
+                urgency=current['urgency'],
+                length=current['length']
+            ).priority
+
+        updated = current
+        if changed:
+            values = {field: patch[field] for field in changed}
+            # Only rows that store a priority get it rewritten
+            if 'priority' in current and current['priority'] != task.priority:
+                values['priority'] = task.priority
+            result = client.table('tasks').update(values).eq('user_id', user_id).eq('task_id', task_id).execute()
+            if not result.data:
+                raise Exception('Task update returned no data')
+            updated = result.data[0]
+
+        resized = any(field in PLACEMENT_FIELDS for field in changed)
+        return {
+            'task': updated,
+            'priority': task.priority,
+            'changed': changed,
+            'needs_reschedule': bool(scheduled_dates) and (resized or task.priority != old_priority),
+            'scheduled_dates': scheduled_dates
+        }
@@ -0,0 +1,69 @@
+"""
+Waitlisted tasks carried over between scheduling runs.
+
+A task that doesn't fit a day stays on the user's waitlist with the day it
+was first waitlisted (a date ordinal). The next run feeds that day into the
+scheduler, which ages the task's priority from it; the row goes away once the
+task is scheduled or deleted.
+"""
+from services.local_store import get_local_store
+
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS waitlist (
+    user_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    first_waitlisted INTEGER NOT NULL,
+    last_day TEXT NOT NULL,
+    PRIMARY KEY (user_id, task_id)
+);
+'''
+
+
+class WaitlistStore:
+    """Per-user waitlist carry-over, keyed by task id"""
+
+    def __init__(self, store=None):
+        self.store = store or get_local_store()
+        self.store.ensure_schema(SCHEMA)
+
+    def carried(self, user_id, day):
+        """
+        Tasks waitlisted before ``day``
+
+        Returns:
+            dict: {task_id: ordinal of the day first waitlisted}
+        """
+        rows = self.store.execute(
+            'SELECT task_id, first_waitlisted FROM waitlist WHERE user_id = ? AND first_waitlisted < ?',
+            (str(user_id), day.toordinal())
+        ).fetchall()
+        return {task_id: first_waitlisted for task_id, first_waitlisted in rows}
+
+    def record(self, user_id, day, waitlisted_ids):
+        """
+        Replace the user's waitlist with the outcome of a run for ``day``
+
+        Tasks still waitlisted keep their earliest first_waitlisted day;
+        everything else (scheduled or deleted since) is dropped.
+
+        Args:
+            user_id: User the run was for
+            day: Date that was scheduled
+            waitlisted_ids: Task ids the run left on the waitlist
+        """
+        waitlisted_ids = [str(task_id) for task_id in waitlisted_ids]
+
+        with self.store.transaction() as conn:
+            conn.executemany(
+                'INSERT INTO waitlist (user_id, task_id, first_waitlisted, last_day) VALUES (?, ?, ?, ?) '
+                'ON CONFLICT (user_id, task_id) DO UPDATE SET '
+                'first_waitlisted = MIN(first_waitlisted, excluded.first_waitlisted), '
+                'last_day = excluded.last_day',
+                [(str(user_id), task_id, day.toordinal(), day.isoformat()) for task_id in waitlisted_ids]
+            )
+            placeholders = ', '.join('?' for _ in waitlisted_ids)
+            conn.execute(
+                f'DELETE FROM waitlist WHERE user_id = ? AND task_id NOT IN ({placeholders})',
+                (str(user_id), *waitlisted_ids)
+            )
@@ -0,0 +1,153 @@
+"""In-memory stand-in for the Supabase query builder used by the services"""
+import copy
+import uuid
+
+
+ID_COLUMNS = {
+    'tasks': 'task_id',
+    'regularTasks': 'regularTaskId',
+    'schedules': 'schedule_id',
+    'taskHistory': 'historyId',
+}
+
+
+class FakeResponse:
+    def __init__(self, data):
+        self.data = data
+
+
+class FakeQuery:
+    def __init__(self, client, table):
+        self.client = client
+        self.table = table
+        self.op = 'select'
+        self.payload = None
+        self.filters = []
+        self.orders = []
+        self.in_sizes = []
+        self.max_rows = None
+        self.offset = 0
+
+    def select(self, *args, **kwargs):
+        self.op = 'select'
+        return self
+
+    def insert(self, rows):
+        self.op = 'insert'
+        self.payload = rows if isinstance(rows, list) else [rows]
+        return self
+
+    def update(self, values):
+        self.op = 'update'
+        self.payload = values
+        return self
+
+    def delete(self):
+        self.op = 'delete'
+        return self
+
+    def _filter(self, predicate):
+        self.filters.append(predicate)
+        return self
+
+    def eq(self, column, value):
+        return self._filter(lambda row: row.get(column) == value)
+
+    def in_(self, column, values):
+        values = set(values)
+        self.in_sizes.append(len(values))
+        return self._filter(lambda row: row.get(column) in values)
+
+    def lt(self, column, value):
+        return self._filter(lambda row: row.get(column) is not None and row.get(column) < value)
+
+    def gt(self, column, value):
+        return self._filter(lambda row: row.get(column) is not None and row.get(column) > value)
+
+    def gte(self, column, value):
+        return self._filter(lambda row: row.get(column) is not None and row.get(column) >= value)
+
+    def lte(self, column, value):
+        return self._filter(lambda row: row.get(column) is not None and row.get(column) <= value)
+
+    def or_(self, expression):
+        # Only the keyset form used by the services: "a.gt.x,and(a.eq.x,b.gt.y)"
+        first, second = expression.split(',and(')
+        column, _, value = first.split('.', 2)
+        inner_eq, inner_gt = second.rstrip(')').split(',')
+        column_b, _, value_b = inner_gt.split('.', 2)
+        return self._filter(lambda row: row.get(column) > value or
+                            (row.get(column) == value and row.get(column_b) > value_b))
+
+    def order(self, column, desc=False):
+        self.orders.append((column, desc))
+        return self
+
+    def limit(self, count):
+        self.max_rows = count
+        return self
+
+    def range(self, start, end):
+        self.offset = start
+        self.max_rows = end - start + 1
+        return self
+
+    def single(self):
+        return self
+
+    def execute(self):
+        self.client.calls.append((self.table, self.op))
+        self.client.in_sizes.extend(self.in_sizes)
+        rows = self.client.tables.setdefault(self.table, [])
+        matched = [row for row in rows if all(predicate(row) for predicate in self.filters)]
+
+        if self.op == 'select':
+            for column, desc in reversed(self.orders):
+                matched.sort(key=lambda row: str(row.get(column)), reverse=desc)
+            # PostgREST caps every response at max-rows
+            limit = min(self.max_rows or self.client.max_rows, self.client.max_rows)
+            return FakeResponse(copy.deepcopy(matched[self.offset:self.offset + limit]))
+
+        if self.op == 'insert':
+            inserted = []
+            for row in self.payload:
+                row = dict(row)
+                column = ID_COLUMNS.get(self.table)
+                if column and not row.get(column):
+                    row[column] = str(uuid.uuid4())
+                rows.append(row)
+                inserted.append(copy.deepcopy(row))
+            return FakeResponse(inserted)
+
+        if self.op == 'delete':
+            for row in matched:
+                rows.remove(row)
+            return FakeResponse(copy.deepcopy(matched))
+
+        for row in matched:
+            row.update(self.payload)
+        return FakeResponse(copy.deepcopy(matched))
+
+
+class FakeClient:
+    def __init__(self, tables=None, max_rows=1000):
+        self.tables = tables or {}
+        self.max_rows = max_rows
+        self.calls = []
+        self.in_sizes = []
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+
+class FakeDB:
+    """Same surface as SupabaseClient: get_client() and execute_read()"""
+
+    def __init__(self, tables=None, max_rows=1000):
+        self.client = FakeClient(tables, max_rows)
+
+    def get_client(self):
+        return self.client
+
+    def execute_read(self, query, retries=None):
+        return query.execute()
@@ -0,0 +1,395 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from core.algorithms.predictor import DurationEstimator
+
+
+# ----- DurationEstimator -----
+
+def test_estimator_needs_min_samples():
+    estimator = DurationEstimator(min_samples=3)
+    estimator.observe('u', 'Read', 1.0)
+    estimator.observe('u', 'Read', 2.0)
+    assert estimator.predict('u', 'Read') is None
+
+    estimator.observe('u', 'read ', 3.0)
+    assert estimator.sample_count('u', 'READ') == 3
+    assert estimator.predict('u', 'Read') == pytest.approx(2.0)
+
+
+def test_estimator_ignores_non_positive_durations():
+    estimator = DurationEstimator(min_samples=1)
+    estimator.observe('u', 'Read', 0)
+    estimator.observe('u', 'Read', -1)
+    estimator.observe('u', 'Read', None)
+    assert estimator.sample_count('u', 'Read') == 0
+
+
+def test_estimator_decays_old_observations():
+    estimator = DurationEstimator(half_life_days=1, min_samples=1)
+    start = datetime(2026, 1, 1)
+    estimator.observe('u', 'Read', 1.0, start)
+    estimator.observe('u', 'Read', 3.0, start + timedelta(days=10))
+    # The old sample has ~1/1024 of its weight left
+    assert estimator.predict('u', 'Read') == pytest.approx(3.0, abs=0.01)
+
+
+def test_estimator_percentile_above_mean():
+    estimator = DurationEstimator(min_samples=1)
+    for hours in (1.0, 2.0, 3.0):
+        estimator.observe('u', 'Read', hours)
+    assert estimator.predict('u', 'Read', 0.9) > estimator.predict('u', 'Read') > estimator.predict('u', 'Read', 0.1)
+
+
+def test_percentile_outside_unit_interval_fails_fast():
+    from core.algorithms.scheduler import GreedyScheduler
+
+    estimator = DurationEstimator(min_samples=1)
+    estimator.observe('u', 'Read', 1.0)
+    for percentile in (0, 1, 1.5, -0.2):
+        with pytest.raises(ValueError):
+            GreedyScheduler(duration_estimator=estimator, duration_percentile=percentile)
+        with pytest.raises(ValueError):
+            estimator.predict('u', 'Read', percentile)
+    assert GreedyScheduler(duration_estimator=estimator, duration_percentile=0.8).duration_percentile == 0.8
+
+
+# ----- time helpers -----
+
+def test_parse_span_wraps_midnight_but_not_empty_spans():
+    from utils.time_helpers import parse_span
+
+    assert parse_span('22:00:00', '01:00:00') == (1320, 1500)
+    assert parse_span('09:00:00', '09:00:00') == (540, 540)
+
+
+def test_hours_to_minutes_rounds():
+    from utils.time_helpers import hours_to_minutes
+
+    assert hours_to_minutes(0.1) == 6        # 0.1 * 60 is 5.999...
+    assert hours_to_minutes(1 / 3) == 20
+
+
+# ----- conflicts -----
+
+def test_find_conflicts_reports_every_overlapping_pair():
+    from core.algorithms.conflicts import find_conflicts
+
+    conflicts = find_conflicts([(0, 60, 'a'), (30, 90, 'b'), (45, 50, 'c'), (90, 120, 'd'), (10, 10, 'empty')])
+    assert sorted((first, second, start, end) for first, second, start, end in conflicts) == [
+        ('a', 'b', 30, 60), ('a', 'c', 45, 50), ('b', 'c', 45, 50)
+    ]
+
+
+# ----- interval and gap indexes -----
+
+def test_static_interval_index_matches_brute_force():
+    import random
+    from core.data_structures.interval_index import StaticIntervalIndex
+
+    rng = random.Random(7)
+    intervals = []
+    for _ in range(300):
+        start = rng.randrange(0, 1440)
+        intervals.append((start, start + rng.randrange(0, 120)))
+    index = StaticIntervalIndex(intervals)
+    assert len(index) == sum(1 for start, end in intervals if end > start)
+
+    for _ in range(200):
+        start = rng.randrange(0, 1500)
+        end = start + rng.randrange(1, 90)
+        expected = sorted((s, e) for s, e in intervals if e > s and s < end and e > start)
+        assert sorted(index.query_overlaps(start, end)) == expected
+        assert index.overlaps(start, end) == bool(expected)
+
+
+def test_gap_index_ignores_empty_busy_intervals():
+    from core.data_structures.gap_index import GapIndex
+
+    gaps = GapIndex(480, 1080, [(600, 600), (700, 760, 'lunch')])
+    assert gaps.gaps() == [(480, 700), (760, 1080)]
+    gaps.reserve(570, 630)  # spans the empty interval at 600
+    assert gaps.gaps() == [(480, 570), (630, 700), (760, 1080)]
+    assert gaps.first_fit(91) == 760
+    assert gaps.best_fit(60) == 630
+
+
+def test_gap_index_rejects_taken_ranges():
+    from core.data_structures.gap_index import GapIndex
+
+    gaps = GapIndex(0, 100, [(40, 60)])
+    with pytest.raises(ValueError):
+        gaps.reserve(30, 50)
+
+
+# ----- scheduler: splittable tasks -----
+
+def _busy(*spans):
+    """Fixed blocks from (start hour, end hour) pairs"""
+    return [(int(start * 60), int(end * 60), 'busy') for start, end in spans]
+
+
+def _task(task_id, effort, urgency, length, **kwargs):
+    from core.models.task import Task
+    return Task(user_id='u', task_id=task_id, name=task_id, effort=effort, urgency=urgency, length=length, **kwargs)
+
+
+def test_splittable_task_fills_gaps_in_order():
+    from datetime import date
+    from core.algorithms.scheduler import GreedyScheduler
+
+    task = _task('t', 1, 1, 2.5, splittable=True, min_chunk=0.5)
+    scheduled, waitlist = GreedyScheduler().schedule_tasks(
+        [task], 'Early', date(2026, 1, 5), fixed_blocks=_busy((6, 9), (10, 12), (13.5, 22)))
+    assert waitlist == []
+    assert [(entry['start'], entry['end'], entry['chunk'], entry['chunks']) for entry in scheduled] == [
+        (540, 600, 1, 2), (720, 810, 2, 2)
+    ]
+
+
+def test_splittable_task_respects_max_chunks_and_min_chunk():
+    from datetime import date
+    from core.algorithms.scheduler import GreedyScheduler
+
+    busy = _busy((6, 9), (10, 12), (13.5, 22))
+    too_many = _task('a', 1, 1, 2.5, splittable=True, min_chunk=0.5, max_chunks=1)
+    too_short = _task('b', 1, 1, 2.5, splittable=True, min_chunk=1.25)
+    scheduled, waitlist = GreedyScheduler().schedule_tasks([too_many, too_short], 'Early', date(2026, 1, 5),
+                                                           fixed_blocks=busy)
+    assert scheduled == []
+    assert {task.task_id for task in waitlist} == {'a', 'b'}
+
+
+def test_plan_chunks_never_leaves_a_short_remainder():
+    from core.algorithms.scheduler import GreedyScheduler
+    from core.data_structures.gap_index import GapIndex
+
+    scheduler = GreedyScheduler()
+    # Gaps of 100 and 60 minutes; 120 minutes in chunks of at least 30
+    scheduler.gaps = GapIndex(360, 1320, _busy((6, 9), (10 + 40 / 60, 12), (13, 22)))
+    assert scheduler._plan_chunks(120, 30, 4, GreedyScheduler.DAY_WINDOW) == [(540, 630), (720, 750)]
+
+
+# ----- scheduler: placement policies -----
+
+def test_best_fit_takes_the_smallest_gap_that_fits():
+    from datetime import date
+    from core.algorithms.scheduler import GreedyScheduler
+
+    busy = _busy((6, 8), (10, 11), (12, 22))  # free 8-10 and 11-12
+    day = date(2026, 1, 5)
+
+    earliest, _ = GreedyScheduler().schedule_tasks([_task('t', 1, 1, 1)], 'Early', day, fixed_blocks=busy)
+    best, _ = GreedyScheduler(placement='best_fit').schedule_tasks([_task('t', 1, 1, 1)], 'Early', day,
+                                                                  fixed_blocks=busy)
+    assert earliest[0]['start'] == 480
+    assert best[0]['start'] == 660
+
+
+def test_best_fit_prefers_peak_hours_on_ties():
+    from core.data_structures.gap_index import GapIndex
+
+    gaps = GapIndex(360, 1320, _busy((7, 14), (15, 20)))  # free 6-7 and 14-15 (an hour each), 20-22
+    assert gaps.best_fit(60) == 360
+    assert gaps.best_fit(60, prefer=(14 * 60, 20 * 60)) == 840
+
+
+def test_unknown_placement_is_rejected():
+    from core.algorithms.scheduler import GreedyScheduler
+
+    with pytest.raises(ValueError):
+        GreedyScheduler(placement='random')
+
+
+# ----- scheduler: quality report -----
+
+def test_quality_report_measures_the_run():
+    from datetime import date
+    from core.algorithms.scheduler import GreedyScheduler
+
+    scheduler = GreedyScheduler()
+    tasks = [_task('high', 8, 9, 2), _task('medium', 5, 5, 1), _task('low', 1, 1, 1), _task('huge', 1, 1, 20)]
+    scheduled, waitlist = scheduler.schedule_tasks(tasks, 'Early', date(2026, 1, 5), fixed_blocks=_busy((6, 8)))
+    assert [(entry['task'].task_id, entry['start']) for entry in scheduled] == [
+        ('high', 480), ('medium', 600), ('low', 660)
+    ]
+
+    report = scheduler.quality_report(scheduled, waitlist, (9, 12))
+    assert report['utilization'] == 0.375        # 2h fixed + 4h of tasks over the 16h window
+    assert report['task_utilization'] == 0.25
+    assert report['peak_share'] == 0.5          # high runs 8-10, the peak starts at 9
+    assert report['start_delay'] == {'high': 120, 'medium': 240, 'low': 300}
+    assert report['waitlisted_priority'] == tasks[3].priority
+    assert (report['scheduled'], report['waitlisted']) == (3, 1)
+
+
+def test_quality_report_counts_split_tasks_once():
+    from datetime import date
+    from core.algorithms.scheduler import GreedyScheduler
+
+    scheduler = GreedyScheduler()
+    task = _task('t', 1, 1, 2.5, splittable=True, min_chunk=0.5)
+    scheduled, waitlist = scheduler.schedule_tasks(
+        [task], 'Early', date(2026, 1, 5), fixed_blocks=_busy((6, 9), (10, 12), (13.5, 22)))
+
+    report = scheduler.quality_report(scheduled, waitlist, (6, 12))
+    assert report['scheduled'] == 1
+    assert report['start_delay'] == {'high': None, 'medium': 180, 'low': None}
+    assert report['peak_share'] is None
+    assert report['utilization'] == 1.0
+
+
+# ----- aging -----
+
+def test_priority_queue_ages_lazily():
+    from core.data_structures.priority_queue import PriorityQueue
+
+    now = [0]
+    queue = PriorityQueue(aging_rate=1.0, clock=lambda: now[0])
+    queue.push(5.0, 'old')
+    now[0] = 3
+    queue.push(7.0, 'new')
+    queue.push(7.0, 'newer')
+    # old: 5 + 3 = 8 beats 7; equal priorities keep FIFO order
+    assert [queue.pop() for _ in range(3)] == [(8.0, 'old'), (7.0, 'new'), (7.0, 'newer')]
+
+
+def test_carried_over_task_overtakes_after_enough_days():
+    from datetime import date
+    from core.algorithms.scheduler import GreedyScheduler
+
+    day = date(2026, 1, 10)
+    fresh = _task('fresh', 5, 5, 1)    # priority 6.0
+    carried = _task('carried', 2, 4, 1)  # priority 4.6, +0.5 per day waited
+    busy = _busy((6, 9), (10, 22))       # room for one task
+
+    def first_scheduled(days_waiting):
+        scheduled, waitlist = GreedyScheduler().schedule_tasks(
+            [fresh, carried], 'Early', day, fixed_blocks=busy,
+            carried_over={'carried': day.toordinal() - days_waiting})
+        return scheduled[0]['task'].task_id, [task.task_id for task in waitlist]
+
+    assert first_scheduled(2) == ('fresh', ['carried'])
+    assert first_scheduled(4) == ('carried', ['fresh'])
+
+
+# ----- scenarios -----
+
+def test_default_weights_reproduce_live_priorities():
+    from datetime import date
+    from core.algorithms.scenarios import parse_scenario, run_scenario
+
+    tasks = [_task('a', 8, 9, 2), _task('b', 3, 2, 0.5), _task('c', 5, 5, 12)]
+    inputs = {'tasks': tasks, 'regular_occurrences': [], 'existing': []}
+    baseline = run_scenario(inputs, [], date(2026, 1, 5), 'Early', parse_scenario({}))
+    reweighted = run_scenario(inputs, [], date(2026, 1, 5), 'Early', parse_scenario({'weights': [0.3, 0.5, 0.2]}))
+    assert reweighted['priority_placed'] == baseline['priority_placed']
+    assert reweighted['placements'] == baseline['placements']
+
+
+def test_scenario_weights_change_the_order():
+    from datetime import date
+    from core.algorithms.scenarios import parse_scenario, run_scenario
+
+    long_task, urgent = _task('long', 1, 1, 1.5), _task('urgent', 1, 9, 1)
+    inputs = {'tasks': [long_task, urgent], 'regular_occurrences': [], 'existing': []}
+    busy = _busy((6, 9), (10.5, 22))  # room for one of them
+
+    def placed(weights=None):
+        scenario = parse_scenario({'weights': weights} if weights else {})
+        result = run_scenario(inputs, busy, date(2026, 1, 5), 'Early', scenario)
+        return [placement['task_id'] for placement in result['placements']]
+
+    assert placed() == ['urgent']
+    assert placed([0, 0, 1]) == ['long']
+
+
+def test_parse_scenario_rejects_bad_weights():
+    from core.algorithms.scenarios import parse_scenario
+
+    with pytest.raises(ValueError):
+        parse_scenario({'weights': [0.5, 0.5, 0.5]})
+
+
+# ----- recurrence -----
+
+def _regular(recurrence='daily', **kw):
+    from core.models.regular_task import RegularTask
+
+    return RegularTask('u', 'Gym', 1.5, '07:30', regular_task_id='r', recurrence=recurrence, **kw)
+
+
+def _days(task, start, end):
+    return [day for day, _, _ in task.occurrences(start, end)]
+
+
+def test_regular_task_occurrences_follow_the_rule():
+    from datetime import date
+
+    monday, sunday = date(2026, 1, 5), date(2026, 1, 11)
+    assert list(_regular().occurrences(monday, monday)) == [(monday, 450, 540)]
+    assert len(_days(_regular(), monday, sunday)) == 7
+    assert [day.weekday() for day in _days(_regular('weekdays'), monday, sunday)] == [0, 1, 2, 3, 4]
+    assert [day.weekday() for day in _days(_regular('days', recurrence_days='4,0'), monday, sunday)] == [0, 4]
+
+
+def test_interval_recurrence_skips_days_from_its_start():
+    from datetime import date
+
+    task = _regular('interval', recurrence_interval=3, recurrence_start='2026-01-01')
+    # Range starts mid-cycle: Jan 1, 4, 7, 10, ... match
+    assert [day.day for day in _days(task, date(2026, 1, 5), date(2026, 1, 14))] == [7, 10, 13]
+    assert task.occurs_on(date(2026, 1, 4)) and not task.occurs_on(date(2026, 1, 5))
+
+
+def test_occurrences_respect_range_and_recurrence_start():
+    from datetime import date
+
+    task = _regular(recurrence_start='2026-01-08')
+    assert _days(task, date(2026, 1, 5), date(2026, 1, 9)) == [date(2026, 1, 8), date(2026, 1, 9)]
+    assert _days(task, date(2026, 1, 1), date(2026, 1, 7)) == []
+    assert _days(task, date(2026, 1, 9), date(2026, 1, 8)) == []
+    assert _days(_regular('interval', recurrence_interval=2, recurrence_start='2026-01-20'),
+                 date(2026, 1, 1), date(2026, 1, 23)) == [date(2026, 1, 20), date(2026, 1, 22)]
+
+
+def test_invalid_recurrence_rows_are_skipped(caplog):
+    from core.algorithms.recurrence import parse_regular_tasks
+
+    rows = [
+        {'regularTaskId': 'ok', 'name': 'Gym', 'length': 1, 'start_time': '07:00'},
+        {'regularTaskId': 'bad', 'name': 'Gym', 'length': 1, 'start_time': '07:00', 'recurrence': 'days'},
+    ]
+    assert [task.regular_task_id for task in parse_regular_tasks(rows)] == ['ok']
+    assert 'invalid recurrence' in caplog.text
+
+
+def test_recurrence_cache_reloads_on_a_new_data_version():
+    from datetime import date
+    from core.algorithms.recurrence import RecurrenceCache
+
+    rows = [{'regularTaskId': 'r', 'name': 'Gym', 'length': 1, 'start_time': '07:00'}]
+    loads = []
+
+    def load_rows():
+        loads.append(1)
+        return list(rows)
+
+    cache = RecurrenceCache()
+    monday = date(2026, 1, 5)
+    week = cache.occurrences('u', 1, monday, date(2026, 1, 11), load_rows)
+    assert len(week) == 7 and [start for start, _, _ in week[monday]] == [420]
+
+    # Same version: served from the cache, even for an overlapping range
+    rows[0]['start_time'] = '09:00'
+    assert cache.occurrences('u', 1, monday, monday, load_rows)[monday][0][0] == 420
+    assert len(loads) == 1 and cache.hits == 1
+
+    # A bumped version reloads the rows and drops the old expansions
+    assert cache.occurrences('u', 2, monday, monday, load_rows)[monday][0][0] == 540
+    assert len(loads) == 2
+
+    cache.invalidate('u')
+    cache.regular_tasks('u', 2, load_rows)
+    assert len(loads) == 3
@@ -0,0 +1,846 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from services.local_store import LocalStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return LocalStore(str(tmp_path / 'local.sqlite3'))
+
+
+# ----- duration store -----
+
+def test_persistent_estimator_survives_new_instance(store):
+    from services.duration_store import PersistentDurationEstimator
+
+    estimator = PersistentDurationEstimator(store=store, min_samples=2)
+    at = datetime(2026, 1, 1, 12)
+    estimator.observe('u', 'Read', 1.0, at)
+    estimator.observe('u', 'Read', 2.0, at + timedelta(hours=1))
+
+    # A restarted worker sees the same model
+    reloaded = PersistentDurationEstimator(store=store, min_samples=2)
+    assert reloaded.sample_count('u', 'read') == 2
+    assert reloaded.predict('u', 'Read') == pytest.approx(estimator.predict('u', 'Read'))
+    assert reloaded.predict('other', 'Read') is None
+
+
+def test_task_starts_measure_once(store):
+    from services.duration_store import TaskStarts
+
+    starts = TaskStarts(store=store)
+    first = datetime.now() - timedelta(minutes=30)
+    starts.start('u', 's1', first)
+    starts.start('u', 's1')  # second press keeps the first start
+    assert list(starts.started('u')) == ['s1']
+
+    assert abs((starts.finish('u', 's1') - first).total_seconds()) < 0.001
+    assert starts.finish('u', 's1') is None
+    assert starts.started('u') == {}
+
+
+def test_task_starts_ignore_stale_starts(store):
+    from services.duration_store import TaskStarts
+
+    starts = TaskStarts(store=store)
+    starts.start('u', 's1', datetime.now() - timedelta(days=2))
+    assert starts.finish('u', 's1') is None
+
+
+# ----- history retention -----
+
+def _history_rows(count, day):
+    return [
+        {'historyId': f'h{i:04d}', 'userId': 'u', 'taskId': 't', 'startTime': '09:00:00',
+         'endTime': '10:00:00', 'date': day, 'completed_at': day, 'tasks': {'name': 'Read'}}
+        for i in range(count)
+    ]
+
+
+def test_retention_deletes_expired_rows_in_small_batches(tmp_path):
+    from services.history_archive import HistoryArchive
+    from services.history_retention import HistoryRetentionJob
+    from tests.fakes import FakeClient
+
+    client = FakeClient({'taskHistory': _history_rows(450, '2000-01-01') + [
+        dict(_history_rows(1, '2999-01-01')[0], historyId='keep')
+    ]})
+    archive = HistoryArchive(str(tmp_path / 'archive'))
+    job = HistoryRetentionJob(days=90, pause_seconds=0, checkpoint_path=str(tmp_path / 'cp.json'),
+                              client=client, archive=archive)
+
+    state = job.run()
+
+    assert state['status'] == 'done'
+    assert state['deleted'] == 450
+    assert [row['historyId'] for row in client.tables['taskHistory']] == ['keep']
+    assert archive.rows == 450
+    assert max(client.in_sizes) <= HistoryRetentionJob.BATCH_SIZE == 200
+
+
+def test_retention_resumes_without_double_archiving(tmp_path):
+    from services.history_archive import HistoryArchive
+    from services.history_retention import HistoryRetentionJob
+    from tests.fakes import FakeClient
+
+    client = FakeClient({'taskHistory': _history_rows(300, '2000-01-01')})
+    archive = HistoryArchive(str(tmp_path / 'archive'))
+    checkpoint = str(tmp_path / 'cp.json')
+
+    HistoryRetentionJob(pause_seconds=0, checkpoint_path=checkpoint, client=client, archive=archive,
+                        max_batches=1).run()
+    assert len(client.tables['taskHistory']) == 100
+
+    state = HistoryRetentionJob(pause_seconds=0, checkpoint_path=checkpoint, client=client,
+                                archive=HistoryArchive(str(tmp_path / 'archive'))).run()
+    assert state['deleted'] == 300
+    assert HistoryArchive(str(tmp_path / 'archive')).rows == 300
+
+
+# ----- history archive -----
+
+def test_archive_round_trip_and_rollback(tmp_path):
+    from datetime import date
+    from services.history_archive import HistoryArchive
+
+    archive = HistoryArchive(str(tmp_path))
+    archive.append([
+        {'date': '2026-01-02', 'startTime': '09:30:00', 'endTime': '10:00:00', 'userId': 'u',
+         'tasks': {'name': 'Read'}},
+        {'date': '2026-01-05', 'startTime': '14:00:00', 'endTime': '15:00:00', 'userId': 'v'},
+    ])
+    assert archive.rows == 2
+    # Five fixed-width columns, 16 bytes per row
+    assert sum((tmp_path / f'{column}.col').stat().st_size for column in
+               ('date', 'start', 'end', 'task', 'user')) == 2 * 16
+
+    # An append whose meta.json was never written is rolled back on open
+    with open(tmp_path / 'date.col', 'ab') as f:
+        f.write(b'\0' * 4)
+    reopened = HistoryArchive(str(tmp_path))
+    assert reopened.rows == 2
+
+    with reopened.open_reader() as reader:
+        assert reader.task_counts() == {'Read': 1, 'Unknown': 1}
+        assert reader.task_counts(user_id='u') == {'Read': 1}
+        assert reader.start_time_histogram()[9] == 1
+        assert reader.date_range() == (date(2026, 1, 2), date(2026, 1, 5))
+
+
+# ----- completion store -----
+
+def test_completions_are_per_user_and_idempotent(store):
+    from datetime import date
+    from services.completion_store import CompletionStore
+
+    completions = CompletionStore(store=store)
+    today = date.today()
+    completions.add('u', today, 's1')
+    completions.add('u', today, 's1')
+    completions.add('u', today, 's2')
+    completions.add('v', today, 's3')
+
+    # A new instance (another login or worker) sees the same state
+    assert CompletionStore(store=store).get('u', today) == {'s1', 's2'}
+    assert completions.get('v', today) == {'s3'}
+    assert completions.get(None, today) == set()
+
+
+def test_completions_prune_old_days(store):
+    from datetime import date, timedelta
+    from services.completion_store import CompletionStore
+
+    completions = CompletionStore(store=store)
+    old = date.today() - timedelta(days=CompletionStore.RETENTION_DAYS + 1)
+    completions.add('u', old, 's1')
+    completions.add('u', date.today(), 's2')
+    assert completions.get('u', old) == set()
+
+
+# ----- job queue -----
+
+def _wait_for(queue, job_id, timeout=5):
+    import time
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = queue.get(job_id)
+        if job['status'] in ('done', 'failed'):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f'job {job_id} did not finish')
+
+
+def test_job_queue_runs_jobs_and_records_failures(store):
+    from services.job_queue import JobQueue
+
+    queue = JobQueue(store=store, workers=2)
+    queue.POLL_SECONDS = 0.05
+    queue.register('double', lambda user_id, payload: payload['n'] * 2)
+    queue.register('boom', lambda user_id, payload: 1 / 0)
+
+    done = _wait_for(queue, queue.submit('double', 'u', {'n': 21}))
+    failed = _wait_for(queue, queue.submit('boom', 'u'))
+
+    assert (done['status'], done['result']) == ('done', 42)
+    assert failed['status'] == 'failed' and 'division' in failed['error']
+    assert queue.depth() == 0 and queue.running() == 0
+
+
+def test_job_queue_rejects_unknown_kind(store):
+    from services.job_queue import JobQueue
+
+    with pytest.raises(ValueError):
+        JobQueue(store=store).submit('missing', 'u')
+
+
+def test_job_queue_runs_one_job_per_user_at_a_time(store):
+    import threading
+    from services.job_queue import JobQueue
+
+    active, peak, lock = [0], [0], threading.Lock()
+
+    def handler(user_id, payload):
+        import time
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.05)
+        with lock:
+            active[0] -= 1
+
+    queue = JobQueue(store=store, workers=3, per_user_limit=1)
+    queue.POLL_SECONDS = 0.01
+    queue.register('work', handler)
+    job_ids = [queue.submit('work', 'u', {'i': i}) for i in range(3)]
+    for job_id in job_ids:
+        assert _wait_for(queue, job_id)['status'] == 'done'
+    assert peak[0] == 1
+
+
+# ----- task import -----
+
+def _json_rows(text, chunk_size=65536):
+    import io
+    from services.task_import import iter_json_rows
+    return list(iter_json_rows(io.StringIO(text), chunk_size=chunk_size))
+
+
+def test_json_rows_stream_across_reads():
+    rows = _json_rows('[{"Name": "A", "effort": 1}, {"name": "B"}]', chunk_size=4)
+    assert rows == [{'name': 'A', 'effort': 1}, {'name': 'B'}]
+    assert _json_rows('{"name": "A"}\n{"name": "B"}\n') == [{'name': 'A'}, {'name': 'B'}]
+
+
+def test_json_rows_flag_non_objects():
+    from services.task_import import InvalidRow
+
+    rows = _json_rows('[null, 1, {"name": "A"}]')
+    assert [type(row) for row in rows] == [InvalidRow, InvalidRow, dict]
+    assert 'null' in rows[0].message
+
+
+def test_json_rows_reject_truncated_tail():
+    with pytest.raises(ValueError):
+        _json_rows('[{"name": "A"}, {"name": ')
+
+
+def _import_rows(db, rows, chunk_size=2):
+    from services.task_import import TaskImporter
+    return TaskImporter(db, chunk_size=chunk_size).import_rows(iter(rows), 'u')
+
+
+def test_import_reports_row_errors_and_stores_priority():
+    from services.task_import import InvalidRow
+    from tests.fakes import FakeDB
+
+    db = FakeDB()
+    summary = _import_rows(db, [
+        {'name': 'Write', 'effort': '8', 'urgency': '9', 'length': '2'},
+        InvalidRow('Row must be a JSON object, got null'),
+        {'name': '', 'effort': '3', 'urgency': '3', 'length': '1'},
+        {'type': 'regular', 'name': 'Gym', 'length': '1', 'start_time': '07:00'},
+    ])
+    assert summary['imported_tasks'] == 1
+    assert summary['imported_regular_tasks'] == 1
+    assert summary['high_priority_tasks'] == 1
+    assert [error['row'] for error in summary['errors']] == [2, 3]
+    assert 'error' not in summary
+    # Same priority as a task created through the form
+    assert db.client.tables['tasks'][0]['priority'] == 10.9
+
+
+def test_import_keeps_partial_counts_when_a_chunk_fails():
+    from tests.fakes import FakeDB
+
+    db = FakeDB()
+    insert = db.client.table
+
+    def failing_table(name):
+        if len(db.client.calls) >= 1:
+            raise RuntimeError('connection reset')
+        return insert(name)
+
+    db.client.table = failing_table
+    rows = [{'name': f'T{i}', 'effort': '2', 'urgency': '2', 'length': '1'} for i in range(5)]
+    summary = _import_rows(db, rows)
+    assert summary['imported_tasks'] == 2
+    assert 'connection reset' in summary['error']
+
+
+# ----- calendar import -----
+
+def _ics(*events):
+    lines = ['BEGIN:VCALENDAR']
+    for summary, start, rrule in events:
+        lines += ['BEGIN:VEVENT', f'SUMMARY:{summary}', f'DTSTART:{start}', 'DURATION:PT1H']
+        if rrule:
+            lines.append(f'RRULE:{rrule}')
+        lines.append('END:VEVENT')
+    lines.append('END:VCALENDAR')
+    return '\r\n'.join(lines) + '\r\n'
+
+
+def _occurrences(rrule, start='20260105T090000', days=70):
+    import io
+    from utils.ical import iter_events, expand_occurrences
+
+    events = list(iter_events(io.StringIO(_ics(('E', start, rrule)))))
+    range_start = datetime(2026, 1, 1)
+    return [begin for event in events
+            for begin, _ in expand_occurrences(event, range_start, range_start + timedelta(days=days))]
+
+
+def test_ical_skips_rules_it_cannot_expand():
+    for rrule in ('FREQ=WEEKLY;BYDAY=XX', 'FREQ=SECONDLY', 'FREQ=DAILY;INTERVAL=0', 'FREQ=WEEKLY;BYDAY=2TU'):
+        assert _occurrences(rrule) == []
+
+
+def test_ical_monthly_byday_ordinals():
+    # Second Tuesday and last Friday of each month
+    starts = _occurrences('FREQ=MONTHLY;BYDAY=2TU,-1FR', days=59)
+    assert [begin.date().isoformat() for begin in starts] == [
+        '2026-01-13', '2026-01-30', '2026-02-10', '2026-02-27'
+    ]
+
+
+def test_ical_hourly_and_weekly():
+    hourly = _occurrences('FREQ=HOURLY;INTERVAL=6;COUNT=3')
+    assert [begin.hour for begin in hourly] == [9, 15, 21]
+    weekly = _occurrences('FREQ=WEEKLY;BYDAY=MO,WE', days=14)
+    assert [begin.day for begin in weekly] == [5, 7, 12, 14]
+
+
+def test_ical_rule_matching_nothing_terminates():
+    # A 5th Monday never falls in February 2026; expansion must still stop
+    assert _occurrences('FREQ=MONTHLY;INTERVAL=12;BYDAY=5MO', start='20260201T090000', days=20) == []
+
+
+def test_calendar_import_clamps_horizon(store):
+    import io
+    from services.calendar_import import ExternalBlockStore
+    from datetime import date
+
+    blocks = ExternalBlockStore(store=store)
+    ics = _ics(('Standup', '20260101T090000', 'FREQ=DAILY'))
+    summary = blocks.import_ics(io.StringIO(ics), 'u', start_date=date(2026, 1, 1), horizon_days=100000)
+    assert summary['blocks'] == ExternalBlockStore.MAX_HORIZON_DAYS
+    summary = blocks.import_ics(io.StringIO(ics), 'u', start_date=date(2026, 1, 1), horizon_days=-5)
+    assert summary['blocks'] == 1
+
+
+# ----- schedule service -----
+
+def test_build_inputs_does_not_fix_stored_rows():
+    from datetime import date
+    from services.schedule_service import ScheduleService
+
+    service = ScheduleService(db=None, scheduler_factory=None)
+    snapshot = {
+        'tasks': [{'task_id': 't1', 'user_id': 'u', 'name': 'Read', 'effort': 5, 'urgency': 5, 'length': 1}],
+        'regular_occurrences': [],
+        'schedules': [
+            {'schedule_id': 's1', 'user_id': 'u', 'task_id': 't1', 'regular_task_id': None, 'date': '2026-01-05',
+             'start_time': '09:00:00', 'end_time': '10:30:00', 'is_regular_task': False},
+            {'schedule_id': 's2', 'user_id': 'u', 'task_id': None, 'regular_task_id': 'r1', 'date': '2026-01-05',
+             'start_time': '07:00:00', 'end_time': '08:00:00', 'is_regular_task': True},
+        ],
+    }
+    inputs = service.build_inputs(snapshot, 'u', date(2026, 1, 5))
+    # Both rows are the previous run's output and get rewritten
+    assert inputs['existing'] == []
+    assert [task.task_id for task in inputs['tasks']] == ['t1']
+
+
+def test_generate_again_on_unchanged_data_is_a_cache_hit(store):
+    from datetime import date
+    from core.algorithms.scheduler import GreedyScheduler
+    from services.data_version import DataVersions
+    from services.schedule_service import ScheduleService
+    from services.waitlist_store import WaitlistStore
+    from tests.fakes import FakeDB
+
+    db = FakeDB({'tasks': [
+        {'task_id': name, 'user_id': 'u', 'name': name, 'effort': 5, 'urgency': urgency, 'length': 2}
+        for name, urgency in (('A', 9), ('B', 6), ('C', 3))
+    ]})
+    versions = DataVersions(store=store)
+    waitlist = WaitlistStore(store=store)
+    service = ScheduleService(db, GreedyScheduler, data_versions=versions, waitlist=waitlist)
+    day = date(2026, 1, 5)
+
+    first = service.generate('u', 'Early', day)
+    assert (first['scheduled'], first['waitlisted'], first['persisted']) == (3, 0, True)
+    stored = db.client.tables['schedules']
+    version = versions.get('u')
+
+    for _ in range(3):
+        again = service.generate('u', 'Early', day)
+        assert again['cached'] is True
+        assert again['persisted'] is False
+        assert (again['scheduled'], again['waitlisted']) == (3, 0)
+    assert db.client.tables['schedules'] == stored
+    assert versions.get('u') == version
+    assert waitlist.carried('u', date(2026, 1, 6)) == {}
+
+
+# ----- data versions -----
+
+def test_conditional_get_matches_the_current_etag(store):
+    from services.data_version import DataVersions
+
+    versions = DataVersions(store=store)
+    etag, not_modified = versions.conditional('u', None, 'tasks')
+    assert not not_modified
+    assert versions.conditional('u', f'"{etag}"', 'tasks') == (etag, True)
+    assert versions.conditional('u', f'"stale", W/"{etag}"', 'tasks')[1]
+    assert versions.conditional('u', '*', 'tasks')[1]
+    assert not versions.conditional('u', f'"{etag}"', 'schedule')[1]
+    assert not versions.conditional('other', f'"{etag}"', 'tasks')[1]
+
+
+def test_etag_changes_after_a_version_bump(store):
+    from services.data_version import DataVersions
+
+    versions = DataVersions(store=store)
+    before = versions.etag('u', 'schedule', '2026-01-05', '2026-01-11')
+    assert versions.etag('u', 'schedule', '2026-01-05', '2026-01-11') == before
+
+    versions.bump('u')
+    etag, not_modified = versions.conditional('u', f'"{before}"', 'schedule', '2026-01-05', '2026-01-11')
+    assert etag != before and not not_modified
+
+
+# ----- quality store -----
+
+def _quality(utilization, peak_share=None, delay_high=None, waitlisted=0):
+    return {
+        'scheduled': 3, 'waitlisted': waitlisted, 'utilization': utilization, 'task_utilization': 0.25,
+        'peak_share': peak_share, 'waitlisted_priority': 0.0, 'slivers': 1, 'sliver_minutes': 10,
+        'start_delay': {'high': delay_high, 'medium': 60.0, 'low': None},
+    }
+
+
+def test_quality_summary_averages_per_placement(store):
+    from datetime import date
+    from services.quality_store import QualityStore
+
+    quality = QualityStore(store=store)
+    monday = date(2026, 1, 5)
+    quality.record('u1', monday, _quality(0.5, peak_share=1.0, delay_high=30.0), placement='earliest')
+    quality.record('u2', monday, _quality(0.7, waitlisted=2), placement='earliest')
+    quality.record('u1', date(2026, 1, 6), _quality(0.9, peak_share=0.5), placement='best_fit')
+    quality.record('u1', date(2026, 1, 1), _quality(0.1), placement='earliest')  # before the range
+    # A rerun replaces the day's report
+    quality.record('u1', date(2026, 1, 6), _quality(0.8, peak_share=0.5), placement='best_fit')
+
+    best_fit, earliest = quality.summary(monday)
+    assert (best_fit['placement'], best_fit['runs'], best_fit['utilization']) == ('best_fit', 1, 0.8)
+    assert (earliest['placement'], earliest['runs']) == ('earliest', 2)
+    assert earliest['utilization'] == 0.6
+    assert earliest['peak_share'] == 1.0        # NULLs are skipped, not counted as zero
+    assert earliest['delay_high'] == 30.0
+    assert earliest['delay_low'] is None
+    assert earliest['waitlisted'] == 1.0
+
+    assert [row['runs'] for row in quality.summary(monday, user_id='u2')] == [1]
+    assert [row['day'] for row in quality.history('u1', monday)] == ['2026-01-05', '2026-01-06']
+
+
+# ----- conflict audit -----
+
+def test_audit_reads_every_row_past_the_max_rows_cap():
+    from services.conflict_audit import ConflictAudit
+    from tests.fakes import FakeClient
+
+    rows = [{'schedule_id': f's{i:05d}', 'user_id': 'u', 'task_id': None, 'regular_task_id': None,
+             'date': f'2026-01-{1 + i // 100:02d}', 'start_time': '09:00:00', 'end_time': '09:30:00'}
+            for i in range(0, 2500, 100)]
+    rows += [{'schedule_id': f'f{i:05d}', 'user_id': 'u', 'task_id': None, 'regular_task_id': None,
+              'date': '2026-02-01', 'start_time': f'{i // 60 % 24:02d}:{i % 60:02d}:00',
+              'end_time': f'{i // 60 % 24:02d}:{i % 60:02d}:00'} for i in range(1200)]
+    # Two rows with the same start: a conflict on the last page
+    rows.append(dict(rows[0], schedule_id='zzz'))
+    client = FakeClient({'users': [{'user_id': 'u'}], 'schedules': rows}, max_rows=100)
+
+    audit = ConflictAudit(page_size=500, client=client)
+    assert len(audit.user_rows('u')) == len(rows)
+    summary = audit.run()
+    assert summary['rows'] == len(rows)
+    assert summary['conflicts'] == 1
+
+
+# ----- single flight -----
+
+def test_single_flight_shares_concurrent_calls():
+    import threading
+    import time
+    from services.single_flight import SingleFlight
+
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def work():
+        calls.append(1)
+        release.wait(2)
+        return 'result'
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do('k', work, version=1))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    while flight.runs + flight.shared < 4:
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert sorted(shared for _, shared in results) == [False, True, True, True]
+
+
+def test_single_flight_debounces_under_the_settled_version():
+    from services.single_flight import SingleFlight
+
+    flight = SingleFlight(debounce_seconds=60)
+    version = [1]
+
+    def run():
+        version[0] += 1  # the run's own write
+        return 'plan'
+
+    assert flight.do('k', run, version=1, settled_version=lambda: version[0]) == ('plan', False)
+    # A caller that sees the post-run version shares the result...
+    assert flight.do('k', run, version=2, settled_version=lambda: version[0]) == ('plan', True)
+    # ...but one that saw the stale pre-run version runs again
+    assert flight.do('k', run, version=1, settled_version=lambda: version[0]) == ('plan', False)
+
+
+def test_single_flight_does_not_keep_failures():
+    from services.single_flight import SingleFlight
+
+    flight = SingleFlight(debounce_seconds=60)
+
+    def fail():
+        raise RuntimeError('boom')
+
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            flight.do('k', fail, version=1)
+    assert flight.runs == 2
+
+
+def test_job_queue_coalesces_only_pending_jobs(store):
+    import threading
+    from services.job_queue import JobQueue
+
+    release = threading.Event()
+    queue = JobQueue(store=store)
+    queue.POLL_SECONDS = 0.01
+    queue.register('work', lambda user_id, payload: release.wait(2))
+    first = queue.submit('work', 'u', {'version': 1}, coalesce=True)
+    assert queue.submit('work', 'u', {'version': 1}, coalesce=True) == first
+    release.set()
+    assert _wait_for(queue, first)['status'] == 'done'
+    # A finished job is never reused, even with the same payload
+    assert queue.submit('work', 'u', {'version': 1}, coalesce=True) != first
+
+
+# ----- bulk delete -----
+
+def test_bulk_delete_resolves_kinds_and_scopes_to_user():
+    from services.task_delete import TaskDeleter
+    from tests.fakes import FakeDB
+
+    db = FakeDB({
+        'tasks': [{'task_id': 't1', 'user_id': 'u'}, {'task_id': 't2', 'user_id': 'other'}],
+        'regularTasks': [{'regularTaskId': 'r1', 'userId': 'u'}],
+        'schedules': [
+            {'schedule_id': 's1', 'user_id': 'u', 'task_id': 't1', 'regular_task_id': None},
+            {'schedule_id': 's2', 'user_id': 'u', 'task_id': None, 'regular_task_id': 'r1'},
+            {'schedule_id': 's3', 'user_id': 'other', 'task_id': 't2', 'regular_task_id': None},
+        ],
+    })
+    summary = TaskDeleter(db).delete('u', ['t1', 'r1', 't2', 'missing', 't1'])
+
+    assert [(result['id'], result['status']) for result in summary['results']] == [
+        ('t1', 'deleted_task'), ('r1', 'deleted_regular_task'), ('t2', 'not_found'), ('missing', 'not_found')
+    ]
+    assert (summary['deleted'], summary['not_found'], summary['errors']) == (2, 2, 0)
+    assert [row['schedule_id'] for row in db.client.tables['schedules']] == ['s3']
+    assert [row['task_id'] for row in db.client.tables['tasks']] == ['t2']
+
+
+def test_bulk_delete_batches_ids_and_reports_failed_batches():
+    from services.task_delete import TaskDeleter
+    from tests.fakes import FakeDB
+
+    db = FakeDB({'tasks': [{'task_id': f't{i}', 'user_id': 'u'} for i in range(5)]})
+    summary = TaskDeleter(db, batch_size=2).delete('u', [f't{i}' for i in range(5)])
+    assert summary['deleted'] == 5
+    assert max(db.client.in_sizes) == 2
+    assert len(db.client.calls) <= 6 * 3
+
+    table = db.client.table
+
+    def failing_table(name):
+        if name == 'regularTasks':
+            raise RuntimeError('down')
+        return table(name)
+
+    db.client.table = failing_table
+    summary = TaskDeleter(db).delete('u', ['x', 'y'])
+    assert summary['errors'] == 2
+    assert all(result['error'] == 'down' for result in summary['results'])
+
+
+# ----- task patch -----
+
+def _updater_db(**task):
+    from tests.fakes import FakeDB
+
+    row = dict({'task_id': 't1', 'user_id': 'u', 'name': 'Read', 'effort': 5, 'urgency': 5, 'length': 1.0,
+                'priority': 6.0}, **task)
+    return FakeDB({
+        'tasks': [row],
+        'schedules': [
+            {'schedule_id': 's1', 'user_id': 'u', 'task_id': 't1', 'date': '2026-01-04'},
+            {'schedule_id': 's2', 'user_id': 'u', 'task_id': 't1', 'date': '2026-01-06'},
+        ],
+    })
+
+
+def test_patch_updates_in_place_and_flags_reschedule():
+    from datetime import date
+    from services.task_update import TaskUpdater
+
+    db = _updater_db()
+    outcome = TaskUpdater(db).update('u', 't1', {'urgency': '9', 'name': ' Read more '}, today=date(2026, 1, 5))
+
+    assert sorted(outcome['changed']) == ['name', 'urgency']
+    assert outcome['priority'] == 8.0
+    assert outcome['scheduled_dates'] == ['2026-01-06']
+    assert outcome['needs_reschedule'] is True
+    assert db.client.tables['tasks'] == [dict(outcome['task'])]
+    assert db.client.tables['tasks'][0]['task_id'] == 't1'
+    assert db.client.tables['tasks'][0]['priority'] == 8.0
+
+
+def test_patch_without_changes_writes_nothing():
+    from datetime import date
+    from services.task_update import TaskUpdater
+
+    db = _updater_db()
+    outcome = TaskUpdater(db).update('u', 't1', {'effort': 5}, today=date(2026, 1, 5))
+    assert outcome['changed'] == [] and outcome['needs_reschedule'] is False
+    assert ('tasks', 'update') not in db.client.calls
+    assert TaskUpdater(db).update('other', 't1', {'effort': 5}) is None
+
+
+def test_patch_rejects_bad_values():
+    from services.task_update import TaskUpdater
+
+    updater = TaskUpdater(_updater_db())
+    for patch in ({'name': None}, {'name': {'x': 1}}, {'effort': 'lots'}, {'priority': 10}, {'effort': 11}):
+        with pytest.raises(ValueError):
+            updater.update('u', 't1', patch)
+
+
+# ----- Supabase client -----
+
+@pytest.fixture
+def supabase_client(monkeypatch):
+    pytest.importorskip('dotenv')
+    from services.database_client import SupabaseClient
+
+    monkeypatch.setattr(SupabaseClient, 'stats', {name: 0 for name in SupabaseClient.stats})
+    monkeypatch.setattr(SupabaseClient, '_client', None)
+    monkeypatch.setattr(SupabaseClient, '_pid', None)
+    return SupabaseClient
+
+
+def test_client_is_recreated_after_fork(supabase_client, monkeypatch):
+    import os
+
+    created = []
+
+    def initialize(cls=supabase_client):
+        created.append(object())
+        cls._client, cls._pid = created[-1], os.getpid()
+        cls._count('clients_created')
+
+    monkeypatch.setattr(supabase_client, '_initialize_client', initialize)
+    first = supabase_client.get_client()
+    assert supabase_client.get_client() is first
+
+    # Same class state seen from a forked child: a new pid
+    supabase_client._pid = -1
+    supabase_client.stats['requests'] = 5
+    child = supabase_client.get_client()
+    assert child is not first
+    assert supabase_client.stats['requests'] == 0  # parent's counters dropped
+    assert supabase_client.stats['clients_created'] == 1
+
+
+def test_execute_read_retries_transport_errors_with_backoff(supabase_client, monkeypatch):
+    httpx = pytest.importorskip('httpx')
+    from services import database_client
+
+    delays = []
+    monkeypatch.setattr(database_client.time, 'sleep', delays.append)
+    monkeypatch.setattr(database_client.random, 'uniform', lambda low, high: high)
+
+    class FlakyQuery:
+        def __init__(self, failures):
+            self.failures = failures
+            self.calls = 0
+
+        def execute(self):
+            self.calls += 1
+            if self.calls <= self.failures:
+                raise httpx.ConnectError('refused')
+            return 'response'
+
+    query = FlakyQuery(failures=2)
+    assert supabase_client.execute_read(query, retries=2) == 'response'
+    base = supabase_client.RETRY_BASE_DELAY
+    assert delays == [base, base * 2]
+    assert supabase_client.stats['retries'] == 2
+
+    with pytest.raises(httpx.ConnectError):
+        supabase_client.execute_read(FlakyQuery(failures=3), retries=1)
+
+    class BrokenQuery:
+        def execute(self):
+            raise ValueError('not a transport error')
+
+    with pytest.raises(ValueError):
+        supabase_client.execute_read(BrokenQuery())
+    assert supabase_client.stats['retries'] == 3
+
+
+def test_http_client_counts_new_and_reused_connections(supabase_client):
+    pytest.importorskip('httpx')
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header('Content-Length', '2')
+            self.end_headers()
+            self.wfile.write(b'ok')
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        with supabase_client._build_http_client() as client:
+            for _ in range(3):
+                assert client.get(f'http://127.0.0.1:{server.server_port}/').text == 'ok'
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    stats = supabase_client.stats
+    assert (stats['requests'], stats['new_connections'], stats['reused_connections']) == (3, 1, 2)
+    assert stats['in_flight'] == 0
+
+
+def test_job_queue_recovers_only_jobs_of_dead_processes(store):
+    import os
+    import subprocess
+    import sys
+    import time
+    from services.job_queue import JobQueue
+
+    dead = subprocess.Popen([sys.executable, '-c', 'pass'])
+    dead.wait()
+
+    queue = JobQueue(store=store)
+    now = time.time()
+    for job_id, owner_pid, started_at in (
+            ('live', os.getpid(), now),         # another worker thread of ours
+            ('dead', dead.pid, now),            # owner process exited
+            ('orphan', None, now),
+            ('reused', os.getpid(), 0.0)):      # our pid, but started by an earlier process
+        store.execute(
+            'INSERT INTO jobs (job_id, user_id, kind, payload, status, owner_pid, created_at, started_at) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            (job_id, 'u', 'work', '{}', 'running', owner_pid, now, started_at)
+        )
+
+    queue._recover()
+    statuses = {job_id: queue.get(job_id)['status'] for job_id in ('live', 'dead', 'orphan', 'reused')}
+    assert statuses == {'live': 'running', 'dead': 'queued', 'orphan': 'queued', 'reused': 'queued'}
+
+
+# ----- metrics -----
+
+def test_histogram_buckets_are_cumulative_and_upper_inclusive():
+    from services.metrics import Histogram
+
+    histogram = Histogram('latency', 'help', ('route',), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 1.0, 7.0):
+        histogram.observe(value, route='home')
+
+    samples = {(name, labels): value for name, labels, value in histogram.samples()}
+    assert samples[('latency_bucket', '{route="home",le="0.1"}')] == 2   # 0.05 and exactly 0.1
+    assert samples[('latency_bucket', '{route="home",le="1.0"}')] == 4
+    assert samples[('latency_bucket', '{route="home",le="+Inf"}')] == 5
+    assert samples[('latency_count', '{route="home"}')] == 5
+    assert samples[('latency_sum', '{route="home"}')] == pytest.approx(8.65)
+
+
+def test_registry_renders_prometheus_text():
+    from services.metrics import MetricsRegistry
+
+    registry = MetricsRegistry()
+    registry.counter('jobs_total', 'Jobs run', ('kind',)).inc(kind='say "hi"\n')
+    registry.histogram('wait_seconds', 'Wait', buckets=(1.0,)).observe(0.5)
+    registry.gauge('queue_depth', 'Queued jobs', lambda: 3)
+    registry.gauge('broken', 'Raises', lambda: 1 / 0)
+
+    assert registry.render().splitlines() == [
+        '# HELP jobs_total Jobs run',
+        '# TYPE jobs_total counter',
+        'jobs_total{kind="say \\"hi\\"\\n"} 1',
+        '# HELP wait_seconds Wait',
+        '# TYPE wait_seconds histogram',
+        'wait_seconds_bucket{le="1.0"} 1',
+        'wait_seconds_bucket{le="+Inf"} 1',
+        'wait_seconds_sum 0.5',
+        'wait_seconds_count 1',
+        '# HELP queue_depth Queued jobs',
+        '# TYPE queue_depth gauge',
+        'queue_depth 3',
+        '# HELP broken Raises',
+        '# TYPE broken gauge',
+    ]
@@ -2,6 +2,8 @@
 import csv
 from datetime import datetime
 
+from utils.time_helpers import parse_span
+
 class CSVExporter:
     """Export user data to CSV format"""
     
@@ -47,9 +49,8 @@ class CSVExporter:
             writer.writeheader()
             
             for record in history:
-                # Calculate duration
-                start_minutes = record['start_time'].hour * 60 + record['start_time'].minute
-                end_minutes = record['end_time'].hour * 60 + record['end_time'].minute
+                # Calculate duration (spans past midnight included)
+                start_minutes, end_minutes = parse_span(record['start_time'], record['end_time'])
                 duration = (end_minutes - start_minutes) / 60
                 
                 writer.writerow({
@@ -0,0 +1,338 @@
+"""iCalendar (.ics) parsing utilities (external commitments)"""
+import calendar
+import io
+import logging
+import re
+from datetime import date, datetime, timedelta, timezone
+
+
+logger = logging.getLogger(__name__)
+
+WEEKDAYS = {'MO': 0, 'TU': 1, 'WE': 2, 'TH': 3, 'FR': 4, 'SA': 5, 'SU': 6}
+FREQUENCIES = ('HOURLY', 'DAILY', 'WEEKLY', 'MONTHLY', 'YEARLY')
+BYDAY_PATTERN = re.compile(r'^([+-]?\d{1,2})?([A-Z]{2})$')
+
+
+def _unfolded_lines(stream):
+    """Yield logical lines, joining RFC 5545 folded continuation lines"""
+    if not isinstance(stream, io.TextIOBase):
+        stream = io.TextIOWrapper(stream, encoding='utf-8-sig', errors='replace')
+
+    current = None
+    for raw in stream:
+        line = raw.rstrip('\r\n')
+        if line[:1] in (' ', '\t') and current is not None:
+            current += line[1:]
+            continue
+        if current is not None:
+            yield current
+        current = line
+    if current:
+        yield current
+
+
+def _parse_property(line):
+    """Split 'NAME;PARAM=X:VALUE' into (name, params, value)"""
+    head, _, value = line.partition(':')
+    parts = head.split(';')
+    params = {}
+    for part in parts[1:]:
+        key, _, param_value = part.partition('=')
+        params[key.upper()] = param_value
+    return parts[0].upper(), params, value
+
+
+def _parse_datetime(value, params):
+    """
+    Parse a DATE or DATE-TIME value
+
+    UTC values ('Z' suffix) are converted to local time; TZID values are
+    treated as local (floating) time.
+
+    Returns:
+        tuple: (datetime, is_all_day)
+    """
+    value = value.strip()
+    if params.get('VALUE') == 'DATE' or len(value) == 8:
+        return datetime.strptime(value, '%Y%m%d'), True
+
+    if value.endswith('Z'):
+        utc = datetime.strptime(value[:-1], '%Y%m%dT%H%M%S')
+        return utc.replace(tzinfo=timezone.utc).astimezone().replace(tzinfo=None), False
+    return datetime.strptime(value[:15], '%Y%m%dT%H%M%S'), False
+
+
+def _parse_duration(value):
+    """Parse an ISO 8601 duration such as PT1H30M or P1D"""
+    sign = -1 if value.startswith('-') else 1
+    value = value.lstrip('+-').lstrip('P')
+    days_part, _, time_part = value.partition('T')
+
+    total = timedelta()
+    number = ''
+    for char in days_part:
+        if char.isdigit():
+            number += char
+        elif char == 'W':
+            total += timedelta(weeks=int(number)); number = ''
+        elif char == 'D':
+            total += timedelta(days=int(number)); number = ''
+    for char in time_part:
+        if char.isdigit():
+            number += char
+        elif char == 'H':
+            total += timedelta(hours=int(number)); number = ''
+        elif char == 'M':
+            total += timedelta(minutes=int(number)); number = ''
+        elif char == 'S':
+            total += timedelta(seconds=int(number)); number = ''
+    return sign * total
+
+
+def iter_events(stream):
+    """
+    Stream VEVENTs from an .ics file
+
+    Only the event currently being read is held in memory. Events with an
+    RRULE that can't be expanded are skipped with a warning rather than
+    imported as a single occurrence.
+
+    Yields:
+        dict: {'summary', 'start', 'end', 'all_day', 'rrule', 'exdates'}
+    """
+    event = None
+    depth = 0
+
+    for line in _unfolded_lines(stream):
+        name, params, value = _parse_property(line)
+
+        if name == 'BEGIN':
+            if value.upper() == 'VEVENT' and event is None:
+                event = {'summary': '', 'start': None, 'end': None, 'duration': None,
+                         'all_day': False, 'rrule': None, 'exdates': set(), 'invalid': None}
+                depth = 0
+            elif event is not None:
+                depth += 1  # nested component such as VALARM
+            continue
+
+        if name == 'END':
+            if event is not None and depth:
+                depth -= 1
+            elif event is not None and value.upper() == 'VEVENT':
+                if event['invalid']:
+                    logger.warning("Skipping ics event %r: %s", event['summary'], event['invalid'])
+                elif event['start'] is not None:
+                    if event['end'] is None:
+                        event['end'] = event['start'] + (event['duration'] or (
+                            timedelta(days=1) if event['all_day'] else timedelta()))
+                    del event['duration'], event['invalid']
+                    yield event
+                event = None
+            continue
+
+        if event is None or depth:
+            continue
+
+        try:
+            if name == 'SUMMARY':
+                event['summary'] = value.replace('\\,', ',').replace('\\;', ';').replace('\\n', ' ')
+            elif name == 'DTSTART':
+                event['start'], event['all_day'] = _parse_datetime(value, params)
+            elif name == 'DTEND':
+                event['end'], _ = _parse_datetime(value, params)
+            elif name == 'DURATION':
+                event['duration'] = _parse_duration(value)
+            elif name == 'RRULE':
+                try:
+                    event['rrule'] = parse_rrule(value)
+                except ValueError as e:
+                    event['invalid'] = f'unsupported RRULE ({e})'
+            elif name == 'EXDATE':
+                for item in value.split(','):
+                    event['exdates'].add(_parse_datetime(item, params)[0])
+        except ValueError as e:
+            logger.warning("Skipping unparseable ics property %s: %s", name, e)
+
+
+def _parse_byday(value, freq):
+    """Parse BYDAY into (ordinal or None, weekday) pairs, e.g. 2TU -> (2, 1)"""
+    byday = []
+    for item in value.split(','):
+        match = BYDAY_PATTERN.match(item.strip().upper())
+        if not match or match.group(2) not in WEEKDAYS:
+            raise ValueError(f'invalid BYDAY value {item!r}')
+        ordinal = int(match.group(1)) if match.group(1) else None
+        if ordinal is not None:
+            if freq != 'MONTHLY':
+                raise ValueError('BYDAY ordinals are only supported for MONTHLY rules')
+            if not 1 <= abs(ordinal) <= 5:
+                raise ValueError(f'BYDAY ordinal out of range in {item!r}')
+        byday.append((ordinal, WEEKDAYS[match.group(2)]))
+    return byday
+
+
+def parse_rrule(value):
+    """
+    Parse an RRULE value into a dict of its parts
+
+    Raises:
+        ValueError: For a FREQ or BYDAY this module can't expand
+    """
+    rule = {}
+    for part in value.split(';'):
+        key, _, part_value = part.partition('=')
+        rule[key.upper()] = part_value
+
+    freq = rule.get('FREQ', '').upper()
+    if freq not in FREQUENCIES:
+        raise ValueError(f'unsupported FREQ {freq or "(missing)"}')
+    interval = int(rule.get('INTERVAL', 1) or 1)
+    if interval < 1:
+        raise ValueError('INTERVAL must be at least 1')
+
+    byday = None
+    if rule.get('BYDAY'):
+        if freq == 'YEARLY':
+            raise ValueError('BYDAY is not supported for YEARLY rules')
+        byday = _parse_byday(rule['BYDAY'], freq)
+
+    return {
+        'freq': freq,
+        'interval': interval,
+        'count': int(rule['COUNT']) if rule.get('COUNT') else None,
+        'until': _parse_datetime(rule['UNTIL'], {})[0] if rule.get('UNTIL') else None,
+        'byday': byday,
+    }
+
+
+def _add_months(dt, months):
+    month_index = dt.month - 1 + months
+    year = dt.year + month_index // 12
+    month = month_index % 12 + 1
+    try:
+        return dt.replace(year=year, month=month)
+    except ValueError:
+        return None  # e.g. the 31st in a shorter month is skipped
+
+
+def _month_start(start, months):
+    """Midnight on the first of the month ``months`` after start's month"""
+    month_index = start.month - 1 + months
+    return datetime(start.year + month_index // 12, month_index % 12 + 1, 1)
+
+
+def _monthly_byday(month_start, byday, time_of_day):
+    """Datetimes in one month matching BYDAY (2TU = second Tuesday, -1FR = last Friday)"""
+    year, month = month_start.year, month_start.month
+    days = set()
+    for ordinal, weekday in byday:
+        matches = [day for day in range(1, calendar.monthrange(year, month)[1] + 1)
+                   if date(year, month, day).weekday() == weekday]
+        if ordinal is None:
+            days.update(matches)
+        elif ordinal <= len(matches) and -ordinal <= len(matches):
+            days.add(matches[ordinal - 1] if ordinal > 0 else matches[ordinal])
+    return [datetime.combine(date(year, month, day), time_of_day) for day in sorted(days)]
+
+
+def _candidate_starts(start, rule, stop):
+    """
+    Yield recurrence start datetimes in order
+
+    Stops once a whole period begins at or after ``stop``, so a rule that
+    matches nothing in the horizon still terminates.
+    """
+    freq = rule['freq']
+    interval = rule['interval']
+    weekdays = {weekday for _, weekday in rule['byday']} if rule['byday'] else None
+    period = 0
+
+    if freq == 'WEEKLY':
+        week_start = start - timedelta(days=start.weekday())
+        while True:
+            base = week_start + timedelta(weeks=period * interval)
+            if base >= stop:
+                return
+            for weekday in sorted(weekdays or [start.weekday()]):
+                candidate = base + timedelta(days=weekday)
+                if candidate >= start:
+                    yield candidate
+            period += 1
+    elif freq in ('MONTHLY', 'YEARLY'):
+        months = interval * (12 if freq == 'YEARLY' else 1)
+        while True:
+            month_start = _month_start(start, period * months)
+            if month_start >= stop:
+                return
+            if rule['byday']:
+                for candidate in _monthly_byday(month_start, rule['byday'], start.time()):
+                    if candidate >= start:
+                        yield candidate
+            else:
+                candidate = _add_months(start, period * months)
+                if candidate is not None:
+                    yield candidate
+            period += 1
+    else:  # HOURLY or DAILY
+        step = timedelta(hours=interval) if freq == 'HOURLY' else timedelta(days=interval)
+        while True:
+            candidate = start + period * step
+            if candidate >= stop:
+                return
+            if weekdays is None or candidate.weekday() in weekdays:
+                yield candidate
+            period += 1
+
+
+def expand_occurrences(event, range_start, range_end):
+    """
+    Lazily expand an event into occurrences overlapping [range_start, range_end)
+
+    Args:
+        event: Event dict from iter_events
+        range_start, range_end: datetime bounds of the horizon
+
+    Yields:
+        tuple: (start datetime, end datetime)
+    """
+    duration = event['end'] - event['start']
+    rule = event['rrule']
+
+    if rule is None:
+        if event['start'] < range_end and event['end'] > range_start:
+            yield event['start'], event['end']
+        return
+
+    emitted = 0
+    for occurrence in _candidate_starts(event['start'], rule, range_end):
+        if rule['count'] is not None and emitted >= rule['count']:
+            return
+        if rule['until'] is not None and occurrence > rule['until']:
+            return
+        if occurrence >= range_end:
+            return
+
+        emitted += 1
+        if occurrence in event['exdates']:
+            continue
+        if occurrence + duration > range_start:
+            yield occurrence, occurrence + duration
+
+
+def daily_blocks(start, end):
+    """
+    Split a datetime span into per-day (date, start_minute, end_minute) blocks
+
+    Yields:
+        tuple: (date, start minute of day, end minute of day)
+    """
+    current = start
+    while current < end:
+        day = current.date()
+        day_end = datetime.combine(day + timedelta(days=1), datetime.min.time())
+        block_end = min(end, day_end)
+        start_minute = current.hour * 60 + current.minute
+        end_minute = 1440 if block_end == day_end else block_end.hour * 60 + block_end.minute
+        if end_minute > start_minute:
+            yield day, start_minute, end_minute
+        current = block_end
@@ -0,0 +1,67 @@
+"""
+Integer-minute timeline
+
+Inside the scheduling pipeline every time is an int: minutes since the
+horizon epoch (midnight of the first day being scheduled). 1500 is 01:00 on
+the following day, so nothing breaks at midnight. Times are parsed once
+where they come in (database rows, forms) and formatted once where they go
+out (stored rows, exports).
+"""
+from datetime import datetime, time
+
+
+MINUTES_PER_DAY = 1440
+
+
+def parse_minutes(value):
+    """
+    Minute of day for a time-like value
+
+    Args:
+        value: datetime.time, datetime, 'HH:MM' / 'HH:MM:SS' string or int minutes
+
+    Returns:
+        int: Minutes since midnight (ints are returned unchanged)
+    """
+    if isinstance(value, int):
+        return value
+    if isinstance(value, (time, datetime)):
+        return value.hour * 60 + value.minute
+    if isinstance(value, str):
+        parts = value.strip().split(':')
+        if len(parts) < 2:
+            raise ValueError(f"Invalid time string: {value!r}")
+        return int(parts[0]) * 60 + int(parts[1])
+    raise TypeError(f"Expected time, datetime, str or int, got {type(value)}")
+
+
+def parse_span(start, end):
+    """
+    (start, end) minutes for a stored interval
+
+    An end before the start means the interval runs past midnight; an end
+    equal to the start is an empty interval, not a whole day.
+    """
+    start_minutes = parse_minutes(start)
+    end_minutes = parse_minutes(end)
+    if end_minutes < start_minutes:
+        end_minutes += MINUTES_PER_DAY
+    return start_minutes, end_minutes
+
+
+def hours_to_minutes(hours):
+    """Task length in hours -> nearest whole minute"""
+    return round(hours * 60)
+
+
+def to_time(minutes):
+    """Time of day for a timeline minute (wraps past midnight)"""
+    minutes %= MINUTES_PER_DAY
+    return time(minutes // 60, minutes % 60)
+
+
+def format_time(minutes):
+    """'HH:MM:SS' time of day for a timeline minute, as stored in the database"""
+    minutes %= MINUTES_PER_DAY
+    return f'{minutes // 60:02d}:{minutes % 60:02d}:00'
+
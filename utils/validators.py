@@ -88,4 +88,61 @@ def validate_date(date_str):
         return True, date(year, month, day)
     
     except (ValueError, AttributeError):
-        return False, "Invalid date format"
\ No newline at end of file
+        return False, "Invalid date format"
+
+# ----- Column-wise validation for bulk imports -----
+#
+# Each helper validates a whole column in one pass and returns
+# (values, errors): the cleaned values (None where invalid) and a
+# {row_index: message} dict.
+
+def _validate_column(values, validator):
+    cleaned = []
+    errors = {}
+    for i, value in enumerate(values):
+        valid, result = validator(value)
+        if valid:
+            cleaned.append(result)
+        else:
+            cleaned.append(None)
+            errors[i] = result
+    return cleaned, errors
+
+def validate_task_name_column(names):
+    """Validate a column of task names"""
+    return _validate_column(names, validate_task_name)
+
+def validate_scale_column(values, field_name, min_val=1, max_val=10):
+    """Validate a column of 1-10 scale values"""
+    return _validate_column(values, lambda value: validate_scale(value, field_name, min_val, max_val))
+
+def validate_length_column(lengths):
+    """Validate a column of task lengths in hours"""
+    return _validate_column(lengths, validate_length)
+
+def validate_time_column(times):
+    """Validate a column of HH:MM (or HH:MM:SS) times"""
+    def validator(value):
+        if isinstance(value, str) and value.count(':') == 2:
+            value = value.rsplit(':', 1)[0]
+        return validate_time(value)
+    return _validate_column(times, validator)
+
+def validate_columns(columns, validators):
+    """
+    Validate several columns and merge their errors per row
+
+    Args:
+        columns: {field: [values]}, all the same length
+        validators: {field: column validator}
+
+    Returns:
+        tuple: ({field: [cleaned values]}, {row_index: [messages]})
+    """
+    cleaned = {}
+    row_errors = {}
+    for field, validator in validators.items():
+        cleaned[field], errors = validator(columns[field])
+        for row, message in errors.items():
+            row_errors.setdefault(row, []).append(message)
+    return cleaned, row_errors